@@ -1,3 +1,5 @@
+import csv
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from .models import User
@@ -41,3 +43,34 @@ class UserProfileForm(forms.ModelForm):
             field.widget.attrs['class'] = 'form-control'
             if field_name == 'profile_pic':
                 field.widget.attrs['class'] = 'form-control-file'
+
+class PeopleImportForm(forms.Form):
+    """
+    Form for uploading a CSV file of students or teachers to import.
+    """
+    role = forms.ChoiceField(choices=(('student', 'Students'), ('teacher', 'Teachers')))
+    file = forms.FileField(help_text='CSV with a header row: username, first_name, last_name, email, password and the profile fields.')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Add Bootstrap classes to form fields
+        for field_name, field in self.fields.items():
+            field.widget.attrs['class'] = 'form-control'
+            if field_name == 'file':
+                field.widget.attrs['class'] = 'form-control-file'
+                field.widget.attrs['accept'] = '.csv,text/csv'
+
+    def clean_file(self):
+        """Check the upload is UTF-8 text with the username and password columns the import needs."""
+        upload = self.cleaned_data['file']
+        try:
+            text = upload.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise forms.ValidationError('The file must be a UTF-8 encoded CSV file.')
+        finally:
+            upload.seek(0)
+        header = {column.strip() for column in next(csv.reader(text.splitlines()), [])}
+        missing = [column for column in ('username', 'password') if column not in header]
+        if missing:
+            raise forms.ValidationError(f'The header row lacks the {", ".join(missing)} column(s).')
+        return upload
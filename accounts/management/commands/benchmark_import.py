@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.services import PeopleImporter
+
+
+class RollBack(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time the people import on generated rows for each worker count; nothing is saved.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Number of generated student rows.')
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4],
+                            help='Password hashing process counts to compare.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per transaction.')
+
+    def rows(self, count, run):
+        for i in range(count):
+            yield i + 2, {
+                'username': f'bench{run}_{i}',
+                'first_name': 'Bench',
+                'last_name': f'Student {i}',
+                'email': f'bench{run}_{i}@example.com',
+                'password': f'Bench-pass-{i}!',
+                'student_id': f'B{run}-{i}',
+                'gender': ('male', 'female', 'other')[i % 3],
+            }
+
+    def handle(self, *args, **options):
+        count = options['rows']
+        for run, workers in enumerate(options['workers']):
+            importer = PeopleImporter('student', chunk_size=options['chunk_size'], workers=workers)
+            started = time.perf_counter()
+            # Import inside a transaction that is always rolled back
+            try:
+                with transaction.atomic():
+                    report = importer.import_rows(self.rows(count, run))
+                    raise RollBack
+            except RollBack:
+                pass
+            elapsed = time.perf_counter() - started
+
+            phases = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in importer.timings.items())
+            self.stdout.write(self.style.SUCCESS(
+                f'{workers} worker(s): {report.created} rows in {elapsed:.2f}s '
+                f'({report.created / elapsed:.0f} rows/s; {phases})'
+            ))
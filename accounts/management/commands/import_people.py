@@ -0,0 +1,66 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.services import IMPORT_FORMS, PeopleImporter, run_next_import
+
+
+class Command(BaseCommand):
+    help = 'Import students or teachers from a CSV file, or run the imports queued from the upload page.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='CSV file with a header row of user and profile columns.')
+        parser.add_argument('--queued', action='store_true',
+                            help='Run the pending imports uploaded from the web page instead of a file.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='With --queued, keep checking for new imports every this many seconds.')
+        parser.add_argument('--role', choices=sorted(IMPORT_FORMS), default='student', help='Role of the imported people.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per transaction.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: one per CPU).')
+        parser.add_argument('--errors', help='Write the rejected rows to this CSV file.')
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            return self.run_queued(options)
+        if not options['path']:
+            raise CommandError('Pass a CSV file or --queued.')
+        importer = PeopleImporter(options['role'], chunk_size=options['chunk_size'], workers=options['workers'])
+
+        def progress(processed, report):
+            self.stdout.write(f'Processed {processed} rows, {report.created} created, {len(report.errors)} rejected.')
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as file:
+                report = importer.import_csv(file, progress=progress)
+        except OSError as e:
+            raise CommandError(f'Could not read {options["path"]}: {e}')
+
+        if options['errors']:
+            with open(options['errors'], 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['line', 'field', 'message'])
+                for line, errors in report.errors:
+                    for field, messages in errors.items():
+                        for message in messages:
+                            writer.writerow([line, field, message])
+        else:
+            for error in report.error_lines:
+                self.stdout.write(error)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} {options["role"]}s, rejected {len(report.errors)} rows.'
+        ))
+
+    def run_queued(self, options):
+        while True:
+            while people_import := run_next_import(chunk_size=options['chunk_size'], workers=options['workers']):
+                self.stdout.write(
+                    f'Import {people_import.pk} {people_import.status}: {people_import.created_count} '
+                    f'{people_import.role}s created, {people_import.rejected_count} rows rejected.'
+                    + (f' {people_import.message}' if people_import.message else '')
+                )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,48 @@
+from django.http import Http404
+from django.utils.functional import SimpleLazyObject
+
+from students.models import Student
+from teachers.models import Teacher
+
+# Profile model loaded for each role
+PROFILE_MODELS = {
+    'student': Student,
+    'teacher': Teacher,
+}
+
+
+def get_profile(request):
+    """
+    Return the student or teacher profile of the request's user, or None.
+    The profile is loaded at most once per request.
+    """
+    if not hasattr(request, '_cached_profile'):
+        user = request.user
+        model = PROFILE_MODELS.get(getattr(user, 'user_type', None)) if user.is_authenticated else None
+        profile = None
+        if model is not None:
+            profile = model.objects.filter(user=user).first()
+            if profile is not None:
+                # Reuse the already loaded user instead of fetching it again
+                profile.user = user
+        request._cached_profile = profile
+    return request._cached_profile
+
+def get_profile_or_404(request):
+    """Return the role profile of the request's user, raising Http404 if it has none."""
+    profile = get_profile(request)
+    if profile is None:
+        raise Http404('No profile found for this user.')
+    return profile
+
+class ProfileMiddleware:
+    """
+    Middleware that sets ``request.profile`` to the lazily loaded role profile
+    of the current user. Must come after AuthenticationMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request))
+        return self.get_response(request)
@@ -1,5 +1,11 @@
+import os
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.db.models.functions import Lower
+from django.dispatch import Signal
 
 class User(AbstractUser):
     """
@@ -19,6 +25,11 @@ class User(AbstractUser):
     
     def __str__(self):
         return f"{self.username} ({self.get_user_type_display()})"
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+        ]
     
     @property
     def is_admin(self):
@@ -31,3 +42,53 @@ class User(AbstractUser):
     @property
     def is_student(self):
         return self.user_type == 'student'
+
+# Sent after people are created in bulk, bypassing the model save signals
+people_imported = Signal()
+
+def people_import_storage():
+    # Uploads hold plaintext passwords, so they are kept out of MEDIA_ROOT
+    return FileSystemStorage(
+        location=getattr(settings, 'PEOPLE_IMPORT_DIR', os.path.join(settings.BASE_DIR, 'imports')),
+        directory_permissions_mode=0o700,
+        file_permissions_mode=0o600,
+    )
+
+class PeopleImport(models.Model):
+    """
+    Model for a queued CSV import of students or teachers. The upload view
+    stores the file and "manage.py import_people --queued" runs the import,
+    recording its outcome here and deleting the file.
+    """
+    ROLE_CHOICES = (
+        ('student', 'Students'),
+        ('teacher', 'Teachers'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    file = models.FileField(upload_to='%Y/%m/', storage=people_import_storage, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    uploaded_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    # Rejected rows as [line, {field: [messages]}] pairs
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.get_role_display()} import of {self.uploaded_at:%Y-%m-%d %H:%M} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['-uploaded_at']
+        indexes = [
+            # Oldest pending import
+            models.Index(fields=['status', 'uploaded_at'], name='people_import_queue_idx'),
+        ]
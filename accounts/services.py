@@ -0,0 +1,250 @@
+import csv
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from students.forms import StudentForm, StudentUserForm
+from teachers.forms import TeacherForm, TeacherUserForm
+from .models import PeopleImport, User, people_imported
+
+
+def _without_unique_checks(form_class):
+    """
+    Subclass a form so rows are validated without per-row uniqueness queries;
+    the importer checks uniqueness for a whole chunk at once instead.
+    """
+    def clean_username(self):
+        return self.cleaned_data.get('username')
+
+    attrs = {'validate_unique': lambda self: None}
+    if 'username' in form_class.base_fields:
+        attrs['clean_username'] = clean_username
+    return type(f'Import{form_class.__name__}', (form_class,), attrs)
+
+# User and profile forms validating the rows of each role
+IMPORT_FORMS = {
+    'student': (_without_unique_checks(StudentUserForm), _without_unique_checks(StudentForm)),
+    'teacher': (_without_unique_checks(TeacherUserForm), _without_unique_checks(TeacherForm)),
+}
+
+
+def _setup_worker():
+    # Workers started with spawn or forkserver need Django configured to hash
+    if not apps.ready:
+        django.setup()
+
+class ImportReport:
+    """Outcome of an import: the number of people created and the rejected rows."""
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        """Record the ``{field: [messages]}`` errors of a CSV line."""
+        self.errors.append((line, errors))
+
+    @property
+    def error_lines(self):
+        return [
+            f'Line {line}: {field}: {message}' if field != '__all__' else f'Line {line}: {message}'
+            for line, errors in self.errors
+            for field, messages in errors.items()
+            for message in messages
+        ]
+
+class PeopleImporter:
+    """
+    Import students or teachers from CSV rows in chunks.
+
+    Rows hold the user columns (``username``, ``first_name``, ``last_name``,
+    ``email``, ``password``) plus the profile form's fields, and are validated
+    with the same forms as the create views. Passwords are hashed in a process
+    pool, and each valid chunk is inserted with two bulk_create calls in one
+    transaction.
+    """
+    def __init__(self, role='student', chunk_size=1000, workers=None):
+        if role not in IMPORT_FORMS:
+            raise ValueError(f'Unknown role {role!r}')
+        self.role = role
+        self.user_form_class, self.profile_form_class = IMPORT_FORMS[role]
+        self.profile_model = self.profile_form_class._meta.model
+        self.unique_fields = [
+            field.name for field in self.profile_model._meta.fields
+            if field.unique and not field.primary_key and field.name in self.profile_form_class.base_fields
+        ]
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._seen = {'username': set(), **{name: set() for name in self.unique_fields}}
+        # Seconds spent in each phase, for benchmarking
+        self.timings = {'validate': 0.0, 'hash': 0.0, 'insert': 0.0}
+
+    def import_csv(self, file, progress=None):
+        """Import the rows of a CSV text file; returns an ImportReport."""
+        # Line 1 is the header
+        rows = enumerate(csv.DictReader(file), start=2)
+        return self.import_rows(rows, progress=progress)
+
+    def import_rows(self, rows, progress=None):
+        """
+        Import ``(line, row dict)`` pairs; ``progress(processed, report)`` is
+        called after every committed chunk.
+        """
+        report = ImportReport()
+        processed = 0
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk, report)
+                processed += len(chunk)
+                if progress:
+                    progress(processed, report)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        if report.created:
+            people_imported.send(sender=self.profile_model, count=report.created)
+        return report
+
+    def _validate(self, line, row, report):
+        """Return the unsaved user and profile of a row, or None if it is invalid."""
+        row = {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        password = row.pop('password', '')
+        user_form = self.user_form_class({**row, 'password1': password, 'password2': password, 'user_type': self.role})
+        profile_form = self.profile_form_class(row)
+        user_valid, profile_valid = user_form.is_valid(), profile_form.is_valid()
+        if not (user_valid and profile_valid):
+            errors = dict(profile_form.errors)
+            for field, messages in user_form.errors.items():
+                # Both password fields come from the single password column
+                errors.setdefault('password' if field.startswith('password') else field, []).extend(messages)
+            report.add_error(line, errors)
+            return None
+        user = user_form.instance
+        user.user_type = self.role
+        return user, profile_form.instance, password
+
+    def _check_unique(self, candidates, report):
+        """Drop candidates clashing with existing people or earlier rows."""
+        usernames = {user.username.lower() for line, (user, profile, password) in candidates}
+        taken = {'username': set(
+            User.objects.annotate(username_lower=Lower('username'))
+            .filter(username_lower__in=usernames)
+            .values_list('username_lower', flat=True)
+        )}
+        for name in self.unique_fields:
+            values = {getattr(profile, name) for line, (user, profile, password) in candidates}
+            taken[name] = set(self.profile_model.objects.filter(**{f'{name}__in': values}).values_list(name, flat=True))
+
+        unique = []
+        for line, (user, profile, password) in candidates:
+            values = {'username': user.username.lower(), **{name: getattr(profile, name) for name in self.unique_fields}}
+            clashes = {
+                name: [f'{value} is already taken.'] for name, value in values.items()
+                if value in taken[name] or value in self._seen[name]
+            }
+            if clashes:
+                report.add_error(line, clashes)
+                continue
+            # Only rows that will be created reserve their values
+            for name, value in values.items():
+                self._seen[name].add(value)
+            unique.append((user, profile, password))
+        return unique
+
+    def hash_passwords(self, passwords):
+        """Hash passwords, spreading the work over ``workers`` processes."""
+        if self.workers <= 1 or len(passwords) < 2:
+            return [make_password(password) for password in passwords]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_setup_worker)
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._executor.map(make_password, passwords, chunksize=chunksize))
+
+    def _import_chunk(self, chunk, report):
+        started = time.perf_counter()
+        candidates = []
+        for line, row in chunk:
+            person = self._validate(line, row, report)
+            if person is not None:
+                candidates.append((line, person))
+        people = self._check_unique(candidates, report)
+        self.timings['validate'] += time.perf_counter() - started
+        if not people:
+            return
+
+        started = time.perf_counter()
+        hashes = self.hash_passwords([password for user, profile, password in people])
+        self.timings['hash'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        users = []
+        for (user, profile, password), hashed in zip(people, hashes):
+            user.password = hashed
+            users.append(user)
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            profiles = []
+            for user, profile, password in people:
+                profile.user = user
+                profiles.append(profile)
+            self.profile_model.objects.bulk_create(profiles)
+        self.timings['insert'] += time.perf_counter() - started
+        report.created += len(profiles)
+
+
+def run_next_import(chunk_size=1000, workers=None):
+    """
+    Claim the oldest pending PeopleImport and run it, recording its outcome
+    and deleting its file. Returns the import, or None when none is pending.
+    """
+    while True:
+        people_import = PeopleImport.objects.filter(status='pending').order_by('uploaded_at', 'pk').first()
+        if people_import is None:
+            return None
+        # Another runner may have claimed it since it was read
+        if PeopleImport.objects.filter(pk=people_import.pk, status='pending').update(status='running'):
+            break
+    people_import.status = 'running'
+
+    def progress(processed, report):
+        # Chunks are committed as they go, so a failed import keeps their counts
+        people_import.created_count = report.created
+        people_import.rejected_count = len(report.errors)
+
+    importer = PeopleImporter(people_import.role, chunk_size=chunk_size, workers=workers)
+    try:
+        with people_import.file.open('rb') as upload:
+            report = importer.import_csv(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''), progress=progress)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        people_import.status = 'failed'
+        people_import.message = str(e)
+    else:
+        people_import.status = 'done'
+        people_import.created_count = report.created
+        people_import.rejected_count = len(report.errors)
+        people_import.errors = [
+            [line, {field: [str(message) for message in messages] for field, messages in errors.items()}]
+            for line, errors in report.errors
+        ]
+    finally:
+        if people_import.status == 'running':
+            people_import.status = 'failed'
+            people_import.message = 'The import stopped with an unexpected error.'
+        # The upload holds plaintext passwords
+        people_import.file.delete(save=False)
+        people_import.finished_at = timezone.now()
+        people_import.save()
+    return people_import
@@ -1,3 +1,189 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from students.models import Student
+from teachers.models import Teacher
+from .middleware import get_profile
+from .models import PeopleImport, User
+from .services import PeopleImporter
+
+
+class ProfileMiddlewareTests(TestCase):
+    """Tests for the request-scoped role profile."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student_user = User.objects.create_user(username='student', password='pass', user_type='student')
+        cls.student = Student.objects.create(user=cls.student_user, student_id='S1', gender='male')
+        cls.teacher_user = User.objects.create_user(username='teacher', password='pass', user_type='teacher')
+        cls.teacher = Teacher.objects.create(user=cls.teacher_user, teacher_id='T1', gender='female')
+
+    def get_request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_profile_matches_role_and_is_loaded_once(self):
+        request = self.get_request(self.student_user)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_profile(request), self.student)
+            self.assertEqual(get_profile(request), self.student)
+            self.assertIs(get_profile(request).user, self.student_user)
+        self.assertEqual(get_profile(self.get_request(self.teacher_user)), self.teacher)
+
+    def test_users_without_profile_get_none(self):
+        admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+        orphan = User.objects.create_user(username='orphan', password='pass', user_type='student')
+        self.assertIsNone(get_profile(self.get_request(admin)))
+        self.assertIsNone(get_profile(self.get_request(orphan)))
+
+    def test_student_views_look_up_the_profile_once(self):
+        self.client.force_login(self.student_user)
+        for name in ('student_attendance_report', 'student_fee_list', 'student_enrollments', 'student_dashboard'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+            lookups = [q for q in queries if q['sql'].startswith('SELECT') and 'FROM "students_student"' in q['sql']]
+            self.assertEqual(len(lookups), 1, name)
+
+    def test_missing_profile_returns_404(self):
+        orphan = User.objects.create_user(username='orphan', password='pass', user_type='student')
+        self.client.force_login(orphan)
+        self.assertEqual(self.client.get(reverse('student_enrollments')).status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PeopleImportTests(TestCase):
+    """Tests for the bulk student and teacher import."""
+    header = 'username,first_name,last_name,email,password,student_id,gender\n'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+        existing = User.objects.create_user(username='taken', password='pass', user_type='student')
+        Student.objects.create(user=existing, student_id='S0', gender='male')
+
+    def csv(self, *lines):
+        return self.header + ''.join(f'{line}\n' for line in lines)
+
+    def test_command_imports_rows_and_reports_rejected_ones(self):
+        content = self.csv(
+            'asha,Asha,Rao,asha@example.com,Secret-pass-1,S1,female',
+            'TAKEN,Dup,User,dup@example.com,Secret-pass-2,S2,male',
+            'ravi,Ravi,Kumar,ravi@example.com,Secret-pass-3,S1,male',
+            'meena,Meena,Iyer,meena@example.com,Secret-pass-4,S4,unknown',
+            'ASHA,Asha,Again,asha2@example.com,Secret-pass-5,S5,female',
+            'kiran,Kiran,Das,kiran@example.com,Secret-pass-6,S6,other',
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'people.csv')
+            errors_path = os.path.join(directory, 'errors.csv')
+            with open(path, 'w') as file:
+                file.write(content)
+            out = io.StringIO()
+            call_command('import_people', path, '--chunk-size', '2', '--workers', '1', '--errors', errors_path, stdout=out)
+            with open(errors_path) as file:
+                errors = file.read().splitlines()
+
+        self.assertIn('Imported 2 students, rejected 4 rows.', out.getvalue())
+        self.assertEqual(errors[0], 'line,field,message')
+        self.assertEqual(sorted({error.split(',')[:2][0] for error in errors[1:]}), ['3', '4', '5', '6'])
+        self.assertIn('5,gender,', '\n'.join(errors))
+        asha = Student.objects.select_related('user').get(student_id='S1')
+        self.assertEqual(asha.user.username, 'asha')
+        self.assertEqual(asha.user.user_type, 'student')
+        self.assertTrue(check_password('Secret-pass-1', asha.user.password))
+        self.assertTrue(Student.objects.filter(student_id='S6', user__username='kiran').exists())
+
+    def test_passwords_are_hashed_in_a_process_pool(self):
+        rows = [
+            (i + 2, {'username': f'teacher{i}', 'email': f't{i}@example.com', 'password': f'Secret-pass-{i}',
+                     'teacher_id': f'T{i}', 'gender': 'female', 'qualification': 'MSc', 'experience': '3'})
+            for i in range(4)
+        ]
+        report = PeopleImporter('teacher', workers=2).import_rows(iter(rows))
+        self.assertEqual(report.errors, [])
+        self.assertEqual(report.created, 4)
+        teacher = Teacher.objects.select_related('user').get(teacher_id='T3')
+        self.assertEqual(teacher.user.user_type, 'teacher')
+        self.assertTrue(check_password('Secret-pass-3', teacher.user.password))
+
+    def test_chunks_insert_with_a_constant_number_of_queries(self):
+        rows = [
+            (i + 2, {'username': f'student{i}', 'password': f'Secret-pass-{i}', 'student_id': f'S{i + 1}', 'gender': 'male'})
+            for i in range(50)
+        ]
+        # Uniqueness checks, the two bulk inserts, the student search index
+        # refresh and the savepoint
+        with self.assertNumQueries(8):
+            report = PeopleImporter(workers=1, chunk_size=100).import_rows(iter(rows))
+        self.assertEqual(report.created, 50)
+
+    def test_rejected_rows_do_not_reserve_their_values(self):
+        rows = [
+            (2, {'username': 'asha', 'password': 'Secret-pass-1', 'student_id': 'S0', 'gender': 'female'}),
+            (3, {'username': 'asha', 'password': 'Secret-pass-2', 'student_id': 'S1', 'gender': 'female'}),
+        ]
+        report = PeopleImporter(workers=1).import_rows(iter(rows))
+        self.assertEqual(report.errors, [(2, {'student_id': ['S0 is already taken.']})])
+        self.assertTrue(Student.objects.filter(student_id='S1', user__username='asha').exists())
+
+    def test_upload_view_queues_the_import(self):
+        self.client.force_login(self.admin)
+        upload = SimpleUploadedFile('people.csv', self.csv(
+            'asha,Asha,Rao,asha@example.com,Secret-pass-1,S1,female',
+            'taken,Dup,User,dup@example.com,Secret-pass-2,S2,male',
+        ).encode('utf-8-sig'), content_type='text/csv')
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(
+            PeopleImport._meta.get_field('file'), 'storage', FileSystemStorage(directory)
+        ):
+            response = self.client.post(reverse('import_people'), {'role': 'student', 'file': upload})
+            people_import = PeopleImport.objects.get()
+            self.assertRedirects(response, f"{reverse('import_people')}?import={people_import.pk}")
+            # Nothing is imported within the request
+            self.assertEqual(people_import.status, 'pending')
+            self.assertEqual(people_import.uploaded_by, self.admin)
+            self.assertFalse(User.objects.filter(username='asha').exists())
+            path = people_import.file.path
+            self.assertTrue(os.path.exists(path))
+
+            out = io.StringIO()
+            call_command('import_people', '--queued', '--workers', '1', stdout=out)
+            self.assertIn(f'Import {people_import.pk} done: 1 students created, 1 rows rejected.', out.getvalue())
+            self.assertFalse(os.path.exists(path))
+
+        people_import.refresh_from_db()
+        self.assertEqual(people_import.status, 'done')
+        self.assertEqual((people_import.created_count, people_import.rejected_count), (1, 1))
+        self.assertEqual(people_import.errors, [[3, {'username': ['taken is already taken.']}]])
+        self.assertTrue(User.objects.filter(username='asha', user_type='student').exists())
+        response = self.client.get(reverse('import_people'), {'import': people_import.pk})
+        self.assertEqual(response.context['selected_import'], people_import)
+        self.assertContains(response, 'username: taken is already taken.')
+
+    def test_upload_view_rejects_files_it_cannot_import(self):
+        self.client.force_login(self.admin)
+        for content, message in (
+            (b'\xff\xfeusername', 'The file must be a UTF-8 encoded CSV file.'),
+            (b'username,first_name\nasha,Asha\n', 'The header row lacks the password column(s).'),
+        ):
+            upload = SimpleUploadedFile('people.csv', content, content_type='text/csv')
+            response = self.client.post(reverse('import_people'), {'role': 'student', 'file': upload})
+            self.assertFormError(response.context['form'], 'file', message)
+        self.assertFalse(PeopleImport.objects.exists())
+
+    def test_upload_view_requires_admin(self):
+        student = User.objects.get(username='taken')
+        self.client.force_login(student)
+        self.assertEqual(self.client.get(reverse('import_people')).status_code, 403)
@@ -1,13 +1,15 @@
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView
 from django.shortcuts import render, redirect
-from django.urls import reverse_lazy
-from django.views.generic import CreateView, UpdateView
+from django.urls import reverse, reverse_lazy
+from django.views.generic import CreateView, FormView, UpdateView
 
-from .forms import CustomUserCreationForm, CustomAuthenticationForm, UserProfileForm
-from .models import User
+from .forms import CustomUserCreationForm, CustomAuthenticationForm, PeopleImportForm, UserProfileForm
+from .models import PeopleImport, User
+from students.views import AdminRequiredMixin
 
 class CustomLoginView(LoginView):
     """
@@ -53,3 +55,32 @@ def logout_view(request):
     """
     logout(request)
     return redirect('login')
+
+class ImportPeopleView(LoginRequiredMixin, AdminRequiredMixin, FormView):
+    """
+    View for queueing an import of students or teachers from an uploaded CSV
+    file, and for showing the outcome of recent imports. The import itself
+    runs in "manage.py import_people --queued", away from the web workers.
+    """
+    form_class = PeopleImportForm
+    template_name = 'accounts/import_people.html'
+    recent_imports = 10
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        imports = PeopleImport.objects.select_related('uploaded_by')
+        # The rejected rows are only read for the selected import
+        context['imports'] = imports.defer('errors')[:self.recent_imports]
+        selected = self.request.GET.get('import', '')
+        if selected.isdigit():
+            context['selected_import'] = imports.filter(pk=selected).first()
+        return context
+
+    def form_valid(self, form):
+        people_import = PeopleImport.objects.create(
+            role=form.cleaned_data['role'],
+            file=form.cleaned_data['file'],
+            uploaded_by=self.request.user,
+        )
+        messages.success(self.request, 'The file was queued for import; its result shows here once it has run.')
+        return redirect(f"{reverse('import_people')}?import={people_import.pk}")
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AttendanceRecord, StudentAttendance
+from .models import AttendanceRecord, AttendanceSummary, StudentAttendance
 
 class StudentAttendanceInline(admin.TabularInline):
     model = StudentAttendance
@@ -26,4 +26,11 @@ class StudentAttendanceAdmin(admin.ModelAdmin):
     def get_course(self, obj):
         return obj.attendance_record.course
     get_course.short_description = 'Course'
-    get_course.admin_order_field = 'attendance_record__course'
\ No newline at end of file
+    get_course.admin_order_field = 'attendance_record__course'
+
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'present', 'absent', 'late', 'excused')
+    list_filter = ('course',)
+    search_fields = ('student__user__first_name', 'student__user__last_name', 'student__student_id')
+    readonly_fields = ('student', 'course', 'present', 'absent', 'late', 'excused')
@@ -1,5 +1,7 @@
 from django import forms
 from django.forms import inlineformset_factory
+from django.urls import reverse_lazy
+from institute_management.autocomplete import AutocompleteModelChoiceField, AutocompleteWidget
 from .models import AttendanceRecord, StudentAttendance
 from courses.models import Course, Enrollment
 
@@ -29,6 +31,7 @@ class StudentAttendanceForm(forms.ModelForm):
         model = StudentAttendance
         fields = ['student', 'status', 'remarks']
         widgets = {
+            'student': AutocompleteWidget(reverse_lazy('student_autocomplete')),
             'remarks': forms.Textarea(attrs={'rows': 2, 'class': 'form-control'}),
         }
     
@@ -39,11 +42,13 @@ class StudentAttendanceForm(forms.ModelForm):
             if 'class' not in field.widget.attrs:
                 field.widget.attrs['class'] = 'form-control'
 
-# Create a formset for student attendance
+# Create a formset for student attendance; the roster is fixed, so only
+# status and remarks are editable
 StudentAttendanceFormSet = inlineformset_factory(
     AttendanceRecord, 
     StudentAttendance, 
     form=StudentAttendanceForm,
+    fields=['status', 'remarks'],
     extra=0,
     can_delete=False
 )
@@ -52,10 +57,11 @@ class AttendanceFilterForm(forms.Form):
     """
     Form for filtering attendance records by course and date range.
     """
-    course = forms.ModelChoiceField(
+    course = AutocompleteModelChoiceField(
         queryset=Course.objects.all(),
+        url=reverse_lazy('course_autocomplete'),
+        attrs={'class': 'form-control', 'placeholder': 'All Courses'},
         required=False,
-        widget=forms.Select(attrs={'class': 'form-control'})
     )
     start_date = forms.DateField(
         required=False,
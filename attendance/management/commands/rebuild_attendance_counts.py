@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from attendance.models import AttendanceRecord
+
+
+class Command(BaseCommand):
+    help = 'Backfill the stored status counters of attendance records.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help='Only rebuild records of this course id.')
+
+    def handle(self, *args, **options):
+        filters = {}
+        if options['course'] is not None:
+            filters['course_id'] = options['course']
+
+        count = AttendanceRecord.objects.rebuild_counts(**filters)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt status counters of {count} attendance records.'))
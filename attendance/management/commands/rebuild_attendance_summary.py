@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from attendance.models import AttendanceSummary
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-student, per-course attendance summary from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student', type=int, help='Only rebuild summaries for this student id.')
+        parser.add_argument('--course', type=int, help='Only rebuild summaries for this course id.')
+
+    def handle(self, *args, **options):
+        filters = {}
+        if options['student'] is not None:
+            filters['student_id'] = options['student']
+        if options['course'] is not None:
+            filters['course_id'] = options['course']
+
+        count = AttendanceSummary.objects.rebuild(**filters)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} attendance summary rows.'))
@@ -1,34 +1,177 @@
-from django.db import models
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
 from courses.models import Course
 from students.models import Student
 
+class AttendanceRecordManager(models.Manager):
+    """
+    Manager with set-based helpers for maintaining the per-record status counters.
+    """
+    def apply_counts(self, entries, sign=1):
+        """
+        Add ``sign`` to the status counter of every ``(record_id, status)`` entry.
+        Costs one UPDATE per (status, increment) group.
+        """
+        groups = defaultdict(list)
+        for (record_id, status), count in Counter(entries).items():
+            groups[(status, count)].append(record_id)
+        for (status, count), record_ids in groups.items():
+            field = f'{status}_count'
+            self.filter(pk__in=record_ids).update(**{field: F(field) + sign * count})
+
+    def rebuild_counts(self, **filters):
+        """
+        Recompute the status counters of the matching records with a single UPDATE.
+        Returns the number of records updated.
+        """
+        counts = {}
+        for status, label in StudentAttendance.STATUS_CHOICES:
+            attendances = (
+                StudentAttendance.objects.filter(attendance_record=OuterRef('pk'), status=status)
+                .order_by()
+                .values('attendance_record')
+                .annotate(count=Count('pk'))
+                .values('count')
+            )
+            counts[f'{status}_count'] = Coalesce(Subquery(attendances), 0)
+        return self.filter(**filters).update(**counts)
+
 class AttendanceRecord(models.Model):
     """
     Model for storing attendance records for a course on a specific date.
     """
+    # Denormalized status counters, maintained in SQL as student attendances change
+    COUNT_FIELDS = ('present_count', 'absent_count', 'late_count', 'excused_count')
+
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='attendance_records')
     date = models.DateField()
+    present_count = models.PositiveIntegerField(default=0, editable=False)
+    absent_count = models.PositiveIntegerField(default=0, editable=False)
+    late_count = models.PositiveIntegerField(default=0, editable=False)
+    excused_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AttendanceRecordManager()
+
     def __str__(self):
         return f"{self.course} - {self.date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded course so the summary can follow a course change
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Never write back counters from a possibly stale instance
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNT_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         unique_together = ['course', 'date']
         ordering = ['-date']
 
     def get_present_count(self):
-        return self.student_attendances.filter(status='present').count()
+        return self.present_count
 
     def get_absent_count(self):
-        return self.student_attendances.filter(status='absent').count()
+        return self.absent_count
 
     def get_late_count(self):
-        return self.student_attendances.filter(status='late').count()
+        return self.late_count
 
     def get_excused_count(self):
-        return self.student_attendances.filter(status='excused').count()
+        return self.excused_count
+
+    @property
+    def total_count(self):
+        return self.present_count + self.absent_count + self.late_count + self.excused_count
+
+# Sent whenever attendance counters change, including bulk paths that bypass
+# the model save and delete signals
+attendance_counts_changed = Signal()
+
+def apply_attendance_counts(entries, sign=1):
+    """
+    Add ``sign`` to every denormalized counter touched by the
+    ``(record_id, student_id, course_id, status)`` entries: the per-record
+    status counts and the per-student, per-course summary.
+    """
+    entries = list(entries)
+    AttendanceRecord.objects.apply_counts(
+        ((record_id, status) for record_id, student_id, course_id, status in entries), sign
+    )
+    AttendanceSummary.objects.apply(
+        ((student_id, course_id, status) for record_id, student_id, course_id, status in entries), sign
+    )
+    if entries:
+        attendance_counts_changed.send(sender=StudentAttendance)
+
+# StudentAttendance fields that determine which counters a row belongs to
+COUNTER_FIELDS = {'status', 'student', 'student_id', 'attendance_record', 'attendance_record_id'}
+COUNTER_KEY = ('attendance_record_id', 'student_id', 'attendance_record__course_id', 'status')
+
+class StudentAttendanceQuerySet(models.QuerySet):
+    """
+    QuerySet that keeps the attendance counters in step with bulk operations,
+    which bypass the save and delete signals.
+    """
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False, **kwargs):
+        # Rows skipped or updated on conflict are returned like inserted ones,
+        # so their counters could not be told apart
+        if ignore_conflicts or update_conflicts:
+            raise ValueError('StudentAttendance.bulk_create() does not support ignore_conflicts or update_conflicts.')
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, batch_size=batch_size, **kwargs)
+            record_courses = dict(
+                AttendanceRecord.objects.filter(pk__in={obj.attendance_record_id for obj in objs})
+                .values_list('pk', 'course_id')
+            )
+            apply_attendance_counts(
+                (obj.attendance_record_id, obj.student_id, record_courses[obj.attendance_record_id], obj.status)
+                for obj in objs
+            )
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # The counters are moved by update(), which bulk_update() runs per batch
+        objs = list(objs)
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        for obj in objs:
+            obj.remember_loaded_values()
+        return rows
+
+    def update(self, **kwargs):
+        if not COUNTER_FIELDS & set(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True).order_by())
+            entries = StudentAttendance.objects.filter(pk__in=pks).values_list(*COUNTER_KEY).order_by()
+            before = list(entries)
+            rows = super().update(**kwargs)
+            apply_attendance_counts(before, -1)
+            apply_attendance_counts(entries.all())
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            entries = list(self.values_list(*COUNTER_KEY).order_by())
+            result = super().delete()
+            apply_attendance_counts(entries, -1)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 class StudentAttendance(models.Model):
     """
@@ -46,9 +189,120 @@ class StudentAttendance(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='present')
     remarks = models.TextField(blank=True, null=True)
 
+    objects = StudentAttendanceQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.student} - {self.attendance_record.date} - {self.get_status_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded state so the counters can be adjusted on save
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def remember_loaded_values(self):
+        """Mark the current counter-relevant state as the persisted one."""
+        self._loaded_values = {
+            'attendance_record_id': self.attendance_record_id,
+            'student_id': self.student_id,
+            'status': self.status,
+        }
+
     class Meta:
         unique_together = ['attendance_record', 'student']
-        ordering = ['student__user__first_name', 'student__user__last_name']
\ No newline at end of file
+        ordering = ['student__user__first_name', 'student__user__last_name']
+
+class AttendanceSummaryManager(models.Manager):
+    """
+    Manager with set-based helpers for maintaining the summary counters.
+    """
+    def apply(self, entries, sign=1):
+        """
+        Add ``sign`` to the counter of every ``(student_id, course_id, status)`` entry.
+        Costs one INSERT plus one UPDATE per (course, status, increment) group.
+        """
+        counts = defaultdict(int)
+        for entry in entries:
+            counts[entry] += 1
+        if not counts:
+            return
+
+        groups = defaultdict(list)
+        for (student_id, course_id, status), count in counts.items():
+            groups[(course_id, status, count)].append(student_id)
+
+        self.bulk_create(
+            [self.model(student_id=student_id, course_id=course_id) for student_id, course_id, status in counts],
+            ignore_conflicts=True,
+        )
+        for (course_id, status, count), student_ids in groups.items():
+            self.filter(course_id=course_id, student_id__in=student_ids).update(
+                **{status: F(status) + sign * count}
+            )
+
+    def totals(self, **filters):
+        """Sum the counters of the matching rows into a ``{status: count}`` dict."""
+        return self.filter(**filters).aggregate(**{
+            status: Coalesce(Sum(status), 0) for status, label in StudentAttendance.STATUS_CHOICES
+        })
+
+    def rebuild(self, **filters):
+        """
+        Recompute summaries from StudentAttendance, optionally limited by
+        ``student_id`` and/or ``course_id``. Returns the number of rows written.
+        """
+        attendance_filters = {}
+        if 'student_id' in filters:
+            attendance_filters['student_id'] = filters['student_id']
+        if 'course_id' in filters:
+            attendance_filters['attendance_record__course_id'] = filters['course_id']
+
+        rows = (
+            StudentAttendance.objects.filter(**attendance_filters)
+            .values('student_id', 'attendance_record__course_id')
+            .annotate(**{
+                status: Count('pk', filter=Q(status=status))
+                for status, label in StudentAttendance.STATUS_CHOICES
+            })
+            .order_by()
+        )
+        summaries = []
+        for row in rows.iterator():
+            course_id = row.pop('attendance_record__course_id')
+            summaries.append(self.model(course_id=course_id, **row))
+
+        with transaction.atomic(using=self.db):
+            self.filter(**filters).delete()
+            self.bulk_create(summaries, batch_size=1000)
+        attendance_counts_changed.send(sender=AttendanceSummary)
+        return len(summaries)
+
+class AttendanceSummary(models.Model):
+    """
+    Denormalized per-student, per-course attendance counters.
+    Kept up to date incrementally from StudentAttendance changes.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_summaries')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='attendance_summaries')
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+
+    objects = AttendanceSummaryManager()
+
+    def __str__(self):
+        return f"{self.student} - {self.course}"
+
+    class Meta:
+        unique_together = ['student', 'course']
+        verbose_name_plural = 'Attendance Summaries'
+
+    @property
+    def total(self):
+        return self.present + self.absent + self.late + self.excused
+
+    @property
+    def present_percentage(self):
+        return (self.present / self.total * 100) if self.total > 0 else 0
@@ -0,0 +1,62 @@
+import re
+
+from django.db import transaction
+
+from .models import StudentAttendance
+from courses.models import Enrollment
+
+VALID_STATUSES = {status for status, label in StudentAttendance.STATUS_CHOICES}
+
+
+def get_roster(course):
+    """Return the active enrollments of a course with student and user joined in."""
+    return (
+        Enrollment.objects.filter(course=course, status='active')
+        .select_related('student__user')
+        .order_by('student__user__first_name', 'student__user__last_name')
+    )
+
+@transaction.atomic
+def capture_attendance(attendance_record, marks=None, default_status='present'):
+    """
+    Create attendance for every active student of the record's course.
+
+    ``marks`` maps student ids to ``(status, remarks)`` tuples; students without
+    a valid mark get ``default_status``. The roster is read in one query and all
+    rows are written with a single ``bulk_create``, whatever the class size.
+    """
+    marks = marks or {}
+    student_ids = Enrollment.objects.filter(
+        course_id=attendance_record.course_id, status='active'
+    ).values_list('student_id', flat=True)
+
+    attendances = []
+    for student_id in student_ids:
+        status, remarks = marks.get(student_id, (default_status, ''))
+        if status not in VALID_STATUSES:
+            status = default_status
+        attendances.append(StudentAttendance(
+            attendance_record=attendance_record,
+            student_id=student_id,
+            status=status,
+            remarks=remarks,
+        ))
+    return StudentAttendance.objects.bulk_create(attendances)
+
+def marks_from_post(data):
+    """Read ``student_<id>_status``/``student_<id>_remarks`` pairs from posted data."""
+    marks = {}
+    for key, status in data.items():
+        match = re.fullmatch(r'student_(\d+)_status', key)
+        if match:
+            student_id = int(match.group(1))
+            marks[student_id] = (status, data.get(f'student_{student_id}_remarks', ''))
+    return marks
+
+@transaction.atomic
+def update_attendance_marks(attendances):
+    """Persist status and remarks of existing attendances with one ``bulk_update``."""
+    attendances = list(attendances)
+    if attendances:
+        StudentAttendance.objects.bulk_update(attendances, ['status', 'remarks'])
+    return attendances
@@ -0,0 +1,76 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import AttendanceRecord, AttendanceSummary, StudentAttendance, apply_attendance_counts
+
+
+def _counter_key(attendance):
+    """Return the ``(record_id, student_id, course_id, status)`` entry for an attendance."""
+    return (
+        attendance.attendance_record_id,
+        attendance.student_id,
+        attendance.attendance_record.course_id,
+        attendance.status,
+    )
+
+@receiver(post_save, sender=StudentAttendance)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """Move the attendance from its previous counters to its current ones."""
+    if raw:
+        return
+    new_key = _counter_key(instance)
+    loaded = getattr(instance, '_loaded_values', {})
+    if not created and {'attendance_record_id', 'student_id', 'status'} <= loaded.keys():
+        old_record_id = loaded['attendance_record_id']
+        if old_record_id == instance.attendance_record_id:
+            old_course_id = new_key[2]
+        else:
+            old_course_id = AttendanceRecord.objects.values_list('course_id', flat=True).get(pk=old_record_id)
+        old_key = (old_record_id, loaded['student_id'], old_course_id, loaded['status'])
+        if old_key != new_key:
+            apply_attendance_counts([old_key], -1)
+            apply_attendance_counts([new_key])
+    elif created:
+        apply_attendance_counts([new_key])
+    else:
+        # Saved without a known previous state, recompute its counters
+        AttendanceRecord.objects.rebuild_counts(pk=new_key[0])
+        AttendanceSummary.objects.rebuild(student_id=new_key[1], course_id=new_key[2])
+
+    instance.remember_loaded_values()
+
+def _deletion_started_at(origin, model):
+    """Return whether a deletion originated from ``model`` instances or querysets."""
+    return isinstance(origin, model) or (isinstance(origin, QuerySet) and origin.model is model)
+
+@receiver(post_delete, sender=StudentAttendance)
+def update_counters_on_delete(sender, instance, origin=None, **kwargs):
+    """Remove a single deleted attendance from its counters."""
+    # Queryset and record deletions adjust the counters in bulk
+    if _deletion_started_at(origin, StudentAttendance):
+        if not isinstance(origin, QuerySet):
+            apply_attendance_counts([_counter_key(instance)], -1)
+    elif not _deletion_started_at(origin, AttendanceRecord):
+        # Student and course deletions cascade to the summary rows themselves,
+        # but surviving records still count the attendance
+        AttendanceRecord.objects.apply_counts([(instance.attendance_record_id, instance.status)], -1)
+
+@receiver(pre_delete, sender=AttendanceRecord)
+def update_summary_on_record_delete(sender, instance, origin=None, **kwargs):
+    """Remove all attendances of a record that is about to be deleted."""
+    if _deletion_started_at(origin, AttendanceRecord):
+        AttendanceSummary.objects.apply(
+            ((student_id, instance.course_id, status)
+             for student_id, status in instance.student_attendances.values_list('student_id', 'status').order_by()),
+            -1,
+        )
+
+@receiver(post_save, sender=AttendanceRecord)
+def update_summary_on_course_change(sender, instance, created, raw=False, **kwargs):
+    """Move the counters of a record whose course was changed."""
+    loaded = getattr(instance, '_loaded_values', {})
+    if not raw and not created and 'course_id' in loaded and loaded['course_id'] != instance.course_id:
+        AttendanceSummary.objects.rebuild(course_id=loaded['course_id'])
+        AttendanceSummary.objects.rebuild(course_id=instance.course_id)
+    instance._loaded_values = {'course_id': instance.course_id}
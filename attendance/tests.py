@@ -1,3 +1,288 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from courses.models import Course, Enrollment
+from students.models import Student
+from .models import AttendanceRecord, AttendanceSummary, StudentAttendance
+from .services import capture_attendance
+
+
+def make_student(index):
+    user = User.objects.create_user(username=f'student{index}', password='pass', user_type='student')
+    return Student.objects.create(user=user, student_id=f'S{index}', gender='male')
+
+
+class AttendanceSummaryTests(TestCase):
+    """Tests for the incrementally maintained attendance summary."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(name='Physics', code='PHY101')
+        cls.students = [make_student(i) for i in range(3)]
+
+    def make_record(self, day=1, course=None):
+        return AttendanceRecord.objects.create(course=course or self.course, date=datetime.date(2025, 1, day))
+
+    def summary(self, student):
+        return AttendanceSummary.objects.get(student=student, course=self.course)
+
+    def assertSummaryMatchesSource(self):
+        expected = {
+            (s.student_id, s.course_id): (s.present, s.absent, s.late, s.excused)
+            for s in AttendanceSummary.objects.all()
+        }
+        AttendanceSummary.objects.rebuild()
+        rebuilt = {
+            (s.student_id, s.course_id): (s.present, s.absent, s.late, s.excused)
+            for s in AttendanceSummary.objects.all()
+        }
+        self.assertEqual({k: v for k, v in expected.items() if any(v)}, rebuilt)
+
+    def test_create_update_and_delete(self):
+        record = self.make_record()
+        attendance = StudentAttendance.objects.create(
+            attendance_record=record, student=self.students[0], status='present'
+        )
+        self.assertEqual(self.summary(self.students[0]).present, 1)
+
+        attendance = StudentAttendance.objects.get(pk=attendance.pk)
+        attendance.status = 'late'
+        attendance.save()
+        summary = self.summary(self.students[0])
+        self.assertEqual((summary.present, summary.late), (0, 1))
+
+        attendance.delete()
+        self.assertEqual(self.summary(self.students[0]).total, 0)
+
+    def test_bulk_operations(self):
+        records = [self.make_record(day) for day in (1, 2)]
+        StudentAttendance.objects.bulk_create([
+            StudentAttendance(attendance_record=record, student=student, status='present')
+            for record in records for student in self.students
+        ])
+        self.assertEqual(self.summary(self.students[1]).present, 2)
+
+        StudentAttendance.objects.filter(student=self.students[1]).update(status='absent')
+        summary = self.summary(self.students[1])
+        self.assertEqual((summary.present, summary.absent), (0, 2))
+
+        StudentAttendance.objects.filter(attendance_record=records[0]).delete()
+        self.assertEqual(self.summary(self.students[0]).present, 1)
+
+        records[1].delete()
+        self.assertEqual(self.summary(self.students[0]).total, 0)
+        self.assertSummaryMatchesSource()
+
+    def test_record_course_change_moves_counters(self):
+        other = Course.objects.create(name='Chemistry', code='CHE101')
+        record = self.make_record()
+        StudentAttendance.objects.create(attendance_record=record, student=self.students[0], status='excused')
+
+        record = AttendanceRecord.objects.get(pk=record.pk)
+        record.course = other
+        record.save()
+        self.assertEqual(AttendanceSummary.objects.totals(student=self.students[0], course=self.course)['excused'], 0)
+        self.assertEqual(AttendanceSummary.objects.totals(student=self.students[0], course=other)['excused'], 1)
+
+    def test_rebuild_command(self):
+        record = self.make_record()
+        StudentAttendance.objects.create(attendance_record=record, student=self.students[2], status='absent')
+        AttendanceSummary.objects.all().delete()
+
+        call_command('rebuild_attendance_summary', stdout=StringIO())
+        self.assertEqual(self.summary(self.students[2]).absent, 1)
+        self.assertEqual(AttendanceSummary.objects.totals(student=self.students[2])['absent'], 1)
+
+
+class AttendanceCaptureTests(TestCase):
+    """Tests and query-count benchmark for the bulk attendance capture service."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='teacher', password='pass', user_type='teacher')
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def enroll_class(self, size, code):
+        course = Course.objects.create(name=f'Course {code}', code=code)
+        users = User.objects.bulk_create([
+            User(username=f'{code}-{i}', user_type='student') for i in range(size)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=user, student_id=f'{code}-{i}', gender='female') for i, user in enumerate(users)
+        ])
+        Enrollment.objects.bulk_create([Enrollment(student=student, course=course) for student in students])
+        return course, students
+
+    def test_create_view_records_posted_marks(self):
+        course, students = self.enroll_class(3, 'BIO')
+        response = self.client.post(reverse('attendance_record_create'), {
+            'course': course.pk,
+            'date': '2025-02-03',
+            f'student_{students[0].pk}_status': 'absent',
+            f'student_{students[0].pk}_remarks': 'Sick',
+        })
+        self.assertRedirects(response, reverse('attendance_record_list'), fetch_redirect_response=False)
+
+        record = AttendanceRecord.objects.get(course=course)
+        self.assertEqual(record.student_attendances.count(), 3)
+        marked = record.student_attendances.get(student=students[0])
+        self.assertEqual((marked.status, marked.remarks), ('absent', 'Sick'))
+        self.assertEqual(AttendanceSummary.objects.totals(course=course)['present'], 2)
+
+    def test_update_view_seeds_roster_and_saves_changes(self):
+        course, students = self.enroll_class(2, 'ART')
+        record = AttendanceRecord.objects.create(course=course, date=datetime.date(2025, 2, 3))
+        response = self.client.get(reverse('update_attendance', args=[record.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(record.student_attendances.count(), 2)
+
+        formset = response.context['formset']
+        data = {
+            'student_attendances-TOTAL_FORMS': '2',
+            'student_attendances-INITIAL_FORMS': '2',
+        }
+        for i, form in enumerate(formset):
+            data[f'student_attendances-{i}-id'] = form.instance.pk
+            data[f'student_attendances-{i}-status'] = 'late' if i == 0 else 'present'
+            data[f'student_attendances-{i}-remarks'] = ''
+        response = self.client.post(reverse('update_attendance', args=[record.pk]), data)
+        self.assertRedirects(response, reverse('attendance_record_detail', args=[record.pk]), fetch_redirect_response=False)
+        self.assertEqual(record.student_attendances.filter(status='late').count(), 1)
+        self.assertEqual(AttendanceSummary.objects.totals(course=course)['late'], 1)
+
+    def test_query_count_is_constant_across_class_sizes(self):
+        query_counts = {}
+        for size in (5, 50, 300):
+            course, students = self.enroll_class(size, f'SIZE{size}')
+            record = AttendanceRecord.objects.create(course=course, date=datetime.date(2025, 2, 3))
+            marks = {student.pk: ('absent', '') for student in students[::2]}
+            with CaptureQueriesContext(connection) as queries:
+                capture_attendance(record, marks)
+            query_counts[size] = len(queries)
+            self.assertEqual(record.student_attendances.count(), size)
+        # Only the database's bound-parameter limit splits the inserts into
+        # extra batches; nothing grows per student
+        self.assertEqual(query_counts[5], query_counts[50], query_counts)
+        self.assertLessEqual(query_counts[300], query_counts[5] + 2, query_counts)
+
+
+class AttendanceRecordCounterTests(TestCase):
+    """Tests for the stored status counters on AttendanceRecord."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(name='History', code='HIS101')
+        cls.students = [make_student(i) for i in range(3)]
+
+    def counts(self, record):
+        record = AttendanceRecord.objects.get(pk=record.pk)
+        return (record.get_present_count(), record.get_absent_count(), record.get_late_count(), record.get_excused_count())
+
+    def test_counters_follow_attendance_changes(self):
+        record = AttendanceRecord.objects.create(course=self.course, date=datetime.date(2025, 3, 3))
+        StudentAttendance.objects.bulk_create([
+            StudentAttendance(attendance_record=record, student=student, status='present')
+            for student in self.students
+        ])
+        self.assertEqual(self.counts(record), (3, 0, 0, 0))
+
+        attendance = StudentAttendance.objects.get(attendance_record=record, student=self.students[0])
+        attendance.status = 'excused'
+        attendance.save()
+        StudentAttendance.objects.filter(student=self.students[1]).update(status='absent')
+        self.assertEqual(self.counts(record), (1, 1, 0, 1))
+
+        attendance.delete()
+        self.assertEqual(self.counts(record), (1, 1, 0, 0))
+
+        self.students[2].delete()
+        self.assertEqual(self.counts(record), (0, 1, 0, 0))
+
+    def test_bulk_create_rejects_conflict_handling(self):
+        record = AttendanceRecord.objects.create(course=self.course, date=datetime.date(2025, 3, 7))
+        StudentAttendance.objects.create(attendance_record=record, student=self.students[0], status='present')
+        for option in ('ignore_conflicts', 'update_conflicts'):
+            with self.assertRaises(ValueError):
+                StudentAttendance.objects.bulk_create(
+                    [StudentAttendance(attendance_record=record, student=self.students[0], status='present')],
+                    **{option: True},
+                )
+        self.assertEqual(self.counts(record), (1, 0, 0, 0))
+        self.assertEqual(AttendanceSummary.objects.get(student=self.students[0]).present, 1)
+
+    def test_stale_record_save_keeps_counters(self):
+        record = AttendanceRecord.objects.create(course=self.course, date=datetime.date(2025, 3, 4))
+        StudentAttendance.objects.create(attendance_record=record, student=self.students[0], status='late')
+        record.save()
+        self.assertEqual(self.counts(record), (0, 0, 1, 0))
+
+    def test_rebuild_counts_command(self):
+        record = AttendanceRecord.objects.create(course=self.course, date=datetime.date(2025, 3, 5))
+        StudentAttendance.objects.create(attendance_record=record, student=self.students[0], status='absent')
+        AttendanceRecord.objects.update(absent_count=0)
+
+        call_command('rebuild_attendance_counts', stdout=StringIO())
+        self.assertEqual(self.counts(record), (0, 1, 0, 0))
+
+    def test_detail_view_does_not_count_per_status(self):
+        teacher = User.objects.create_user(username='teacher', password='pass', user_type='teacher')
+        self.client.force_login(teacher)
+        record = AttendanceRecord.objects.create(course=self.course, date=datetime.date(2025, 3, 6))
+        StudentAttendance.objects.bulk_create([
+            StudentAttendance(attendance_record=record, student=student, status='present')
+            for student in self.students
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('attendance_record_detail', args=[record.pk]))
+        self.assertEqual(response.context['present_count'], 3)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+
+
+class AttendanceExportTests(TestCase):
+    """Tests for the CSV export of the attendance list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='teacher', password='pass', user_type='teacher')
+        cls.courses = [Course.objects.create(name=f'Course {i}', code=f'C{i}') for i in range(2)]
+        students = []
+        for i in range(3):
+            user = User.objects.create_user(username=f'student{i}', password='pass', user_type='student')
+            students.append(Student.objects.create(user=user, student_id=f'S{i}', gender='male'))
+        cls.student = students[0]
+        for course in cls.courses:
+            for day in (1, 2):
+                record = AttendanceRecord.objects.create(course=course, date=datetime.date(2025, 3, day))
+                StudentAttendance.objects.bulk_create([
+                    StudentAttendance(attendance_record=record, student=student, status='late')
+                    for student in students
+                ])
+
+    def test_exports_the_marks_of_the_filtered_records(self):
+        self.client.force_login(self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('attendance_record_list'), {
+                'course': self.courses[1].pk, 'start_date': '2025-03-02', 'export': 'csv',
+            })
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Date,Course code,Student ID,First name,Last name,Status,Remarks')
+        self.assertEqual(lines[1:], [f'2025-03-02,C1,S{i},,,late,' for i in range(3)])
+        # One query for the rows, whatever their number
+        self.assertEqual(len([q for q in queries if 'attendance_studentattendance' in q['sql']]), 1)
+
+        self.assertEqual(len(b''.join(self.client.get(
+            reverse('attendance_record_list'), {'export': 'csv'}
+        ).streaming_content).decode().splitlines()), 13)
 
-# Create your tests here.
+    def test_students_cannot_export(self):
+        self.client.force_login(self.student.user)
+        self.assertEqual(self.client.get(reverse('attendance_record_list'), {'export': 'csv'}).status_code, 403)
@@ -7,17 +7,32 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView, D
 
 from .forms import AttendanceRecordForm, StudentAttendanceFormSet, AttendanceFilterForm
 from .mixins import TeacherOrAdminRequiredMixin
-from .models import AttendanceRecord, StudentAttendance
-from courses.models import Course, Enrollment
-from students.models import Student
+from .models import AttendanceRecord, AttendanceSummary, StudentAttendance
+from .services import capture_attendance, get_roster, marks_from_post, update_attendance_marks
+from courses.models import Course
+from accounts.middleware import get_profile_or_404
 from students.views import AdminRequiredMixin
+from institute_management.exports import CsvExportMixin
+from institute_management.pagination import KeysetPaginationMixin
 
-class AttendanceRecordListView(LoginRequiredMixin, ListView):
+class AttendanceRecordListView(LoginRequiredMixin, CsvExportMixin, KeysetPaginationMixin, ListView):
     """View to list all attendance records."""
     model = AttendanceRecord
     template_name = 'attendance/attendance_record_list.html'
     context_object_name = 'attendance_records'
     paginate_by = 10
+    count_strategy = 'cached'
+    # The export has a row per student mark of the listed records
+    export_filename = 'attendance'
+    export_fields = (
+        ('Date', 'attendance_record__date'),
+        ('Course code', 'attendance_record__course__code'),
+        ('Student ID', 'student__student_id'),
+        ('First name', 'student__user__first_name'),
+        ('Last name', 'student__user__last_name'),
+        ('Status', 'status'),
+        ('Remarks', 'remarks'),
+    )
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -37,18 +52,28 @@ class AttendanceRecordListView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['filter_form'] = AttendanceFilterForm(self.request.GET)
-        context['courses'] = Course.objects.all()
         return context
 
+    def can_export(self):
+        # Marks of every student, unlike the list itself
+        return self.request.user.is_admin or self.request.user.is_teacher
+
+    def get_export_queryset(self):
+        # Follows the (attendance_record, student) unique index
+        return StudentAttendance.objects.filter(
+            attendance_record__in=self.get_queryset().values('pk')
+        ).order_by('attendance_record_id', 'student_id')
+
 class AttendanceRecordDetailView(LoginRequiredMixin, DetailView):
     """View to display attendance record details."""
     model = AttendanceRecord
     template_name = 'attendance/attendance_record_detail.html'
     context_object_name = 'attendance_record'
+    queryset = AttendanceRecord.objects.select_related('course')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['student_attendances'] = self.object.student_attendances.all()
+        context['student_attendances'] = self.object.student_attendances.select_related('student__user')
         context['present_count'] = self.object.get_present_count()
         context['absent_count'] = self.object.get_absent_count()
         context['late_count'] = self.object.get_late_count()
@@ -90,11 +115,9 @@ class AttendanceRecordCreateView(LoginRequiredMixin, TeacherOrAdminRequiredMixin
         if course_id:
             try:
                 course = Course.objects.get(pk=course_id)
-                # Get all active enrollments for this course
-                enrollments = Enrollment.objects.filter(course=course, status='active')
-                # Create a list of student data for the template
+                # Get all active enrollments for this course with students joined in
                 students = []
-                for enrollment in enrollments:
+                for enrollment in get_roster(course):
                     students.append({
                         'id': enrollment.student.id,
                         'name': enrollment.student.user.get_full_name(),
@@ -111,28 +134,8 @@ class AttendanceRecordCreateView(LoginRequiredMixin, TeacherOrAdminRequiredMixin
         # Save the attendance record
         self.object = form.save()
 
-        # Get all students enrolled in the course
-        enrollments = Enrollment.objects.filter(
-            course=self.object.course,
-            status='active'
-        )
-
-        # Create attendance entries for each enrolled student
-        for enrollment in enrollments:
-            # Check if status was provided in the form
-            student_id = str(enrollment.student.id)
-            status_key = f'student_{student_id}_status'
-            remarks_key = f'student_{student_id}_remarks'
-
-            status = self.request.POST.get(status_key, 'present')
-            remarks = self.request.POST.get(remarks_key, '')
-
-            StudentAttendance.objects.create(
-                attendance_record=self.object,
-                student=enrollment.student,
-                status=status,
-                remarks=remarks
-            )
+        # Create attendance entries for every enrolled student in one bulk insert
+        capture_attendance(self.object, marks_from_post(self.request.POST))
 
         return redirect(self.get_success_url())
 
@@ -142,28 +145,20 @@ def update_attendance(request, pk):
     # Check if user is admin or teacher
     if not (request.user.is_admin or request.user.is_teacher):
         return redirect('dashboard')
-    attendance_record = get_object_or_404(AttendanceRecord, pk=pk)
+    attendance_record = get_object_or_404(AttendanceRecord.objects.select_related('course'), pk=pk)
+    attendances = StudentAttendance.objects.select_related('student__user')
 
     if request.method == 'POST':
-        formset = StudentAttendanceFormSet(request.POST, instance=attendance_record)
+        formset = StudentAttendanceFormSet(request.POST, instance=attendance_record, queryset=attendances)
         if formset.is_valid():
-            formset.save()
+            update_attendance_marks(form.instance for form in formset if form.has_changed())
             return redirect('attendance_record_detail', pk=attendance_record.pk)
     else:
         # If no student attendances exist, create them for all enrolled students
-        if attendance_record.student_attendances.count() == 0:
-            enrollments = Enrollment.objects.filter(
-                course=attendance_record.course,
-                status='active'
-            )
-            for enrollment in enrollments:
-                StudentAttendance.objects.create(
-                    attendance_record=attendance_record,
-                    student=enrollment.student,
-                    status='present'  # Default status
-                )
-
-        formset = StudentAttendanceFormSet(instance=attendance_record)
+        if not attendance_record.student_attendances.exists():
+            capture_attendance(attendance_record)
+
+        formset = StudentAttendanceFormSet(instance=attendance_record, queryset=attendances)
 
     return render(request, 'attendance/update_attendance.html', {
         'attendance_record': attendance_record,
@@ -184,23 +179,23 @@ class StudentAttendanceReportView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         if self.request.user.is_student:
-            student = get_object_or_404(Student, user=self.request.user)
+            student = get_profile_or_404(self.request)
             return StudentAttendance.objects.filter(student=student)
         return StudentAttendance.objects.none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.user.is_student:
-            student = get_object_or_404(Student, user=self.request.user)
+            student = get_profile_or_404(self.request)
             context['student'] = student
 
-            # Calculate attendance statistics
-            attendances = StudentAttendance.objects.filter(student=student)
-            total = attendances.count()
-            present = attendances.filter(status='present').count()
-            absent = attendances.filter(status='absent').count()
-            late = attendances.filter(status='late').count()
-            excused = attendances.filter(status='excused').count()
+            # Read attendance statistics from the per-course summary rows
+            stats = AttendanceSummary.objects.totals(student=student)
+            present = stats['present']
+            absent = stats['absent']
+            late = stats['late']
+            excused = stats['excused']
+            total = present + absent + late + excused
 
             context['total'] = total
             context['present'] = present
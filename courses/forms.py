@@ -1,4 +1,6 @@
 from django import forms
+from django.urls import reverse_lazy
+from institute_management.autocomplete import AutocompleteWidget
 from .models import Course, Enrollment, Schedule
 
 class CourseForm(forms.ModelForm):
@@ -46,6 +48,10 @@ class EnrollmentForm(forms.ModelForm):
     class Meta:
         model = Enrollment
         fields = ['student', 'course', 'status', 'grade']
+        widgets = {
+            'student': AutocompleteWidget(reverse_lazy('student_autocomplete')),
+            'course': AutocompleteWidget(reverse_lazy('course_autocomplete')),
+        }
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -1,7 +1,22 @@
 from django.db import models
+from django.db.models.functions import Lower
+from institute_management.search import prefix_q
 from teachers.models import Teacher
 from students.models import Student
 
+class CourseQuerySet(models.QuerySet):
+    """
+    QuerySet with the course lookup used by autocompletion.
+    """
+    def search(self, term):
+        """Filter to courses whose code or name starts with ``term``, ignoring case."""
+        term = term.strip().lower()
+        if not term:
+            return self
+        return self.alias(code_lower=Lower('code'), name_lower=Lower('name')).filter(
+            prefix_q('code_lower', term) | prefix_q('name_lower', term)
+        )
+
 class Course(models.Model):
     """
     Model for storing course information.
@@ -14,11 +29,18 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} ({self.code})"
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Case-insensitive prefix lookups of the course autocomplete
+            models.Index(Lower('code'), name='course_code_lower_idx'),
+            models.Index(Lower('name'), name='course_name_lower_idx'),
+        ]
 
 class Enrollment(models.Model):
     """
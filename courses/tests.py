@@ -1,3 +1,317 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from attendance.models import AttendanceRecord, StudentAttendance
+from institute_management.pagination import KeysetPaginator
+from institute_management.query_profiler import logger as query_logger, normalize_sql
+from students.models import Student
+from teachers.models import Teacher
+from .forms import EnrollmentForm
+from .models import Course, Enrollment
+from .views import CourseDetailView, CourseListView
+
+
+class KeysetPaginationTests(TestCase):
+    """Tests for keyset pagination of the list views."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated names make the primary key tiebreaker matter
+        Course.objects.bulk_create([Course(name=f'Course {i % 4}', code=f'C{i:02}') for i in range(23)])
+        cls.courses = list(Course.objects.order_by('name', 'pk'))
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, paginator):
+        page = paginator.page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.page(page.next_page_number(), page.next_cursor)
+            pages.append(page)
+        return pages
+
+    def test_cursors_walk_every_row_once_in_order(self):
+        paginator = KeysetPaginator(Course.objects.all(), 5)
+        pages = self.walk(paginator)
+        self.assertEqual([page.number for page in pages], [1, 2, 3, 4, 5])
+        self.assertEqual([course for page in pages for course in page], self.courses)
+
+        page = pages[-1]
+        previous = []
+        while page.has_previous():
+            page = paginator.page(page.previous_page_number(), page.previous_cursor)
+            previous.append((page.number, list(page)))
+        self.assertEqual(previous, [(page.number, list(page)) for page in reversed(pages[:-1])])
+
+    def test_seek_queries_do_not_offset_or_count(self):
+        paginator = KeysetPaginator(Course.objects.all(), 5)
+        cursor = paginator.page(3).next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            page = KeysetPaginator(Course.objects.all(), 5).page(4, cursor)
+        self.assertEqual(list(page), self.courses[15:20])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_numbered_links_seek_from_the_current_page(self):
+        paginator = KeysetPaginator(Course.objects.all(), 3)
+        page = self.walk(paginator)[3]
+        self.assertEqual([number for number, cursor in page.page_links], [2, 3, 4, 5, 6])
+        for number, cursor in page.page_links:
+            if number == page.number:
+                continue
+            with CaptureQueriesContext(connection) as queries:
+                linked = KeysetPaginator(Course.objects.all(), 3).page(number, cursor)
+            self.assertEqual((linked.number, list(linked)), (number, self.courses[(number - 1) * 3:number * 3]))
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('COUNT(', queries[0]['sql'])
+
+        # The window ends at the last page
+        last = KeysetPaginator(Course.objects.all(), 3).page('last')
+        self.assertEqual([number for number, cursor in last.page_links], [6, 7, 8])
+
+        # Without a seekable ordering, the links go by number
+        page = KeysetPaginator(Course.objects.order_by('?'), 3).page(2)
+        self.assertEqual(page.page_links, [(1, ''), (2, ''), (3, ''), (4, '')])
+
+    def test_last_page_is_read_in_reverse(self):
+        paginator = KeysetPaginator(Course.objects.all(), 5)
+        paginator.count
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.page('last')
+        self.assertEqual((page.number, list(page)), (5, self.courses[20:]))
+        self.assertFalse(page.has_next())
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+        previous = paginator.page(page.previous_page_number(), page.previous_cursor)
+        self.assertEqual((previous.number, list(previous)), (4, self.courses[15:20]))
+
+    def test_estimated_count_reads_sqlite_statistics(self):
+        paginator = KeysetPaginator(Course.objects.all(), 5, count_strategy='estimate')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(paginator.count, 23)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+        # Filtered querysets have no estimate
+        self.assertEqual(KeysetPaginator(Course.objects.filter(name='Course 0'), 5, count_strategy='estimate').count, 6)
+
+    def test_related_ordering_uses_the_joined_values(self):
+        users = User.objects.bulk_create([
+            User(username=f'student{i}', first_name=f'Name {i % 3}', user_type='student') for i in range(7)
+        ])
+        Student.objects.bulk_create([Student(user=user, student_id=f'S{i}', gender='other') for i, user in enumerate(users)])
+        expected = list(Student.objects.order_by('user__first_name', 'user__last_name', 'pk'))
+        pages = self.walk(KeysetPaginator(Student.objects.all(), 3))
+        self.assertEqual([student for page in pages for student in page], expected)
+
+    def test_cached_count_is_reused(self):
+        KeysetPaginator(Course.objects.all(), 5, count_strategy='cached').count
+        with self.assertNumQueries(0):
+            self.assertEqual(KeysetPaginator(Course.objects.all(), 5, count_strategy='cached').num_pages, 5)
+
+    def test_list_view_follows_cursor_links(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('course_list'))
+        page = response.context['page_obj']
+        self.assertContains(response, f'cursor={page.next_cursor}')
+        self.assertContains(response, '?page=last')
+
+        response = self.client.get(reverse('course_list'), {'page': 2, 'cursor': page.next_cursor})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertEqual(list(response.context['courses']), self.courses[10:20])
+
+        # A tampered cursor falls back to the page number
+        response = self.client.get(reverse('course_list'), {'page': 3, 'cursor': 'bogus'})
+        self.assertEqual(list(response.context['courses']), self.courses[20:])
+        self.assertEqual(self.client.get(reverse('course_list'), {'page': 'x'}).status_code, 404)
+
+        response = self.client.get(reverse('course_list'), {'page': 'last'})
+        self.assertEqual(list(response.context['courses']), self.courses[20:])
+
+
+class AutocompleteTests(TestCase):
+    """Tests for the autocomplete endpoints and the enrollment form using them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+        users = User.objects.bulk_create([
+            User(username=f'student{i}', first_name='Dana', last_name=f'Reed{i}', user_type='student') for i in range(30)
+        ])
+        cls.students = Student.objects.bulk_create([
+            Student(user=user, student_id=f'S{i:03}', gender='other') for i, user in enumerate(users)
+        ])
+        cls.course = Course.objects.create(name='Geography', code='GEO101')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_endpoints_return_capped_prefix_matches(self):
+        response = self.client.get(reverse('student_autocomplete'), {'q': 'dana'})
+        self.assertEqual(len(response.json()['results']), 20)
+        response = self.client.get(reverse('student_autocomplete'), {'q': 's029'})
+        self.assertEqual(response.json()['results'], [{'id': self.students[29].pk, 'text': str(self.students[29])}])
+        response = self.client.get(reverse('course_autocomplete'), {'q': 'geo'})
+        self.assertEqual(response.json()['results'], [{'id': self.course.pk, 'text': 'Geography (GEO101)'}])
+        self.assertEqual(self.client.get(reverse('course_autocomplete')).json(), {'results': []})
+
+    def test_form_renders_without_listing_choices(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('enrollment_create'))
+        self.assertNotContains(response, '<option value="%s"' % self.students[0].pk)
+        self.assertFalse([q for q in queries if 'FROM "students_student"' in q['sql']])
+
+        form = EnrollmentForm(instance=Enrollment(student=self.students[3], course=self.course))
+        self.assertIn('value="Dana Reed3 (S003)"', str(form['student']))
+
+    def test_validation_looks_up_only_the_submitted_pk(self):
+        form = EnrollmentForm({'student': self.students[5].pk, 'course': self.course.pk, 'status': 'active'})
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(form.is_valid(), form.errors)
+        student_queries = [q['sql'] for q in queries if 'FROM "students_student"' in q['sql']]
+        # The form field and the model's foreign key check each fetch one row by pk
+        self.assertTrue(student_queries)
+        for sql in student_queries:
+            self.assertRegex(sql, r'WHERE "students_student"."id" = \d+ LIMIT')
+
+
+class QueryProfilerTests(TestCase):
+    """Tests for the per-request query profiler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+        for i in range(4):
+            Course.objects.create(name=f'Course {i}', code=f'C{i}')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql('SELECT * FROM t WHERE a IN (%s, %s, %s) AND b = 10 AND c = \'x\' LIMIT 21'),
+            'SELECT * FROM t WHERE a IN (...) AND b = ? AND c = ? LIMIT ?',
+        )
+        self.assertEqual(normalize_sql('SELECT 1 WHERE a IN (%s)'), normalize_sql('SELECT 1 WHERE a IN (%s, %s)'))
+
+    def test_off_without_the_header(self):
+        response = self.client.get(reverse('course_list'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_header_is_only_honoured_for_admins(self):
+        student = User.objects.create_user(username='student', password='pass', user_type='student')
+        self.client.force_login(student)
+        response = self.client.get(reverse('student_enrollments'), headers={'X-Profile-Queries': '1'})
+        self.assertNotIn('Server-Timing', response)
+
+    def test_flags_lazy_relation_loops_with_their_template_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file = os.path.join(directory, 'queries.jsonl')
+            handlers = query_logger.handlers[:]
+            query_logger.handlers.clear()
+            try:
+                # Without its prefetching the course list queries teachers per row
+                with override_settings(QUERY_PROFILER_LOG_FILE=log_file), \
+                        mock.patch.object(CourseListView, 'get_queryset', lambda view: Course.objects.all()):
+                    # Middleware are instantiated per test client handler
+                    self.client.handler.load_middleware()
+                    response = self.client.get(reverse('course_list'), headers={'X-Profile-Queries': '1'})
+                for handler in query_logger.handlers:
+                    handler.close()
+            finally:
+                query_logger.handlers[:] = handlers
+            with open(log_file) as file:
+                entries = [json.loads(line) for line in file]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertEqual(len(entries), 1)
+        entry = entries[0]
+        self.assertEqual(entry['path'], reverse('course_list'))
+        self.assertGreaterEqual(entry['queries'], 4)
+        suspects = [suspect for suspect in entry['n_plus_one'] if suspect['count'] >= 4]
+        self.assertTrue(suspects)
+        self.assertTrue(any(suspect['template'].startswith('courses/course_list.html:') for suspect in suspects))
+        self.assertIn('N+1 suspects, worst', response['Server-Timing'])
+
+
+class CourseViewQueryTests(TestCase):
+    """Query-count tests for the course list and detail views."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+        cls.course = Course.objects.create(name='Algebra', code='ALG')
+        cls.count = 0
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def grow(self, courses=2, teachers=2, students=3, records=2):
+        """Add courses to the list and teachers, students and attendance to ``self.course``."""
+        start = self.count
+        self.count += max(courses, teachers, students, records)
+        numbers = range(start, self.count)
+        Course.objects.bulk_create([Course(name=f'Course {i}', code=f'C{i}') for i in numbers[:courses]])
+        users = User.objects.bulk_create(
+            [User(username=f'teacher{i}', first_name='T', user_type='teacher') for i in numbers[:teachers]]
+            + [User(username=f'student{i}', first_name='S', user_type='student') for i in numbers[:students]]
+        )
+        self.course.teachers.add(*Teacher.objects.bulk_create([
+            Teacher(user=user, teacher_id=user.username, gender='female') for user in users[:teachers]
+        ]))
+        students = Student.objects.bulk_create([
+            Student(user=user, student_id=user.username, gender='male') for user in users[teachers:]
+        ])
+        Enrollment.objects.bulk_create([Enrollment(student=student, course=self.course) for student in students])
+        for i in numbers[:records]:
+            record = AttendanceRecord.objects.create(course=self.course, date=datetime.date(2025, 1, 1) + datetime.timedelta(i))
+            StudentAttendance.objects.bulk_create([
+                StudentAttendance(attendance_record=record, student=student) for student in Student.objects.all()
+            ])
+
+    def query_count(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_list_query_count_does_not_grow(self):
+        self.grow()
+        before, response = self.query_count(reverse('course_list'))
+        self.assertContains(response, '<td>3</td>')
+        self.grow(courses=5, teachers=4, students=6)
+        after, response = self.query_count(reverse('course_list'))
+        self.assertEqual(before, after)
+        self.assertContains(response, '<td>9</td>')
+
+    def test_detail_query_count_does_not_grow(self):
+        url = reverse('course_detail', args=[self.course.pk])
+        # Enough students for a second roster page both times
+        self.grow(students=26)
+        before, response = self.query_count(url)
+        self.grow(teachers=4, students=7, records=6)
+        after, response = self.query_count(url)
+        self.assertEqual(before, after)
+
+        stats = response.context['enrollment_stats']
+        self.assertEqual(stats['total'], 33)
+        self.assertEqual(stats['active'], 33)
+        self.assertEqual(len(response.context['enrollments']), CourseDetailView.roster_size)
+        self.assertEqual(len(response.context['recent_attendance']), 5)
+        self.assertContains(response, '<span class="value">33</span>')
+
+        roster = response.context['roster']
+        second = self.client.get(url, {'roster_page': 2, 'roster_cursor': roster.next_cursor})
+        self.assertEqual(len(second.context['enrollments']), 33 - CourseDetailView.roster_size)
@@ -1,32 +1,73 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import InvalidPage
 from django.db import transaction
+from django.db.models import Count, Prefetch, Q
 from django.forms import inlineformset_factory
+from django.http import Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 
 from .forms import CourseForm, ScheduleForm, EnrollmentForm, EnrollmentUpdateForm
 from .models import Course, Schedule, Enrollment
-from students.models import Student
+from accounts.middleware import get_profile_or_404
 from students.views import AdminRequiredMixin
+from institute_management.autocomplete import AutocompleteView
+from institute_management.exports import CsvExportMixin
+from institute_management.pagination import KeysetPaginationMixin, KeysetPaginator
+from teachers.models import Teacher
 
-class CourseListView(LoginRequiredMixin, ListView):
+def teachers_with_users():
+    """Prefetch of a course's teachers along with their user accounts."""
+    return Prefetch('teachers', queryset=Teacher.objects.select_related('user'))
+
+class CourseListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """View to list all courses."""
     model = Course
     template_name = 'courses/course_list.html'
     context_object_name = 'courses'
     paginate_by = 10
 
+    def get_queryset(self):
+        # Counted and prefetched per page, so the rows don't each query the
+        # enrollments and teachers
+        return super().get_queryset().annotate(
+            enrollment_count=Count('enrollments'),
+        ).prefetch_related(teachers_with_users())
+
 class CourseDetailView(LoginRequiredMixin, DetailView):
-    """View to display course details."""
+    """View to display course details with a paginated enrollment roster."""
     model = Course
     template_name = 'courses/course_detail.html'
     context_object_name = 'course'
+    roster_size = 25
+    recent_attendance_size = 5
+
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related(teachers_with_users())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['schedules'] = self.object.schedules.all()
-        context['enrollments'] = self.object.enrollments.all()
+
+        enrollments = self.object.enrollments.all()
+        context['enrollment_stats'] = enrollments.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(status='active')),
+            completed=Count('pk', filter=Q(status='completed')),
+            dropped=Count('pk', filter=Q(status='dropped')),
+        )
+        paginator = KeysetPaginator(enrollments.select_related('student__user'), self.roster_size)
+        number = self.request.GET.get('roster_page') or 1
+        try:
+            roster = paginator.page(number, self.request.GET.get('roster_cursor'))
+        except InvalidPage as e:
+            raise Http404(f'Invalid page ({number}): {e}')
+        context['roster'] = roster
+        context['enrollments'] = roster.object_list
+
+        # Records carry their attendance counts, so no per-record counting
+        context['recent_attendance'] = self.object.attendance_records.all()[:self.recent_attendance_size]
         return context
 
 class CourseCreateView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
@@ -99,12 +140,24 @@ class CourseDeleteView(LoginRequiredMixin, AdminRequiredMixin, DeleteView):
     template_name = 'courses/course_confirm_delete.html'
     success_url = reverse_lazy('course_list')
 
-class EnrollmentListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class EnrollmentListView(LoginRequiredMixin, AdminRequiredMixin, CsvExportMixin, KeysetPaginationMixin, ListView):
     """View to list all enrollments."""
     model = Enrollment
     template_name = 'courses/enrollment_list.html'
     context_object_name = 'enrollments'
     paginate_by = 10
+    count_strategy = 'cached'
+    export_filename = 'enrollments'
+    export_fields = (
+        ('Student ID', 'student__student_id'),
+        ('First name', 'student__user__first_name'),
+        ('Last name', 'student__user__last_name'),
+        ('Course code', 'course__code'),
+        ('Course', 'course__name'),
+        ('Enrollment date', 'enrollment_date'),
+        ('Status', 'status'),
+        ('Grade', 'grade'),
+    )
 
 class EnrollmentCreateView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
     """View to create a new enrollment."""
@@ -134,6 +187,11 @@ class StudentEnrollmentListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         if self.request.user.is_student:
-            student = get_object_or_404(Student, user=self.request.user)
+            student = get_profile_or_404(self.request)
             return Enrollment.objects.filter(student=student)
-        return Enrollment.objects.none()
\ No newline at end of file
+        return Enrollment.objects.none()
+
+class CourseAutocompleteView(LoginRequiredMixin, AutocompleteView):
+    """JSON lookup of courses for autocomplete fields."""
+    def search(self, term):
+        return Course.objects.search(term)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        # Invalidate cached dashboard stats when the underlying data changes
+        from .signals import connect_signals
+        connect_signals()
@@ -0,0 +1,108 @@
+import datetime
+import json
+import re
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from accounts.models import User
+from institute_management.benchmark import EndpointBenchmark, compare, discover_endpoints, role_users
+from institute_management.seeding import PREFIX, InstituteSeeder
+
+
+class Command(BaseCommand):
+    help = 'Measure the latency, queries and response size of every page as each role.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per endpoint and role.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Concurrent clients per endpoint.')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed requests before measuring.')
+        parser.add_argument('--roles', nargs='+', choices=['admin', 'teacher', 'student'],
+                            help='Only log in as these roles.')
+        parser.add_argument('--include', help='Only endpoints whose URL name matches this regular expression.')
+        parser.add_argument('--seed-students', type=int, default=0,
+                            help='Seed a synthetic institute with this many students first, unless one exists.')
+        parser.add_argument('--output', help='Save the results as JSON to this file.')
+        parser.add_argument('--compare', help='JSON results of an earlier run to check for regressions.')
+        parser.add_argument('--threshold', type=float, default=20,
+                            help='Allowed p95 growth in percent before a view counts as regressed.')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Ignore p95 changes smaller than this many milliseconds.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as file:
+                    baseline = json.load(file)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Could not read {options["compare"]}: {e}')
+
+        if options['seed_students'] and not User.objects.filter(username__startswith=f'{PREFIX}_').exists():
+            self.stdout.write(f'Seeding {options["seed_students"]} students...')
+            InstituteSeeder(students=options['seed_students']).run()
+
+        endpoints = discover_endpoints()
+        if options['include']:
+            endpoints = [(name, path) for name, path in endpoints if re.search(options['include'], name)]
+        users = role_users()
+        if options['roles']:
+            users = {role: user for role, user in users.items() if role in options['roles']}
+
+        def progress(key, result):
+            self.stdout.write(
+                f'{key:<45} p50 {result["p50_ms"]:>8.1f}ms  p95 {result["p95_ms"]:>8.1f}ms  '
+                f'p99 {result["p99_ms"]:>8.1f}ms  {result["queries"]:>4} queries  {result["bytes"]:>8} bytes'
+            )
+
+        benchmark = EndpointBenchmark(
+            endpoints, users,
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+        )
+        # The test client's host name must be accepted
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            results, skipped = benchmark.run(progress=progress)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({
+                    'commit': self.git_commit(),
+                    'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    'options': {key: options[key] for key in ('requests', 'concurrency', 'warmup')},
+                    'results': results,
+                    'skipped': skipped,
+                }, file, indent=2)
+        failed = sorted(key for key, status in skipped.items() if status >= 500)
+        for key in failed:
+            self.stderr.write(f'{key} failed with status {skipped[key]}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Measured {len(results)} endpoints, {len(failed)} failed, '
+            f'{len(skipped) - len(failed)} skipped as not allowed for the role.'
+        ))
+
+        if baseline is not None:
+            # Compare only what --roles/--include selected; a baseline view
+            # missing from this run otherwise counts as a regression
+            baseline = {
+                key: before for key, before in baseline.items()
+                if before.get('role') in users
+                and (not options['include'] or re.search(options['include'], before.get('name', '')))
+            }
+            regressions = compare(results, baseline, options['threshold'], options['min_delta_ms'], skipped)
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["compare"]}.')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}.'))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR,
+            ).stdout.strip() or None
+        except OSError:
+            return None
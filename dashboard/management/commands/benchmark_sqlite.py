@@ -0,0 +1,59 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from institute_management.benchmark import WriterBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent writer throughput on a scratch SQLite database with '
+        "SQLite's defaults and with the configured SQLITE_PRAGMAS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Concurrent writer threads.')
+        parser.add_argument('--readers', type=int, default=2, help='Concurrent reader threads.')
+        parser.add_argument('--transactions', type=int, default=200, help='Transactions per writer.')
+        parser.add_argument('--rows', type=int, default=30, help='Rows inserted per transaction.')
+        parser.add_argument('--directory', help='Where to create the scratch database; a temporary directory by default.')
+        parser.add_argument('--output', help='Save the results as JSON to this file.')
+
+    def handle(self, *args, **options):
+        tuned_mode = settings.DATABASES['default'].get('OPTIONS', {}).get('transaction_mode') or 'DEFERRED'
+        variants = [
+            ('defaults', {}, 'DEFERRED'),
+            ('tuned', settings.SQLITE_PRAGMAS, tuned_mode),
+        ]
+        results = {}
+        with tempfile.TemporaryDirectory(dir=options['directory']) as directory:
+            for name, pragmas, transaction_mode in variants:
+                try:
+                    benchmark = WriterBenchmark(
+                        os.path.join(directory, f'{name}.sqlite3'), pragmas, transaction_mode,
+                        writers=options['writers'],
+                        readers=options['readers'],
+                        transactions=options['transactions'],
+                        rows=options['rows'],
+                    )
+                except ValueError as e:
+                    raise CommandError(e)
+                result = results[name] = benchmark.run()
+                self.stdout.write(
+                    f'{name:<9} {result["transactions_per_second"]:>8} tx/s  {result["errors"]:>5} locked  '
+                    f'p50 {result["p50_ms"]:>8.2f}ms  p95 {result["p95_ms"]:>8.2f}ms  '
+                    f'max {result["max_ms"]:>8.2f}ms  {result["reads_per_second"]:>8} reads/s'
+                )
+
+        before, after = results['defaults'], results['tuned']
+        if before['transactions_per_second']:
+            speedup = after['transactions_per_second'] / before['transactions_per_second']
+            self.stdout.write(f'Writer throughput x{speedup:.2f} with the tuning.')
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump({'options': {key: options[key] for key in ('writers', 'readers', 'transactions', 'rows')},
+                           'pragmas': settings.SQLITE_PRAGMAS, 'transaction_mode': tuned_mode,
+                           'results': results}, file, indent=2)
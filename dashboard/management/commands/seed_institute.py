@@ -0,0 +1,56 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from institute_management.seeding import PREFIX, InstituteSeeder
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a deterministic synthetic institute for load and scale testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Number of students.')
+        parser.add_argument('--teachers', type=int, default=50, help='Number of teachers.')
+        parser.add_argument('--courses', type=int, default=40, help='Number of courses.')
+        parser.add_argument('--courses-per-student', type=int, default=4, help='Enrollments of each student.')
+        parser.add_argument('--terms', type=int, default=2, help='Terms of attendance and invoices.')
+        parser.add_argument('--term-weeks', type=int, default=12, help='Weeks of classes per term.')
+        parser.add_argument('--start', default='2024-01-01', help='First day of the first term (YYYY-MM-DD).')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--password', default='password', help='Password of every generated user.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per INSERT batch.')
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.date.fromisoformat(options['start'])
+        except ValueError:
+            raise CommandError('--start must be a date in YYYY-MM-DD format.')
+        if User.objects.filter(username__startswith=f'{PREFIX}_').exists():
+            raise CommandError('The database already holds seeded data; seed an empty database instead.')
+
+        def progress(model, count):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{model}: {count} rows')
+
+        seeder = InstituteSeeder(
+            students=options['students'],
+            teachers=options['teachers'],
+            courses=options['courses'],
+            terms=options['terms'],
+            term_weeks=options['term_weeks'],
+            courses_per_student=options['courses_per_student'],
+            start=start,
+            seed=options['seed'],
+            password=options['password'],
+            chunk_size=options['chunk_size'],
+            progress=progress,
+        )
+        started = time.perf_counter()
+        counts = seeder.run()
+        elapsed = time.perf_counter() - started
+
+        for model, count in counts.items():
+            self.stdout.write(f'{model}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Seeded {sum(counts.values())} rows in {elapsed:.1f}s.'))
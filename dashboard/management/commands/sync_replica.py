@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from institute_management.replica import snapshot
+
+
+class Command(BaseCommand):
+    help = 'Copy the default SQLite database to the read replica file, once or every --interval seconds.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help='Replica file; DATABASE_REPLICA_PATH by default.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep copying every this many seconds instead of once.')
+
+    def handle(self, *args, **options):
+        source = settings.DATABASES['default']
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Only SQLite databases can be copied; replicate other databases with their own tools.')
+        target = options['target'] or settings.REPLICA_DATABASE_PATH
+        if not target:
+            raise CommandError('Set DATABASE_REPLICA_PATH or pass --target.')
+
+        while True:
+            started = time.perf_counter()
+            snapshot(str(source['NAME']), target)
+            self.stdout.write(f'Copied {source["NAME"]} to {target} in {time.perf_counter() - started:.2f}s.')
+            if not options['interval']:
+                break
+            time.sleep(max(0.0, options['interval'] - (time.perf_counter() - started)))
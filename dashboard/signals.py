@@ -0,0 +1,37 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from accounts.models import people_imported
+from students.models import Student
+from teachers.models import Teacher
+from courses.models import Course, Enrollment
+from attendance.models import AttendanceSummary, attendance_counts_changed
+from fees.models import FeeInvoice, Payment, fee_totals_changed
+from .stats import invalidate
+
+# Model changes that invalidate each cached stat family
+FAMILY_SENDERS = {
+    'people': [Student, Teacher, Course, Enrollment],
+    'fees': [FeeInvoice, Payment],
+    'attendance': [AttendanceSummary],
+}
+
+
+def invalidate_on_commit(family, **kwargs):
+    """Invalidate a stat family once the change is committed and visible."""
+    transaction.on_commit(partial(invalidate, family))
+
+def connect_signals():
+    for family, senders in FAMILY_SENDERS.items():
+        receiver = partial(invalidate_on_commit, family)
+        for sender in senders:
+            post_save.connect(receiver, sender=sender, weak=False, dispatch_uid=f'dashboard-{family}-{sender.__name__}-save')
+            post_delete.connect(receiver, sender=sender, weak=False, dispatch_uid=f'dashboard-{family}-{sender.__name__}-delete')
+
+    attendance_counts_changed.connect(
+        partial(invalidate_on_commit, 'attendance'), weak=False, dispatch_uid='dashboard-attendance-counts'
+    )
+    fee_totals_changed.connect(partial(invalidate_on_commit, 'fees'), weak=False, dispatch_uid='dashboard-fee-totals')
+    people_imported.connect(partial(invalidate_on_commit, 'people'), weak=False, dispatch_uid='dashboard-people-imported')
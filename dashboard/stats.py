@@ -0,0 +1,109 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Sum
+
+from students.models import Student
+from teachers.models import Teacher
+from courses.models import Course, Enrollment
+from attendance.models import AttendanceSummary
+from fees.models import FeeInvoice, Payment
+from institute_management.replica import reading_from_replica
+
+
+def people_counts():
+    """Headcounts shown on the admin dashboard."""
+    return {
+        'student_count': Student.objects.count(),
+        'teacher_count': Teacher.objects.count(),
+        'course_count': Course.objects.count(),
+        'enrollment_count': Enrollment.objects.count(),
+    }
+
+def fee_totals():
+    """Invoiced, paid and pending fee totals."""
+    total_fees = FeeInvoice.objects.aggregate(total=Sum('total_amount'))['total'] or 0
+    total_paid = Payment.objects.aggregate(total=Sum('amount'))['total'] or 0
+    return {
+        'total_fees': total_fees,
+        'total_paid': total_paid,
+        'total_pending': total_fees - total_paid,
+    }
+
+def attendance_distribution():
+    """Institute-wide attendance counts per status, read from the summary table."""
+    totals = AttendanceSummary.objects.totals()
+    return {
+        'attendance_stats': [{'status': status, 'count': count} for status, count in totals.items()],
+    }
+
+# Each stat family is cached under its own versioned key
+STAT_FAMILIES = {
+    'people': people_counts,
+    'fees': fee_totals,
+    'attendance': attendance_distribution,
+}
+
+
+def get_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+def _version_key(family):
+    return f'dashboard:{family}:version'
+
+def get_version(family):
+    """
+    Return the current version of a stat family. A missing (or evicted) version
+    starts from the current time, so it never matches previously cached data.
+    """
+    cache = get_cache()
+    cache.add(_version_key(family), time.time_ns() // 1000, None)
+    return cache.get(_version_key(family))
+
+def invalidate(*families):
+    """Bump the version of the given stat families (all of them by default)."""
+    cache = get_cache()
+    for family in families or STAT_FAMILIES:
+        try:
+            cache.incr(_version_key(family))
+        except ValueError:
+            # No version yet, so nothing is cached for this family
+            pass
+
+def get_stats(family):
+    """
+    Return the cached stats of a family, computing them on a miss.
+    ``DASHBOARD_STATS_MAX_AGE`` caps how long a family stays cached, in seconds,
+    defaulting to ``DASHBOARD_STATS_DEFAULT_MAX_AGE``.
+    """
+    cache = get_cache()
+    key = f'dashboard:{family}:v{get_version(family)}'
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+    replica = reading_from_replica()
+    if replica:
+        # Replica data may predate the last invalidation, so it is cached apart
+        # from the primary's, which clients pinned after a write read, and no
+        # longer than the replica takes to catch up
+        key = f'{key}:replica'
+        stats = cache.get(key)
+        if stats is not None:
+            return stats
+    stats = STAT_FAMILIES[family]()
+    max_age = getattr(settings, 'DASHBOARD_STATS_MAX_AGE', {}).get(
+        family, getattr(settings, 'DASHBOARD_STATS_DEFAULT_MAX_AGE', 60)
+    )
+    if replica:
+        lag = getattr(settings, 'REPLICA_SYNC_INTERVAL', 30)
+        max_age = lag if max_age is None else min(max_age, lag)
+    cache.set(key, stats, max_age)
+    return stats
+
+def get_admin_stats():
+    """Return all admin dashboard stats merged into one context dict."""
+    stats = {}
+    for family in STAT_FAMILIES:
+        stats.update(get_stats(family))
+    return stats
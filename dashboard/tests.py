@@ -1,3 +1,491 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from attendance.models import AttendanceRecord, AttendanceSummary, StudentAttendance
+from courses.models import Course, Enrollment
+from fees.models import FeeInvoice, Payment
+from institute_management.metrics import Registry, registry
+from institute_management.benchmark import EndpointBenchmark, WriterBenchmark, compare, discover_endpoints, percentile
+from institute_management.replica import (
+    ReplicaPinningMiddleware, ReplicaRouter, reading_from_replica, replica_reads, snapshot,
+)
+from institute_management.seeding import InstituteSeeder
+from institute_management.sqlite import pragma_statements
+from students.models import Student
+from teachers.models import Teacher
+from .stats import STAT_FAMILIES, get_stats
+
+
+class AdminDashboardCacheTests(TestCase):
+    """Tests for the cached admin dashboard statistics."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def aggregate_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries if 'COUNT(' in q['sql'] or 'SUM(' in q['sql']]
+
+    def test_repeat_loads_run_no_aggregates(self):
+        self.assertTrue(self.aggregate_queries())
+        self.assertEqual(self.aggregate_queries(), [])
+
+    def test_model_changes_invalidate_their_family(self):
+        self.assertEqual(get_stats('people')['student_count'], 0)
+        fees = get_stats('fees')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(username='student', password='pass', user_type='student')
+            Student.objects.create(user=user, student_id='S1', gender='male')
+
+        self.assertEqual(get_stats('people')['student_count'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_stats('fees'), fees)
+
+    @override_settings(DASHBOARD_STATS_MAX_AGE={'fees': 300}, DASHBOARD_STATS_DEFAULT_MAX_AGE=60)
+    def test_stats_expire_without_invalidation(self):
+        # Invalidations don't reach the per-process caches of other workers
+        get_stats('people')
+        get_stats('fees')
+        later = time.time() + 120
+        with mock.patch('time.time', return_value=later):
+            with CaptureQueriesContext(connection) as queries:
+                get_stats('people')
+            self.assertTrue(queries)
+            with self.assertNumQueries(0):
+                get_stats('fees')
+
+
+class TeacherDashboardQueryTests(TestCase):
+    """Query-count tests for the teacher dashboard."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='teacher', password='pass', user_type='teacher')
+        cls.teacher = Teacher.objects.create(user=user, teacher_id='T1', gender='female')
+
+    def setUp(self):
+        self.client.force_login(self.teacher.user)
+
+    def add_course(self, index):
+        course = Course.objects.create(name=f'Course {index}', code=f'C{index}')
+        course.teachers.add(self.teacher)
+        users = User.objects.bulk_create([
+            User(username=f'{course.code}-{i}', user_type='student') for i in range(3)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=user, student_id=f'{course.code}-{i}', gender='male') for i, user in enumerate(users)
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=student, course=course, status='active' if i else 'dropped')
+            for i, student in enumerate(students)
+        ])
+        record = AttendanceRecord.objects.create(course=course, date=datetime.date(2025, 1, index + 1))
+        StudentAttendance.objects.bulk_create([
+            StudentAttendance(attendance_record=record, student=student) for student in students
+        ])
+        return course
+
+    def test_query_count_does_not_grow_with_courses(self):
+        course = self.add_course(0)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('teacher_dashboard'))
+        self.assertEqual(response.context['course_students'], {course: 2})
+
+        for index in range(1, 6):
+            self.add_course(index)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('teacher_dashboard'))
+        self.assertEqual(response.context['course_count'], 6)
+        self.assertEqual(set(response.context['course_students'].values()), {2})
+        self.assertContains(response, '<td>3</td>')
+
+
+class SeedInstituteTests(TestCase):
+    """Tests for the synthetic dataset generator."""
+    options = dict(students=30, teachers=4, courses=6, terms=2, term_weeks=2, courses_per_student=2,
+                   start=datetime.date(2024, 1, 1), today=datetime.date(2024, 6, 1), chunk_size=25)
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('username').values_list('username', 'first_name', 'last_name')),
+            list(Enrollment.objects.order_by('student__student_id', 'course__code')
+                 .values_list('student__student_id', 'course__code', 'status')),
+            list(StudentAttendance.objects.order_by('attendance_record__course__code', 'attendance_record__date', 'student__student_id')
+                 .values_list('attendance_record__date', 'student__student_id', 'status')),
+            list(Payment.objects.order_by('receipt_number').values_list('receipt_number', 'amount', 'payment_date')),
+        )
+
+    def test_same_seed_gives_same_data(self):
+        class Rollback(Exception):
+            pass
+
+        snapshots = []
+        for seed in (7, 7, 8):
+            try:
+                with transaction.atomic():
+                    InstituteSeeder(seed=seed, **self.options).run()
+                    snapshots.append(self.snapshot())
+                    raise Rollback
+            except Rollback:
+                pass
+        self.assertEqual(snapshots[0], snapshots[1])
+        self.assertNotEqual(snapshots[0], snapshots[2])
+
+    def test_counters_match_the_rows(self):
+        counts = InstituteSeeder(**self.options).run()
+        self.assertEqual(counts['Student'], 30)
+        self.assertEqual(counts['StudentAttendance'], StudentAttendance.objects.count())
+        self.assertGreater(counts['StudentAttendance'], 0)
+
+        stored = list(AttendanceRecord.objects.order_by('pk').values_list('pk', *AttendanceRecord.COUNT_FIELDS))
+        AttendanceRecord.objects.rebuild_counts()
+        self.assertEqual(stored, list(AttendanceRecord.objects.order_by('pk').values_list('pk', *AttendanceRecord.COUNT_FIELDS)))
+
+        fields = ('student_id', 'course_id', 'present', 'absent', 'late', 'excused')
+        stored = sorted(AttendanceSummary.objects.values_list(*fields))
+        AttendanceSummary.objects.rebuild()
+        self.assertEqual(stored, sorted(AttendanceSummary.objects.values_list(*fields)))
+
+        for invoice in FeeInvoice.objects.annotate(paid=Sum('payments__amount')):
+            self.assertEqual(invoice.paid_amount, invoice.paid or 0)
+            self.assertEqual(invoice.status, 'paid' if invoice.paid_amount >= invoice.total_amount else 'overdue')
+        self.assertEqual(set(FeeInvoice.objects.values_list('billing_period', flat=True)), {'2024-T1', '2024-T2'})
+        self.assertFalse(Payment.objects.filter(payment_date__gt=datetime.date(2024, 6, 1)).exists())
+
+    def test_command_refuses_to_seed_twice(self):
+        out = io.StringIO()
+        call_command('seed_institute', '--students', '5', '--teachers', '1', '--courses', '2', '--terms', '1',
+                     '--term-weeks', '1', '--courses-per-student', '1', stdout=out)
+        self.assertIn('Seeded', out.getvalue())
+        self.assertEqual(Student.objects.count(), 5)
+        with self.assertRaisesMessage(CommandError, 'already holds seeded data'):
+            call_command('seed_institute', stdout=out)
+
+
+class EndpointBenchmarkTests(TestCase):
+    """Tests for the endpoint latency benchmark."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+        teacher_user = User.objects.create_user(username='teacher', password='pass', user_type='teacher')
+        cls.teacher = Teacher.objects.create(user=teacher_user, teacher_id='T1', gender='female')
+        cls.course = Course.objects.create(name='Physics', code='PHY1')
+
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([4, 1, 3, 2], 50), 2.5)
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 100), 5)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_endpoints_have_their_arguments_filled_in(self):
+        endpoints = dict(discover_endpoints())
+        self.assertEqual(endpoints['course_detail'], reverse('course_detail', args=[self.course.pk]))
+        self.assertEqual(endpoints['admin_dashboard'], reverse('admin_dashboard'))
+        self.assertNotIn('logout', endpoints)
+        # No student exists to fill in the URL with
+        self.assertNotIn('student_detail', endpoints)
+
+    def test_results_and_skips_per_role(self):
+        endpoints = [('admin_dashboard', reverse('admin_dashboard')), ('course_detail', reverse('course_detail', args=[self.course.pk]))]
+        users = {'admin': self.admin, 'teacher': self.teacher.user}
+        results, skipped = EndpointBenchmark(endpoints, users, requests=3).run()
+        self.assertEqual(set(results), {'admin admin_dashboard', 'admin course_detail', 'teacher course_detail'})
+        self.assertEqual(skipped, {'teacher admin_dashboard': 302})
+        result = results['admin course_detail']
+        self.assertEqual(result['requests'], 3)
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+        self.assertGreater(result['queries'], 0)
+        self.assertGreater(result['bytes'], 0)
+
+    def test_compare_flags_slower_views_and_extra_queries(self):
+        baseline = {'a': {'p95_ms': 10.0, 'queries': 4}, 'b': {'p95_ms': 10.0, 'queries': 4}, 'c': {'p95_ms': 1.0, 'queries': 4}}
+        results = {'a': {'p95_ms': 13.0, 'queries': 4}, 'b': {'p95_ms': 11.0, 'queries': 5}, 'c': {'p95_ms': 2.0, 'queries': 4}}
+        self.assertEqual(compare(results, baseline, threshold=20, min_delta_ms=2), [
+            'a: p95 10.0ms -> 13.0ms',
+            'b: 4 -> 5 queries',
+        ])
+        # Views that now fail, or are gone, are the worst regressions
+        baseline.update({'d': {'status': 200, 'p95_ms': 5.0, 'queries': 2}, 'e': {'p95_ms': 5.0, 'queries': 2}})
+        self.assertEqual(compare(results, baseline, threshold=20, min_delta_ms=2, skipped={'d': 500}), [
+            'a: p95 10.0ms -> 13.0ms',
+            'b: 4 -> 5 queries',
+            'd: status 200 -> 500',
+            'e: no longer measured',
+        ])
+        self.assertEqual(compare({}, {'admin dashboard': baseline['d']}, skipped={'admin dashboard': 500}), [
+            'admin dashboard: status 200 -> 500',
+        ])
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTests(TestCase):
+    """Tests for the Prometheus metrics endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def metrics(self, **kwargs):
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer secret'}, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return response.content.decode()
+
+    def test_requests_queries_templates_and_cache_are_recorded(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin_dashboard'))
+        self.client.get(reverse('admin_dashboard'))
+        self.client.get('/no-such-page/')
+        body = self.metrics()
+
+        self.assertIn('# TYPE institute_http_requests_total counter', body)
+        self.assertIn('institute_http_requests_total{view="admin_dashboard",method="GET",status="200"} 2', body)
+        self.assertIn('institute_http_requests_total{view="<unresolved>",method="GET",status="404"} 1', body)
+        self.assertIn('institute_http_request_duration_seconds_bucket{view="admin_dashboard",le="+Inf"} 2', body)
+        self.assertIn('institute_http_request_duration_seconds_count{view="admin_dashboard"} 2', body)
+        self.assertRegex(body, r'institute_db_queries_total\{view="admin_dashboard"\} [1-9]')
+        self.assertIn('institute_template_render_duration_seconds_count{template="dashboard/admin_dashboard.html"} 2', body)
+        # The stats are computed on the first request and cached for the second
+        self.assertRegex(body, r'institute_cache_requests_total\{cache="default",result="hit"\} [1-9]')
+        self.assertRegex(body, r'institute_cache_requests_total\{cache="default",result="miss"\} [1-9]')
+
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        self.metrics()
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_without_a_token_only_debug_serves_the_allowed_addresses(self):
+        # A reverse proxy on the same host would pass every client's request from 127.0.0.1
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 200)
+            self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.8').status_code, 403)
+
+    def test_processes_are_aggregated_through_the_directory(self):
+        worker = Registry()
+        requests = worker.counter('requests_total', 'Requests.', ('view',))
+        latency = worker.histogram('latency_seconds', 'Latency.', ('view',), buckets=(0.1, 1))
+        requests.inc('home', amount=2)
+        latency.observe('home', value=0.05)
+        latency.observe('home', value=0.5)
+        with tempfile.TemporaryDirectory() as directory:
+            # Another worker's values, saved under its process id
+            with open(os.path.join(directory, 'metrics-1.json'), 'w') as file:
+                json.dump(worker.snapshot(), file)
+            requests.inc('home')
+            latency.observe('home', value=5)
+            body = worker.render(directory)
+        self.assertIn('requests_total{view="home"} 5', body)
+        self.assertIn('latency_seconds_bucket{view="home",le="0.1"} 2', body)
+        self.assertIn('latency_seconds_bucket{view="home",le="1"} 4', body)
+        self.assertIn('latency_seconds_bucket{view="home",le="+Inf"} 5', body)
+        self.assertIn('latency_seconds_count{view="home"} 5', body)
+
+
+class RequestProfilerTests(TestCase):
+    """Tests for the on-demand request profiler."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(REQUEST_PROFILER_DIR=self.directory, REQUEST_PROFILER_MAX_PER_MINUTE=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Pick up the settings in fresh middleware instances
+        self.client.handler.load_middleware()
+        self.client.force_login(self.admin)
+
+    def test_captures_pstats_collapsed_stacks_and_summary(self):
+        response = self.client.get(reverse('admin_dashboard'), {'_profile': '1'})
+        name = response['X-Profile-Id']
+        files = sorted(os.listdir(self.directory))
+        self.assertEqual(files, [f'{name}.collapsed', f'{name}.json', f'{name}.pstats'])
+
+        with open(os.path.join(self.directory, f'{name}.collapsed')) as file:
+            lines = file.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(re.fullmatch(r'.+ \d+', line) for line in lines))
+        self.assertTrue(any('admin_dashboard (dashboard/views.py:' in line for line in lines))
+
+        listing = self.client.get(reverse('request_profiles'))
+        self.assertEqual(listing.status_code, 200)
+        profile = listing.context['profiles'][0]
+        self.assertEqual(profile['path'], '/admin-dashboard/?_profile=1')
+        self.assertEqual(profile['user'], 'admin')
+        self.assertTrue(profile['top_functions'])
+        self.assertContains(listing, profile['top_functions'][0]['function'])
+
+        download = self.client.get(reverse('request_profile_download', args=[name, 'pstats']))
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(self.client.get(reverse('request_profile_download', args=['passwd', 'pstats'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('request_profile_download', args=[name, 'py'])).status_code, 404)
+
+    def test_only_admins_trigger_captures_within_the_rate_limit(self):
+        student = User.objects.create_user(username='student', password='pass', user_type='student')
+        self.client.force_login(student)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('dashboard'), {'_profile': '1'}))
+        self.assertEqual(self.client.get(reverse('request_profiles')).status_code, 302)
+
+        self.client.force_login(self.admin)
+        responses = [
+            self.client.get(reverse('admin_dashboard'), headers={'X-Profile-Request': '1'}) for i in range(3)
+        ]
+        self.assertEqual(['X-Profile-Id' in response for response in responses], [True, True, False])
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('admin_dashboard')))
+
+    def test_only_the_newest_captures_are_kept(self):
+        with override_settings(REQUEST_PROFILER_KEEP=1):
+            self.client.handler.load_middleware()
+            first = self.client.get(reverse('admin_dashboard'), {'_profile': '1'})['X-Profile-Id']
+            second = self.client.get(reverse('admin_dashboard'), {'_profile': '1'})['X-Profile-Id']
+        self.assertNotEqual(first, second)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+
+class SqliteTuningTests(TestCase):
+    """Tests for the SQLite connection tuning."""
+
+    def test_pragmas_are_validated(self):
+        self.assertEqual(
+            pragma_statements({'journal_mode': 'WAL', 'busy_timeout': 100}),
+            ['PRAGMA busy_timeout = 100', 'PRAGMA journal_mode = wal'],
+        )
+        for pragmas in ({'journal_mode': 'wal; DROP TABLE x'}, {'cache_size': '1e3'}, {'page_size': 4096}):
+            with self.assertRaises(ValueError):
+                pragma_statements(pragmas)
+
+    def test_new_connections_are_tuned(self):
+        # The in-memory test database is never reconnected, so announce it again
+        original = connection.connection.execute('PRAGMA busy_timeout').fetchone()[0]
+        self.addCleanup(connection.connection.execute, f'PRAGMA busy_timeout = {original}')
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'temp_store': 'memory'}):
+            connection_created.send(sender=connection.__class__, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_tuned_writers_are_not_locked_out(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result = WriterBenchmark(
+                os.path.join(directory, 'bench.sqlite3'),
+                {'busy_timeout': 5000, 'journal_mode': 'wal', 'synchronous': 'normal'},
+                'IMMEDIATE', writers=3, readers=1, transactions=20, rows=5,
+            ).run()
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['committed'], 60)
+
+    def test_command_reports_both_configurations(self):
+        out = io.StringIO()
+        call_command('benchmark_sqlite', '--writers', '2', '--readers', '0', '--transactions', '5', stdout=out)
+        self.assertIn('defaults', out.getvalue())
+        self.assertIn('tuned', out.getvalue())
+
+
+# Any configured alias can stand in for the replica
+@override_settings(REPLICA_DATABASE_ALIAS='default', REPLICA_STICKY_SECONDS=15)
+class ReadReplicaTests(TestCase):
+    """Tests for the read replica routing."""
+
+    def test_only_analytics_reads_use_the_replica(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Course))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Course), 'default')
+            self.assertEqual(router.db_for_write(Course), 'default')
+            self.assertFalse(router.allow_migrate('default', 'courses'))
+        with override_settings(REPLICA_DATABASE_ALIAS='replica'), replica_reads():
+            self.assertFalse(reading_from_replica())
+
+    def test_clients_read_their_writes_after_a_post(self):
+        seen = []
+
+        def view(request):
+            with replica_reads():
+                seen.append(reading_from_replica())
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+        self.assertNotIn('pin_primary', middleware(factory.get('/')).cookies)
+        cookie = middleware(factory.post('/')).cookies['pin_primary']
+        self.assertEqual(cookie['max-age'], 15)
+        pinned = factory.get('/')
+        pinned.COOKIES['pin_primary'] = '1'
+        middleware(pinned)
+        self.assertEqual(seen, [True, False, False])
+
+    def test_replica_stats_are_not_served_to_pinned_clients(self):
+        cache.clear()
+        builds = []
+
+        def people_counts():
+            builds.append(1)
+            return {'build': len(builds)}
+
+        with mock.patch.dict(STAT_FAMILIES, {'people': people_counts}):
+            with replica_reads():
+                self.assertEqual(get_stats('people'), {'build': 1})
+                self.assertEqual(get_stats('people'), {'build': 1})
+            # Reads of the primary, such as a pinned client's, build their own
+            self.assertEqual(get_stats('people'), {'build': 2})
+            # and replica reads prefer them once cached
+            with replica_reads():
+                self.assertEqual(get_stats('people'), {'build': 2})
+
+    def test_snapshot_copies_a_database_being_written(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source, target = os.path.join(directory, 'db.sqlite3'), os.path.join(directory, 'replica.sqlite3')
+            primary = sqlite3.connect(source)
+            primary.execute('PRAGMA journal_mode = wal')
+            primary.execute('CREATE TABLE t (x INTEGER)')
+            primary.executemany('INSERT INTO t VALUES (?)', [(i,) for i in range(100)])
+            primary.commit()
+            snapshot(source, target)
+            primary.execute('INSERT INTO t VALUES (100)')
+            primary.commit()
+            primary.close()
+
+            replica = sqlite3.connect(f'file:{target}?mode=ro', uri=True)
+            self.assertEqual(replica.execute('SELECT COUNT(*) FROM t').fetchone()[0], 100)
+            self.assertEqual(replica.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+            replica.close()
+            self.assertEqual(sorted(os.listdir(directory)), ['db.sqlite3', 'replica.sqlite3'])
@@ -3,7 +3,9 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
-    path('admin/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('teacher/', views.teacher_dashboard, name='teacher_dashboard'),
     path('student/', views.student_dashboard, name='student_dashboard'),
+    path('profiles/', views.request_profiles, name='request_profiles'),
+    path('profiles/<str:name>.<str:extension>', views.request_profile_download, name='request_profile_download'),
 ]
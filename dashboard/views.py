@@ -1,12 +1,16 @@
+import os
+
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum
+from django.db.models import Count, Q, Sum
+from django.http import FileResponse, Http404
 from django.shortcuts import render, redirect
 
-from students.models import Student
-from teachers.models import Teacher
 from courses.models import Course, Enrollment
-from attendance.models import AttendanceRecord, StudentAttendance
+from attendance.models import AttendanceRecord, AttendanceSummary, StudentAttendance
 from fees.models import FeeInvoice, Payment
+from institute_management.replica import reads_from_replica
+from institute_management.request_profiler import list_profiles, profile_path
+from .stats import get_admin_stats
 
 @login_required
 def dashboard(request):
@@ -15,24 +19,20 @@ def dashboard(request):
         return redirect('admin_dashboard')
     elif request.user.is_teacher:
         # Check if teacher profile exists
-        try:
-            Teacher.objects.get(user=request.user)
+        if request.profile:
             return redirect('teacher_dashboard')
-        except Teacher.DoesNotExist:
-            # If no teacher profile, show a generic dashboard
-            return render(request, 'dashboard/generic_dashboard.html', {
-                'message': 'Your teacher profile is not set up yet. Please contact an administrator.'
-            })
+        # If no teacher profile, show a generic dashboard
+        return render(request, 'dashboard/generic_dashboard.html', {
+            'message': 'Your teacher profile is not set up yet. Please contact an administrator.'
+        })
     elif request.user.is_student:
         # Check if student profile exists
-        try:
-            Student.objects.get(user=request.user)
+        if request.profile:
             return redirect('student_dashboard')
-        except Student.DoesNotExist:
-            # If no student profile, show a generic dashboard
-            return render(request, 'dashboard/generic_dashboard.html', {
-                'message': 'Your student profile is not set up yet. Please contact an administrator.'
-            })
+        # If no student profile, show a generic dashboard
+        return render(request, 'dashboard/generic_dashboard.html', {
+            'message': 'Your student profile is not set up yet. Please contact an administrator.'
+        })
     else:
         # For users with no specific role, show a generic dashboard
         return render(request, 'dashboard/generic_dashboard.html', {
@@ -40,6 +40,7 @@ def dashboard(request):
         })
 
 @login_required
+@reads_from_replica
 def admin_dashboard(request):
     """Dashboard view for administrators."""
     # Check if user is an admin
@@ -47,36 +48,16 @@ def admin_dashboard(request):
         # If not an admin, redirect to the main dashboard
         return redirect('dashboard')
 
-    # Get counts for various models
-    student_count = Student.objects.count()
-    teacher_count = Teacher.objects.count()
-    course_count = Course.objects.count()
-    enrollment_count = Enrollment.objects.count()
-
-    # Get fee statistics
-    total_fees = FeeInvoice.objects.aggregate(total=Sum('total_amount'))['total'] or 0
-    total_paid = Payment.objects.aggregate(total=Sum('amount'))['total'] or 0
-    total_pending = total_fees - total_paid
+    # Get cached counts, fee totals and attendance statistics
+    context = get_admin_stats()
 
     # Get recent activities
-    recent_enrollments = Enrollment.objects.order_by('-enrollment_date')[:5]
-    recent_payments = Payment.objects.order_by('-payment_date')[:5]
-
-    # Get attendance statistics
-    attendance_stats = StudentAttendance.objects.values('status').annotate(count=Count('status'))
-
-    context = {
-        'student_count': student_count,
-        'teacher_count': teacher_count,
-        'course_count': course_count,
-        'enrollment_count': enrollment_count,
-        'total_fees': total_fees,
-        'total_paid': total_paid,
-        'total_pending': total_pending,
-        'recent_enrollments': recent_enrollments,
-        'recent_payments': recent_payments,
-        'attendance_stats': attendance_stats,
-    }
+    context['recent_enrollments'] = Enrollment.objects.select_related(
+        'student__user', 'course'
+    ).order_by('-enrollment_date')[:5]
+    context['recent_payments'] = Payment.objects.select_related(
+        'invoice__student__user'
+    ).order_by('-payment_date')[:5]
 
     return render(request, 'dashboard/admin_dashboard.html', context)
 
@@ -87,37 +68,36 @@ def teacher_dashboard(request):
         # If not a teacher, redirect to the main dashboard
         return redirect('dashboard')
 
-    try:
-        teacher = Teacher.objects.get(user=request.user)
-
-        # Get courses taught by this teacher
-        courses = teacher.courses.all()
-        course_count = courses.count()
-
-        # Get student counts for each course
-        course_students = {}
-        for course in courses:
-            course_students[course] = Enrollment.objects.filter(course=course, status='active').count()
-
-        # Get recent attendance records for teacher's courses
-        recent_attendance = AttendanceRecord.objects.filter(course__in=courses).order_by('-date')[:5]
-
-        context = {
-            'teacher': teacher,
-            'courses': courses,
-            'course_count': course_count,
-            'course_students': course_students,
-            'recent_attendance': recent_attendance,
-        }
-
-        return render(request, 'dashboard/teacher_dashboard.html', context)
-
-    except Teacher.DoesNotExist:
+    teacher = request.profile
+    if not teacher:
         # If teacher profile doesn't exist, show a generic dashboard
         return render(request, 'dashboard/generic_dashboard.html', {
             'message': 'Your teacher profile is not set up yet. Please contact an administrator.'
         })
 
+    # Get courses taught by this teacher with their active student counts
+    courses = list(teacher.courses.annotate(
+        active_student_count=Count('enrollments', filter=Q(enrollments__status='active'))
+    ))
+    course_count = len(courses)
+    course_students = {course: course.active_student_count for course in courses}
+
+    # Get recent attendance records for teacher's courses; their status
+    # counts are stored on the record
+    recent_attendance = AttendanceRecord.objects.filter(
+        course__teachers=teacher
+    ).select_related('course').order_by('-date')[:5]
+
+    context = {
+        'teacher': teacher,
+        'courses': courses,
+        'course_count': course_count,
+        'course_students': course_students,
+        'recent_attendance': recent_attendance,
+    }
+
+    return render(request, 'dashboard/teacher_dashboard.html', context)
+
 @login_required
 def student_dashboard(request):
     """Dashboard view for students."""
@@ -125,59 +105,65 @@ def student_dashboard(request):
         # If not a student, redirect to the main dashboard
         return redirect('dashboard')
 
-    try:
-        student = Student.objects.get(user=request.user)
-
-        # Get enrollments for this student
-        enrollments = Enrollment.objects.filter(student=student, status='active')
-        course_count = enrollments.count()
-
-        # Get attendance statistics
-        attendance_records = StudentAttendance.objects.filter(student=student)
-        attendance_stats_raw = attendance_records.values('status').annotate(count=Count('status'))
-
-        # Convert to a more template-friendly format
-        attendance_stats = {
-            'present': 0,
-            'absent': 0,
-            'late': 0,
-            'excused': 0
-        }
-
-        for stat in attendance_stats_raw:
-            attendance_stats[stat['status']] = stat['count']
-
-        # Calculate attendance percentage
-        total_attendance = sum(attendance_stats.values())
-        present_percentage = 0
-        if total_attendance > 0:
-            present_percentage = (attendance_stats['present'] / total_attendance) * 100
-
-        # Get fee information
-        fee_invoices = FeeInvoice.objects.filter(student=student)
-        total_fees = fee_invoices.aggregate(total=Sum('total_amount'))['total'] or 0
-        total_paid = fee_invoices.aggregate(total=Sum('paid_amount'))['total'] or 0
-        total_pending = total_fees - total_paid
-
-        # Get recent attendance
-        recent_attendance = attendance_records.order_by('-attendance_record__date')[:5]
-
-        context = {
-            'student': student,
-            'enrollments': enrollments,
-            'course_count': course_count,
-            'attendance_stats': attendance_stats,
-            'present_percentage': present_percentage,
-            'total_fees': total_fees,
-            'total_paid': total_paid,
-            'total_pending': total_pending,
-            'recent_attendance': recent_attendance,
-        }
-
-        return render(request, 'dashboard/student_dashboard.html', context)
-
-    except Student.DoesNotExist:
+    student = request.profile
+    if not student:
         # If student profile doesn't exist, show a generic dashboard
         return render(request, 'dashboard/generic_dashboard.html', {
             'message': 'Your student profile is not set up yet. Please contact an administrator.'
-        })
\ No newline at end of file
+        })
+
+    # Get enrollments for this student
+    enrollments = Enrollment.objects.filter(student=student, status='active')
+    course_count = enrollments.count()
+
+    # Get attendance statistics from the per-course summary rows
+    attendance_records = StudentAttendance.objects.filter(student=student)
+    attendance_stats = AttendanceSummary.objects.totals(student=student)
+
+    # Calculate attendance percentage
+    total_attendance = sum(attendance_stats.values())
+    present_percentage = 0
+    if total_attendance > 0:
+        present_percentage = (attendance_stats['present'] / total_attendance) * 100
+
+    # Get fee information
+    fee_invoices = FeeInvoice.objects.filter(student=student)
+    total_fees = fee_invoices.aggregate(total=Sum('total_amount'))['total'] or 0
+    total_paid = fee_invoices.aggregate(total=Sum('paid_amount'))['total'] or 0
+    total_pending = total_fees - total_paid
+
+    # Get recent attendance
+    recent_attendance = attendance_records.order_by('-attendance_record__date')[:5]
+
+    context = {
+        'student': student,
+        'enrollments': enrollments,
+        'course_count': course_count,
+        'attendance_stats': attendance_stats,
+        'present_percentage': present_percentage,
+        'total_fees': total_fees,
+        'total_paid': total_paid,
+        'total_pending': total_pending,
+        'recent_attendance': recent_attendance,
+    }
+
+    return render(request, 'dashboard/student_dashboard.html', context)
+
+@login_required
+def request_profiles(request):
+    """View listing the captured request profiles with their slowest functions."""
+    if not request.user.is_admin:
+        return redirect('dashboard')
+
+    return render(request, 'dashboard/request_profiles.html', {'profiles': list_profiles()})
+
+@login_required
+def request_profile_download(request, name, extension):
+    """View downloading a captured profile's pstats or collapsed stacks file."""
+    if not request.user.is_admin:
+        return redirect('dashboard')
+
+    path = profile_path(name, extension)
+    if path is None or not os.path.exists(path):
+        raise Http404('No such profile.')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{name}.{extension}')
@@ -1,10 +1,21 @@
-from django.contrib import admin
+import datetime
+
+from django.contrib import admin, messages
 from .models import FeeCategory, FeeInvoice, FeeInvoiceItem, Payment
+from .services import generate_recurring_invoices
 
 @admin.register(FeeCategory)
 class FeeCategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'amount', 'is_recurring')
     search_fields = ('name', 'description')
+    actions = ['generate_monthly_invoices']
+
+    @admin.action(description='Generate this month\'s invoices from selected recurring categories')
+    def generate_monthly_invoices(self, request, queryset):
+        today = datetime.date.today()
+        period = today.strftime('%Y-%m')
+        created = generate_recurring_invoices(period, today + datetime.timedelta(days=30), categories=queryset)
+        self.message_user(request, f'Generated {created} invoices for {period}.', messages.SUCCESS)
 
 class FeeInvoiceItemInline(admin.TabularInline):
     model = FeeInvoiceItem
@@ -18,7 +29,7 @@ class PaymentInline(admin.TabularInline):
 @admin.register(FeeInvoice)
 class FeeInvoiceAdmin(admin.ModelAdmin):
     list_display = ('invoice_number', 'student', 'total_amount', 'paid_amount', 'balance', 'status', 'due_date')
-    list_filter = ('status', 'issue_date', 'due_date')
+    list_filter = ('status', 'billing_period', 'issue_date', 'due_date')
     search_fields = ('invoice_number', 'student__user__first_name', 'student__user__last_name', 'student__student_id')
     readonly_fields = ('paid_amount', 'issue_date')
     inlines = [FeeInvoiceItemInline, PaymentInline]
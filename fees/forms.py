@@ -1,5 +1,7 @@
 from django import forms
 from django.forms import inlineformset_factory
+from django.urls import reverse_lazy
+from institute_management.autocomplete import AutocompleteWidget
 from .models import FeeCategory, FeeInvoice, FeeInvoiceItem, Payment
 
 class FeeCategoryForm(forms.ModelForm):
@@ -28,6 +30,7 @@ class FeeInvoiceForm(forms.ModelForm):
         model = FeeInvoice
         fields = ['student', 'total_amount', 'due_date', 'status', 'notes']
         widgets = {
+            'student': AutocompleteWidget(reverse_lazy('student_autocomplete')),
             'due_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'notes': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
         }
@@ -39,6 +42,28 @@ class FeeInvoiceForm(forms.ModelForm):
             if 'class' not in field.widget.attrs:
                 field.widget.attrs['class'] = 'form-control'
 
+class FeeInvoiceFilterForm(forms.Form):
+    """
+    Form for searching fee invoices and filtering them by status and issue date.
+    """
+    search = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Search by invoice number or student'})
+    )
+    status = forms.ChoiceField(
+        choices=(('', 'All Statuses'),) + FeeInvoice.STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    start_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+    end_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+
 class FeeInvoiceItemForm(forms.ModelForm):
     """
     Form for creating and updating fee invoice items.
@@ -70,6 +95,7 @@ class PaymentForm(forms.ModelForm):
         model = Payment
         fields = ['invoice', 'amount', 'payment_method', 'transaction_id', 'notes']
         widgets = {
+            'invoice': AutocompleteWidget(reverse_lazy('fee_invoice_autocomplete')),
             'notes': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
         }
     
@@ -0,0 +1,36 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fees.services import generate_recurring_invoices, recurring_invoice_targets
+
+
+class Command(BaseCommand):
+    help = 'Generate invoices for a billing period from the recurring fee categories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('period', help='Billing period label, e.g. 2025-T1.')
+        parser.add_argument('--due-date', required=True, help='Due date of the invoices (YYYY-MM-DD).')
+        parser.add_argument('--all-students', action='store_true',
+                            help='Also invoice students without an active enrollment.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Students per transaction.')
+
+    def handle(self, *args, **options):
+        try:
+            due_date = datetime.date.fromisoformat(options['due_date'])
+        except ValueError:
+            raise CommandError('--due-date must be a date in YYYY-MM-DD format.')
+        if len(options['period']) > 20:
+            raise CommandError('The period label must be at most 20 characters.')
+
+        def progress(processed, total, created):
+            self.stdout.write(f'Processed {processed}/{total} students, {created} invoices created.')
+
+        created = generate_recurring_invoices(
+            options['period'],
+            due_date,
+            students=recurring_invoice_targets(include_inactive=options['all_students']),
+            chunk_size=options['chunk_size'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Generated {created} invoices for {options["period"]}.'))
@@ -0,0 +1,25 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from fees.models import FeeInvoice
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Mark pending invoices that are past their due date as overdue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int,
+                            help='Keep running and sweep again every INTERVAL seconds, e.g. from a process manager.')
+
+    def handle(self, *args, **options):
+        while True:
+            count = FeeInvoice.objects.mark_overdue()
+            logger.info('Marked %d invoices as overdue.', count)
+            self.stdout.write(self.style.SUCCESS(f'Marked {count} invoices as overdue.'))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -1,5 +1,12 @@
+import datetime
 import uuid
-from django.db import models
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.db.models.lookups import Exact, GreaterThanOrEqual, LessThan
+from django.dispatch import Signal
+from institute_management.search import prefix_q
 from students.models import Student
 
 class FeeCategory(models.Model):
@@ -17,6 +24,66 @@ class FeeCategory(models.Model):
     class Meta:
         verbose_name_plural = 'Fee Categories'
 
+# Sent when invoice or payment totals change through bulk paths that bypass
+# the model save and delete signals
+fee_totals_changed = Signal()
+
+class FeeInvoiceQuerySet(models.QuerySet):
+    """
+    QuerySet with the invoice list search.
+    """
+    def search(self, term):
+        """
+        Filter to invoices whose number starts with ``term`` or whose student
+        matches it in the student directory search. Both sides are indexed
+        prefix matches; the students are resolved in a subquery so the invoices
+        are reached through their student index.
+        """
+        term = term.strip()
+        if not term:
+            return self
+        students = Student.objects.search(term, ranked=False).values('pk')
+        return self.filter(prefix_q('invoice_number', term) | Q(student__in=students))
+
+def posted_status(paid_amount, total_amount, status, due_date):
+    """
+    Return the expression of an invoice's status for ``paid_amount``: paid once
+    it covers ``total_amount``, pending (or overdue past ``due_date``) for a paid
+    invoice it no longer covers, else ``status``.
+    """
+    return Case(
+        When(GreaterThanOrEqual(paid_amount, total_amount), then=Value('paid')),
+        When(Q(Exact(status, 'paid'), LessThan(due_date, datetime.date.today())), then=Value('overdue')),
+        When(Exact(status, 'paid'), then=Value('pending')),
+        default=status,
+    )
+
+class FeeInvoiceManager(models.Manager.from_queryset(FeeInvoiceQuerySet)):
+    """
+    Manager with the payment-posting helper used by Payment.
+    """
+    def apply_payment(self, invoice_id, amount):
+        """
+        Add ``amount`` (negative for refunds, edits and deletes) to the invoice's
+        paid amount and recompute its status in the same locked UPDATE.
+        """
+        if not amount:
+            return 0
+        paid_amount = F('paid_amount') + amount
+        return self.filter(pk=invoice_id).update(
+            paid_amount=paid_amount,
+            status=posted_status(paid_amount, F('total_amount'), F('status'), F('due_date')),
+        )
+
+    def mark_overdue(self, today=None):
+        """
+        Flip every pending invoice whose due date has passed to overdue with a
+        single UPDATE served by the (status, due_date) index. Returns the number
+        of invoices changed.
+        """
+        today = today or datetime.date.today()
+        return self.filter(status='pending', due_date__lt=today).update(status='overdue')
+
 class FeeInvoice(models.Model):
     """
     Model for storing fee invoices for students.
@@ -35,11 +102,30 @@ class FeeInvoice(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     due_date = models.DateField()
     issue_date = models.DateField(auto_now_add=True)
+    billing_period = models.CharField(max_length=20, blank=True, null=True, help_text='Billing period of a generated recurring invoice, e.g. 2025-T1')
     notes = models.TextField(blank=True, null=True)
 
+    objects = FeeInvoiceManager()
+
     def __str__(self):
         return f"Invoice #{self.invoice_number} - {self.student}"
 
+    def save(self, *args, **kwargs):
+        # paid_amount is posted in SQL by payments; never write back a stale
+        # value, and derive the status from the stored one in the same UPDATE
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'paid_amount'
+            ]
+        if 'status' not in kwargs['update_fields']:
+            return super().save(*args, **kwargs)
+        self.status = posted_status(F('paid_amount'), Value(self.total_amount), Value(self.status), Value(self.due_date))
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['paid_amount', 'status'])
+
     @property
     def balance(self):
         return self.total_amount - self.paid_amount
@@ -50,6 +136,15 @@ class FeeInvoice(models.Model):
 
     class Meta:
         ordering = ['-issue_date']
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'billing_period'], name='unique_invoice_per_student_period'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='invoice_status_due_date_idx'),
+            # Serve the list's newest-first ordering and its date and status filters
+            models.Index(fields=['issue_date', 'id'], name='invoice_issue_date_idx'),
+            models.Index(fields=['status', 'issue_date', 'id'], name='invoice_status_issue_date_idx'),
+        ]
 
 class FeeInvoiceItem(models.Model):
     """
@@ -63,6 +158,58 @@ class FeeInvoiceItem(models.Model):
     def __str__(self):
         return f"{self.category.name} - ${self.amount}"
 
+class PaymentQuerySet(models.QuerySet):
+    """
+    QuerySet that posts bulk payment changes to their invoices.
+    """
+    def _totals_by_invoice(self, pks):
+        totals = defaultdict(int)
+        rows = (
+            Payment.objects.filter(pk__in=pks)
+            .values('invoice_id')
+            .annotate(total=Sum('amount'))
+            .order_by()
+        )
+        for row in rows:
+            totals[row['invoice_id']] += row['total']
+        return totals
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            totals = defaultdict(int)
+            for obj in objs:
+                totals[obj.invoice_id] += obj.amount
+            for invoice_id, amount in totals.items():
+                FeeInvoice.objects.apply_payment(invoice_id, amount)
+        fee_totals_changed.send(sender=Payment)
+        return objs
+
+    def update(self, **kwargs):
+        if not {'amount', 'invoice', 'invoice_id'} & set(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            pks = list(self.select_for_update().values_list('pk', flat=True).order_by())
+            before = self._totals_by_invoice(pks)
+            rows = super().update(**kwargs)
+            after = self._totals_by_invoice(pks)
+            for invoice_id in sorted(before.keys() | after.keys()):
+                FeeInvoice.objects.apply_payment(invoice_id, after[invoice_id] - before[invoice_id])
+        fee_totals_changed.send(sender=Payment)
+        return rows
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            totals = self._totals_by_invoice(self.select_for_update().values_list('pk', flat=True).order_by())
+            result = super().delete()
+            for invoice_id in sorted(totals):
+                FeeInvoice.objects.apply_payment(invoice_id, -totals[invoice_id])
+        fee_totals_changed.send(sender=Payment)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
 class Payment(models.Model):
     """
     Model for storing payment records.
@@ -83,23 +230,42 @@ class Payment(models.Model):
     receipt_number = models.CharField(max_length=20, unique=True, default=uuid.uuid4)
     notes = models.TextField(blank=True, null=True)
 
+    objects = PaymentQuerySet.as_manager()
+
     def __str__(self):
         return f"Payment of ${self.amount} for {self.invoice}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        # Update the invoice paid amount and status
-        invoice = self.invoice
-        total_paid = sum(payment.amount for payment in invoice.payments.all())
-        invoice.paid_amount = total_paid
+        with transaction.atomic():
+            # Lock the stored payment so concurrent edits see each other's amounts
+            previous = None
+            if not self._state.adding:
+                previous = (
+                    Payment.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('invoice_id', 'amount')
+                    .first()
+                )
+            super().save(*args, **kwargs)
 
-        if total_paid >= invoice.total_amount:
-            invoice.status = 'paid'
-        elif invoice.status == 'paid':
-            invoice.status = 'pending'
+            # Post only the change to the invoice paid amount and status
+            if previous and previous[0] != self.invoice_id:
+                FeeInvoice.objects.apply_payment(previous[0], -previous[1])
+                FeeInvoice.objects.apply_payment(self.invoice_id, self.amount)
+            else:
+                FeeInvoice.objects.apply_payment(self.invoice_id, self.amount - (previous[1] if previous else 0))
 
-        invoice.save()
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            invoice_id, amount = (
+                Payment.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list('invoice_id', 'amount')
+                .get()
+            )
+            result = super().delete(*args, **kwargs)
+            FeeInvoice.objects.apply_payment(invoice_id, -amount)
+        return result
 
     class Meta:
         ordering = ['-payment_date']
\ No newline at end of file
@@ -0,0 +1,71 @@
+from django.db import transaction
+
+from .models import FeeCategory, FeeInvoice, FeeInvoiceItem, fee_totals_changed
+from students.models import Student
+
+
+def recurring_invoice_targets(include_inactive=False):
+    """Return the students that recurring invoices are generated for."""
+    students = Student.objects.all()
+    if not include_inactive:
+        students = students.filter(enrollments__status='active').distinct()
+    return students.order_by('pk')
+
+def generate_recurring_invoices(period, due_date, students=None, categories=None, chunk_size=1000, progress=None):
+    """
+    Create one invoice per student for ``period`` from the recurring fee categories,
+    or from the recurring ones among ``categories`` when given.
+
+    Students are processed in primary-key order, ``chunk_size`` at a time, each
+    chunk in its own transaction with ``bulk_create``. Students that already have
+    an invoice for the period are skipped, so an interrupted run can simply be
+    started again. ``progress`` is called with ``(processed, total, created)``
+    after every chunk. Returns the number of invoices created.
+    """
+    if categories is None:
+        categories = FeeCategory.objects.all()
+    categories = list(categories.filter(is_recurring=True).order_by('pk'))
+    if not categories:
+        return 0
+    total_amount = sum(category.amount for category in categories)
+
+    if students is None:
+        students = recurring_invoice_targets()
+    student_ids = list(students.values_list('pk', flat=True).order_by('pk'))
+
+    created = 0
+    for start in range(0, len(student_ids), chunk_size):
+        chunk = student_ids[start:start + chunk_size]
+        with transaction.atomic():
+            invoiced = set(
+                FeeInvoice.objects.filter(billing_period=period, student_id__in=chunk)
+                .values_list('student_id', flat=True)
+            )
+            pending = [student_id for student_id in chunk if student_id not in invoiced]
+            FeeInvoice.objects.bulk_create([
+                FeeInvoice(
+                    student_id=student_id,
+                    billing_period=period,
+                    total_amount=total_amount,
+                    due_date=due_date,
+                    notes=f'Recurring fees for {period}',
+                )
+                for student_id in pending
+            ], batch_size=chunk_size)
+
+            # Re-read the new ids so this also works on backends that do not
+            # return primary keys from bulk inserts
+            invoice_ids = FeeInvoice.objects.filter(
+                billing_period=period, student_id__in=pending
+            ).values_list('pk', flat=True)
+            FeeInvoiceItem.objects.bulk_create([
+                FeeInvoiceItem(invoice_id=invoice_id, category=category, amount=category.amount)
+                for invoice_id in invoice_ids
+                for category in categories
+            ], batch_size=chunk_size)
+        created += len(pending)
+        if progress:
+            progress(start + len(chunk), len(student_ids), created)
+    if created:
+        fee_totals_changed.send(sender=FeeInvoice)
+    return created
@@ -1,3 +1,300 @@
-from django.test import TestCase
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from courses.models import Course, Enrollment
+from students.models import Student
+from .models import FeeCategory, FeeInvoice, FeeInvoiceItem, Payment
+from .services import generate_recurring_invoices
+
+
+def make_invoice(student, total='100.00'):
+    due_date = datetime.date.today() + datetime.timedelta(days=30)
+    return FeeInvoice.objects.create(student=student, total_amount=Decimal(total), due_date=due_date)
+
+
+class PaymentPostingTests(TestCase):
+    """Tests for posting payments to their invoice."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='student', password='pass', user_type='student')
+        cls.student = Student.objects.create(user=user, student_id='S1', gender='female')
+
+    def assertInvoice(self, invoice, paid_amount, status):
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.paid_amount, Decimal(paid_amount))
+        self.assertEqual(invoice.status, status)
+
+    def test_create_edit_and_delete(self):
+        invoice = make_invoice(self.student)
+        payment = Payment.objects.create(invoice=invoice, amount=Decimal('60.00'), payment_method='cash')
+        self.assertInvoice(invoice, '60.00', 'pending')
+
+        payment.amount = Decimal('100.00')
+        payment.save()
+        self.assertInvoice(invoice, '100.00', 'paid')
+
+        payment.delete()
+        self.assertInvoice(invoice, '0.00', 'pending')
+
+    def test_moving_payment_between_invoices(self):
+        first, second = make_invoice(self.student), make_invoice(self.student, '50.00')
+        payment = Payment.objects.create(invoice=first, amount=Decimal('50.00'), payment_method='cash')
+
+        payment.invoice = second
+        payment.save()
+        self.assertInvoice(first, '0.00', 'pending')
+        self.assertInvoice(second, '50.00', 'paid')
+
+    def test_bulk_operations(self):
+        invoice = make_invoice(self.student)
+        Payment.objects.bulk_create([
+            Payment(invoice=invoice, amount=Decimal('30.00'), payment_method='cash') for i in range(3)
+        ])
+        self.assertInvoice(invoice, '90.00', 'pending')
+
+        Payment.objects.filter(invoice=invoice).update(amount=Decimal('40.00'))
+        self.assertInvoice(invoice, '120.00', 'paid')
+
+        Payment.objects.filter(invoice=invoice).delete()
+        self.assertInvoice(invoice, '0.00', 'pending')
+
+    def test_stale_invoice_save_keeps_paid_amount(self):
+        invoice = make_invoice(self.student)
+        Payment.objects.create(invoice=invoice, amount=Decimal('25.00'), payment_method='cash')
+        invoice.notes = 'Edited while a payment was posted'
+        invoice.save()
+        self.assertInvoice(invoice, '25.00', 'pending')
+
+    def test_stale_invoice_save_keeps_status(self):
+        invoice = make_invoice(self.student)
+        Payment.objects.create(invoice=invoice, amount=Decimal('100.00'), payment_method='cash')
+        invoice.notes = 'Edited while the invoice was paid off'
+        invoice.save()
+        self.assertEqual(invoice.status, 'paid')
+        self.assertInvoice(invoice, '100.00', 'paid')
+
+        Payment.objects.filter(invoice=invoice).update(amount=Decimal('40.00'))
+        invoice.status = 'paid'
+        invoice.save()
+        self.assertInvoice(invoice, '40.00', 'pending')
+
+    def test_posting_cost_does_not_grow_with_payment_history(self):
+        invoice = make_invoice(self.student, '100000.00')
+        Payment.objects.bulk_create([
+            Payment(invoice=invoice, amount=Decimal('1.00'), payment_method='cash') for i in range(200)
+        ])
+        with self.assertNumQueries(4):
+            Payment.objects.create(invoice=invoice, amount=Decimal('1.00'), payment_method='cash')
+        self.assertInvoice(invoice, '201.00', 'pending')
+
+
+class ConcurrentPaymentPostingTests(TransactionTestCase):
+    """Stress test posting many payments to one invoice from several threads."""
+
+    def test_concurrent_payments_keep_correct_balance(self):
+        user = User.objects.create_user(username='student', password='pass', user_type='student')
+        student = Student.objects.create(user=user, student_id='S1', gender='male')
+        invoice = make_invoice(student, '300.00')
+
+        def post(index):
+            # SQLite reports lock contention instead of waiting, so retry the
+            # whole (rolled back) transaction like a client would
+            try:
+                for attempt in range(100):
+                    try:
+                        return Payment.objects.create(invoice_id=invoice.pk, amount=Decimal('1.50'), payment_method='cash')
+                    except OperationalError as e:
+                        if 'locked' not in str(e):
+                            raise
+                        time.sleep(0.01)
+                raise AssertionError('Payment could not be posted')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(post, range(200)))
+
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.paid_amount, Decimal('300.00'))
+        self.assertEqual(invoice.status, 'paid')
+        self.assertEqual(invoice.balance, Decimal('0.00'))
+
+
+class GenerateInvoicesTests(TestCase):
+    """Tests for batch generation of recurring invoices."""
+
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name='Maths', code='MAT101')
+        users = User.objects.bulk_create([User(username=f'student{i}', user_type='student') for i in range(5)])
+        cls.students = Student.objects.bulk_create([
+            Student(user=user, student_id=f'S{i}', gender='other') for i, user in enumerate(users)
+        ])
+        Enrollment.objects.bulk_create([Enrollment(student=student, course=course) for student in cls.students[:4]])
+        FeeCategory.objects.create(name='Tuition', amount=Decimal('250.00'))
+        FeeCategory.objects.create(name='Library', amount=Decimal('20.00'))
+        FeeCategory.objects.create(name='Admission', amount=Decimal('500.00'), is_recurring=False)
+
+    def test_command_creates_invoices_and_items(self):
+        out = StringIO()
+        call_command('generate_invoices', '2025-T1', due_date='2025-04-30', stdout=out)
+        self.assertIn('Generated 4 invoices', out.getvalue())
+
+        invoices = FeeInvoice.objects.filter(billing_period='2025-T1')
+        self.assertEqual(invoices.count(), 4)
+        self.assertFalse(invoices.filter(student=self.students[4]).exists())
+        invoice = invoices.get(student=self.students[0])
+        self.assertEqual(invoice.total_amount, Decimal('270.00'))
+        self.assertEqual(invoice.items.count(), 2)
+
+    def test_generation_is_idempotent_and_resumable(self):
+        def interrupt(processed, total, created):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            generate_recurring_invoices('2025-T2', datetime.date(2025, 8, 31), chunk_size=2, progress=interrupt)
+        self.assertEqual(FeeInvoice.objects.filter(billing_period='2025-T2').count(), 2)
+
+        created = generate_recurring_invoices('2025-T2', datetime.date(2025, 8, 31), chunk_size=2)
+        self.assertEqual(created, 2)
+        self.assertEqual(generate_recurring_invoices('2025-T2', datetime.date(2025, 8, 31)), 0)
+        self.assertEqual(FeeInvoiceItem.objects.filter(invoice__billing_period='2025-T2').count(), 8)
+
+
+class OverdueSweepTests(TestCase):
+    """Tests for the overdue invoice sweeper."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='student', password='pass', user_type='student')
+        cls.student = Student.objects.create(user=user, student_id='S1', gender='female')
+
+    def test_sweep_only_flips_past_due_pending_invoices(self):
+        past, future = datetime.date(2020, 1, 1), datetime.date.today() + datetime.timedelta(days=30)
+        late = FeeInvoice.objects.create(student=self.student, total_amount=10, due_date=past)
+        paid = FeeInvoice.objects.create(student=self.student, total_amount=10, due_date=past, status='paid')
+        upcoming = FeeInvoice.objects.create(student=self.student, total_amount=10, due_date=future)
+
+        out = StringIO()
+        with self.assertNumQueries(1):
+            call_command('mark_overdue_invoices', stdout=out)
+        self.assertIn('Marked 1 invoices', out.getvalue())
+        self.assertEqual(
+            dict(FeeInvoice.objects.values_list('pk', 'status')),
+            {late.pk: 'overdue', paid.pk: 'paid', upcoming.pk: 'pending'},
+        )
+
+    def test_removing_payment_from_past_due_invoice_makes_it_overdue(self):
+        invoice = FeeInvoice.objects.create(student=self.student, total_amount=10, due_date=datetime.date(2020, 1, 1))
+        payment = Payment.objects.create(invoice=invoice, amount=10, payment_method='cash')
+        payment.delete()
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.status, 'overdue')
+
+
+class FeeInvoiceListSearchTests(TestCase):
+    """Tests for searching and filtering the fee invoice list."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+        alice = User.objects.create_user(username='alice', first_name='Alice', last_name='Moss', user_type='student')
+        bob = User.objects.create_user(username='bob', first_name='Bob', last_name='Stone', user_type='student')
+        cls.alice = Student.objects.create(user=alice, student_id='STU-100', gender='female')
+        cls.bob = Student.objects.create(user=bob, student_id='STU-200', gender='male')
+        due_date = datetime.date.today() + datetime.timedelta(days=30)
+        cls.invoices = {
+            number: FeeInvoice.objects.create(
+                invoice_number=number, student=student, total_amount=10, due_date=due_date, status=status
+            )
+            for number, student, status in (
+                ('INV-2025-001', cls.alice, 'pending'),
+                ('INV-2025-002', cls.bob, 'paid'),
+                ('INV-2024-001', cls.bob, 'pending'),
+            )
+        }
+        FeeInvoice.objects.filter(invoice_number='INV-2024-001').update(issue_date=datetime.date(2024, 6, 1))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def listed(self, **params):
+        response = self.client.get(reverse('fee_invoice_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(invoice.invoice_number for invoice in response.context['invoices'])
+
+    def test_search_by_invoice_number_prefix_and_student(self):
+        self.assertEqual(self.listed(search='INV-2025'), ['INV-2025-001', 'INV-2025-002'])
+        self.assertEqual(self.listed(search='2025'), [])
+        self.assertEqual(self.listed(search='stu-2'), ['INV-2024-001', 'INV-2025-002'])
+        self.assertEqual(self.listed(search='alice mo'), ['INV-2025-001'])
+        self.assertEqual(self.listed(search='alice stone'), [])
+
+    def test_status_and_issue_date_filters(self):
+        self.assertEqual(self.listed(status='pending'), ['INV-2024-001', 'INV-2025-001'])
+        self.assertEqual(self.listed(start_date='2025-01-01'), ['INV-2025-001', 'INV-2025-002'])
+        self.assertEqual(self.listed(end_date='2024-12-31', status='pending'), ['INV-2024-001'])
+
+    def test_rows_do_not_query_their_student(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.listed()
+        self.assertFalse([q for q in queries if 'FROM "students_student"' in q['sql'] and 'fees_feeinvoice' not in q['sql']])
+
+    def test_invoice_autocomplete(self):
+        response = self.client.get(reverse('fee_invoice_autocomplete'), {'q': 'INV-2024'})
+        invoice = self.invoices['INV-2024-001']
+        self.assertEqual(response.json(), {'results': [{'id': invoice.pk, 'text': str(invoice)}]})
+
+
+class FeeExportTests(TestCase):
+    """Tests for the CSV exports of the invoice and payment lists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+        user = User.objects.create_user(username='student', password='pass', user_type='student',
+                                        first_name='=HYPERLINK("x")', last_name='Doe')
+        cls.student = Student.objects.create(user=user, student_id='S1', gender='male')
+        cls.paid = make_invoice(cls.student, '50.00')
+        Payment.objects.create(invoice=cls.paid, amount=Decimal('50.00'), payment_method='cash')
+        cls.pending = make_invoice(cls.student, '75.00')
+
+    def export(self, url, **filters):
+        response = self.client.get(url, {**filters, 'export': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment; filename="'))
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_invoice_export_respects_the_list_filters(self):
+        self.client.force_login(self.admin)
+        lines = self.export(reverse('fee_invoice_list'), status='pending', page=2)
+        self.assertEqual(lines[0].split(',')[:3], ['Invoice number', 'Student ID', 'First name'])
+        self.assertEqual(len(lines), 2)
+        self.assertIn(str(self.pending.invoice_number), lines[1])
+        # Cells that spreadsheets would evaluate are quoted
+        self.assertIn('"\'=HYPERLINK(""x"")"', lines[1])
+        self.assertIn('75.00,0.00,pending', lines[1])
+        self.assertEqual(len(self.export(reverse('fee_invoice_list'))), 3)
+
+    def test_payment_export_is_admin_only(self):
+        self.client.force_login(self.admin)
+        lines = self.export(reverse('payment_list'))
+        self.assertEqual(len(lines), 2)
+        self.assertIn('50.00,cash', lines[1])
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('payment_list'), {'export': 'csv'})
+        self.assertFalse(getattr(response, 'streaming', False))
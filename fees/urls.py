@@ -12,6 +12,7 @@ urlpatterns = [
     path('invoices/', views.FeeInvoiceListView.as_view(), name='fee_invoice_list'),
     path('invoices/<int:pk>/', views.FeeInvoiceDetailView.as_view(), name='fee_invoice_detail'),
     path('invoices/create/', views.FeeInvoiceCreateView.as_view(), name='fee_invoice_create'),
+    path('invoices/autocomplete/', views.FeeInvoiceAutocompleteView.as_view(), name='fee_invoice_autocomplete'),
     path('invoices/<int:pk>/update/', views.FeeInvoiceUpdateView.as_view(), name='fee_invoice_update'),
     path('invoices/<int:pk>/delete/', views.FeeInvoiceDeleteView.as_view(), name='fee_invoice_delete'),
     
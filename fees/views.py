@@ -5,10 +5,13 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 
-from .forms import FeeCategoryForm, FeeInvoiceForm, FeeInvoiceItemFormSet, PaymentForm, PaymentCreateForm
+from .forms import FeeCategoryForm, FeeInvoiceForm, FeeInvoiceFilterForm, FeeInvoiceItemFormSet, PaymentForm, PaymentCreateForm
 from .models import FeeCategory, FeeInvoice, FeeInvoiceItem, Payment
-from students.models import Student
+from accounts.middleware import get_profile_or_404
 from students.views import AdminRequiredMixin
+from institute_management.autocomplete import AutocompleteView
+from institute_management.exports import CsvExportMixin
+from institute_management.pagination import KeysetPaginationMixin
 
 # Fee Category Views
 class FeeCategoryListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
@@ -38,12 +41,48 @@ class FeeCategoryDeleteView(LoginRequiredMixin, AdminRequiredMixin, DeleteView):
     success_url = reverse_lazy('fee_category_list')
 
 # Fee Invoice Views
-class FeeInvoiceListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class FeeInvoiceListView(LoginRequiredMixin, AdminRequiredMixin, CsvExportMixin, KeysetPaginationMixin, ListView):
     """View to list all fee invoices."""
     model = FeeInvoice
     template_name = 'fees/fee_invoice_list.html'
     context_object_name = 'invoices'
     paginate_by = 10
+    count_strategy = 'cached'
+    export_filename = 'invoices'
+    export_fields = (
+        ('Invoice number', 'invoice_number'),
+        ('Student ID', 'student__student_id'),
+        ('First name', 'student__user__first_name'),
+        ('Last name', 'student__user__last_name'),
+        ('Billing period', 'billing_period'),
+        ('Issue date', 'issue_date'),
+        ('Due date', 'due_date'),
+        ('Total amount', 'total_amount'),
+        ('Paid amount', 'paid_amount'),
+        ('Status', 'status'),
+    )
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('student__user')
+
+        # Apply filters if provided
+        filter_form = FeeInvoiceFilterForm(self.request.GET)
+        if filter_form.is_valid():
+            if filter_form.cleaned_data.get('search'):
+                queryset = queryset.search(filter_form.cleaned_data['search'])
+            if filter_form.cleaned_data.get('status'):
+                queryset = queryset.filter(status=filter_form.cleaned_data['status'])
+            if filter_form.cleaned_data.get('start_date'):
+                queryset = queryset.filter(issue_date__gte=filter_form.cleaned_data['start_date'])
+            if filter_form.cleaned_data.get('end_date'):
+                queryset = queryset.filter(issue_date__lte=filter_form.cleaned_data['end_date'])
+
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filter_form'] = FeeInvoiceFilterForm(self.request.GET)
+        return context
 
 class FeeInvoiceDetailView(LoginRequiredMixin, DetailView):
     """View to display fee invoice details."""
@@ -132,12 +171,23 @@ class FeeInvoiceDeleteView(LoginRequiredMixin, AdminRequiredMixin, DeleteView):
     success_url = reverse_lazy('fee_invoice_list')
 
 # Payment Views
-class PaymentListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class PaymentListView(LoginRequiredMixin, AdminRequiredMixin, CsvExportMixin, KeysetPaginationMixin, ListView):
     """View to list all payments."""
     model = Payment
     template_name = 'fees/payment_list.html'
     context_object_name = 'payments'
     paginate_by = 10
+    count_strategy = 'cached'
+    export_filename = 'payments'
+    export_fields = (
+        ('Receipt number', 'receipt_number'),
+        ('Invoice number', 'invoice__invoice_number'),
+        ('Student ID', 'invoice__student__student_id'),
+        ('Payment date', 'payment_date'),
+        ('Amount', 'amount'),
+        ('Method', 'payment_method'),
+        ('Transaction ID', 'transaction_id'),
+    )
 
 class PaymentCreateView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
     """View to create a new payment."""
@@ -174,6 +224,11 @@ class StudentFeeListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         if self.request.user.is_student:
-            student = get_object_or_404(Student, user=self.request.user)
+            student = get_profile_or_404(self.request)
             return FeeInvoice.objects.filter(student=student)
-        return FeeInvoice.objects.none()
\ No newline at end of file
+        return FeeInvoice.objects.none()
+
+class FeeInvoiceAutocompleteView(LoginRequiredMixin, AdminRequiredMixin, AutocompleteView):
+    """JSON lookup of fee invoices for autocomplete fields."""
+    def search(self, term):
+        return FeeInvoice.objects.search(term).select_related('student__user')
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class InstituteManagementConfig(AppConfig):
+    name = 'institute_management'
+
+    def ready(self):
+        # Tune every new SQLite connection
+        from django.db.backends.signals import connection_created
+        from .sqlite import apply_pragmas
+        connection_created.connect(apply_pragmas, dispatch_uid='institute_management.sqlite')
@@ -0,0 +1,82 @@
+from django import forms
+from django.forms.utils import flatatt
+from django.http import JsonResponse
+from django.utils.html import format_html
+from django.views import View
+
+
+class AutocompleteWidget(forms.Widget):
+    """
+    Widget posting the selected primary key from a hidden input, with a text box
+    that looks choices up from a JSON endpoint instead of rendering every option.
+    """
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        self.choices = ()
+
+    def id_for_label(self, id_):
+        return f'{id_}_search' if id_ else id_
+
+    def label_for_value(self, value):
+        """Return the label of the selected object, looked up by primary key alone."""
+        field = getattr(self.choices, 'field', None)
+        if value in (None, '') or field is None:
+            return ''
+        try:
+            obj = field.queryset.filter(**{field.to_field_name or 'pk': value}).first()
+        except (ValueError, TypeError):
+            return ''
+        return field.label_from_instance(obj) if obj is not None else ''
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        input_id = attrs.pop('id', None) or f'id_{name}'
+        value = self.format_value(value) or ''
+        search_attrs = {
+            'placeholder': 'Type to search...',
+            **attrs,
+            'type': 'text',
+            'id': self.id_for_label(input_id),
+            'value': self.label_for_value(value),
+            'autocomplete': 'off',
+            'data-autocomplete-url': str(self.url),
+            'data-autocomplete-input': input_id,
+        }
+        return format_html(
+            '<input type="hidden" name="{}" id="{}" value="{}"><input{}>',
+            name, input_id, value, flatatt(search_attrs),
+        )
+
+
+class AutocompleteModelChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField rendered as an autocomplete. Its choices are never listed;
+    validation only looks up the submitted primary key. ``attrs`` are passed on
+    to the search box.
+    """
+    def __init__(self, queryset, url, attrs=None, **kwargs):
+        kwargs.setdefault('widget', AutocompleteWidget(url, attrs=attrs))
+        super().__init__(queryset, **kwargs)
+
+
+class AutocompleteView(View):
+    """
+    JSON endpoint answering ``?q=`` with at most ``limit`` ``{"id", "text"}``
+    results. Subclasses implement ``search()`` with an indexed lookup.
+    """
+    limit = 20
+    min_length = 1
+
+    def search(self, term):
+        raise NotImplementedError('Subclasses of AutocompleteView must implement search()')
+
+    def label(self, obj):
+        return str(obj)
+
+    def get(self, request, *args, **kwargs):
+        term = request.GET.get('q', '').strip()
+        results = []
+        if len(term) >= self.min_length:
+            results = [{'id': obj.pk, 'text': self.label(obj)} for obj in self.search(term)[:self.limit]]
+        return JsonResponse({'results': results})
@@ -0,0 +1,325 @@
+import logging
+import math
+import os
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from accounts.models import User
+from attendance.models import AttendanceRecord
+from fees.models import FeeInvoice
+from students.models import Student
+from teachers.models import Teacher
+
+from .sqlite import TRANSACTION_MODES, pragma_statements
+
+# URL names never requested: they change the session or aren't pages
+SKIP_NAMES = {'logout'}
+SKIP_NAMESPACES = {'admin'}
+# Models of the URL arguments of views that don't declare one
+ARGUMENT_MODELS = {
+    'update_attendance': AttendanceRecord,
+    'create_payment_for_invoice': FeeInvoice,
+}
+# Query strings of endpoints that need one to do any work
+QUERY_STRINGS = {
+    'student_autocomplete': 'q=a',
+    'course_autocomplete': 'q=a',
+    'fee_invoice_autocomplete': 'q=a',
+}
+
+
+def percentile(values, p):
+    """Return the ``p``-th percentile of ``values``, interpolating between ranks."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+def _walk(patterns, prefix='', namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, prefix + str(pattern.pattern), pattern.namespace or namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield namespace, pattern, prefix + str(pattern.pattern)
+
+def discover_endpoints(urlconf=None):
+    """
+    Return ``(name, path)`` for every named URL of the project, with primary
+    key arguments filled in from the first row of the view's model. URLs whose
+    arguments can't be filled in are left out.
+    """
+    endpoints = []
+    seen = set()
+    for namespace, pattern, route in _walk(get_resolver(urlconf).url_patterns):
+        name = pattern.name
+        if namespace in SKIP_NAMESPACES or name in SKIP_NAMES or name in seen:
+            continue
+        seen.add(name)
+        arguments = re.findall(r'<(?:\w+:)?(\w+)>', route)
+        kwargs = {}
+        if arguments:
+            view_class = getattr(pattern.callback, 'view_class', None)
+            model = ARGUMENT_MODELS.get(name) or getattr(view_class, 'model', None)
+            pk = model._default_manager.order_by('pk').values_list('pk', flat=True).first() if model else None
+            if pk is None or len(arguments) > 1:
+                continue
+            kwargs[arguments[0]] = pk
+        path = reverse(name, kwargs=kwargs, urlconf=urlconf)
+        if name in QUERY_STRINGS:
+            path = f'{path}?{QUERY_STRINGS[name]}'
+        endpoints.append((name, path))
+    return endpoints
+
+def role_users():
+    """Return a user of each role to log in as, preferring ones with data to show."""
+    admin = User.objects.filter(user_type='admin').order_by('pk').first()
+    if admin is None:
+        admin = User.objects.create_user(username='benchmark_admin', password=None, user_type='admin')
+    teacher = Teacher.objects.filter(courses__isnull=False).select_related('user').order_by('pk').first()
+    student = Student.objects.filter(enrollments__status='active').select_related('user').order_by('pk').first()
+    users = {'admin': admin}
+    if teacher:
+        users['teacher'] = teacher.user
+    if student:
+        users['student'] = student.user
+    return users
+
+
+class EndpointBenchmark:
+    """
+    Request every endpoint ``requests`` times as each role through the test
+    client, from ``concurrency`` threads, and collect the latency, number of
+    queries and size of each response. Endpoints a role isn't allowed to view
+    (any status other than 200) are reported as skipped for that role.
+    """
+    def __init__(self, endpoints, users, requests=20, concurrency=1, warmup=1):
+        self.endpoints = endpoints
+        self.users = users
+        self.requests = requests
+        self.concurrency = max(1, concurrency)
+        self.warmup = warmup
+
+    def _client(self, cookies):
+        # Views that fail are reported with their 500 status instead of stopping the run
+        client = Client(raise_request_exception=False)
+        client.cookies = cookies
+        return client
+
+    def _sample(self, client, path):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed * 1000, len(queries), size
+
+    def _worker(self, cookies, path, count):
+        client = self._client(cookies)
+        try:
+            return [self._sample(client, path) for i in range(count)]
+        finally:
+            connections.close_all()
+
+    def measure(self, cookies, path):
+        client = self._client(cookies)
+        status = self._sample(client, path)[0]
+        if status != 200:
+            return {'status': status}
+        for i in range(self.warmup - 1):
+            self._sample(client, path)
+
+        shares = [self.requests // self.concurrency + (i < self.requests % self.concurrency)
+                  for i in range(self.concurrency)]
+        started = time.perf_counter()
+        if self.concurrency == 1:
+            samples = [self._sample(client, path) for i in range(self.requests)]
+        else:
+            with ThreadPoolExecutor(self.concurrency) as executor:
+                samples = [
+                    sample
+                    for result in executor.map(lambda count: self._worker(cookies, path, count), shares)
+                    for sample in result
+                ]
+        wall = time.perf_counter() - started
+        latencies = [latency for status, latency, queries, size in samples]
+        return {
+            'status': 200,
+            'requests': len(samples),
+            'errors': sum(1 for sample in samples if sample[0] != 200),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries': max(sample[2] for sample in samples),
+            'bytes': max(sample[3] for sample in samples),
+            'requests_per_second': round(len(samples) / wall, 1) if wall else None,
+        }
+
+    def run(self, progress=None):
+        """Return ``{"role name": {...}}`` results and ``{"role name": status}`` skips."""
+        results = {}
+        skipped = {}
+        # Failing views are counted in the skips; don't log a traceback for each request
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            self._run(results, skipped, progress)
+        finally:
+            request_logger.setLevel(level)
+        return results, skipped
+
+    def _run(self, results, skipped, progress):
+        for role, user in self.users.items():
+            login = Client()
+            login.force_login(user)
+            for name, path in self.endpoints:
+                key = f'{role} {name}'
+                result = self.measure(login.cookies, path)
+                if result['status'] != 200:
+                    skipped[key] = result['status']
+                    continue
+                results[key] = {'role': role, 'name': name, 'path': path, **result}
+                if progress:
+                    progress(key, results[key])
+
+def compare(results, baseline, threshold=20, min_delta_ms=2.0, skipped=None):
+    """
+    Return the regressions of ``results`` against a ``baseline`` run: endpoints
+    that now fail (their status in ``skipped``) or are no longer measured,
+    endpoints whose p95 grew by more than ``threshold`` percent and
+    ``min_delta_ms``, and endpoints that run more queries than before.
+    """
+    skipped = skipped or {}
+    regressions = []
+    for key, before in baseline.items():
+        result = results.get(key)
+        if result is None:
+            if key in skipped:
+                regressions.append(f'{key}: status {before.get("status", 200)} -> {skipped[key]}')
+            else:
+                regressions.append(f'{key}: no longer measured')
+            continue
+        delta = result['p95_ms'] - before['p95_ms']
+        if delta > min_delta_ms and result['p95_ms'] > before['p95_ms'] * (1 + threshold / 100):
+            regressions.append(f'{key}: p95 {before["p95_ms"]}ms -> {result["p95_ms"]}ms')
+        if result['queries'] > before['queries']:
+            regressions.append(f'{key}: {before["queries"]} -> {result["queries"]} queries')
+    return regressions
+
+
+class WriterBenchmark:
+    """
+    Measure concurrent writers on a scratch database file: each of ``writers``
+    threads runs ``transactions`` transactions that read a count and then
+    insert ``rows`` rows, like an attendance submission, while ``readers``
+    threads keep querying. Threads use their own connection with ``pragmas``
+    and begin transactions in ``transaction_mode``.
+    """
+    def __init__(self, path, pragmas=None, transaction_mode='DEFERRED', writers=4, readers=2,
+                 transactions=200, rows=30):
+        self.path = path
+        if transaction_mode not in TRANSACTION_MODES:
+            raise ValueError(f'Invalid transaction mode: {transaction_mode!r}')
+        self.statements = pragma_statements(pragmas or {})
+        self.transaction_mode = transaction_mode
+        self.writers = writers
+        self.readers = readers
+        self.transactions = transactions
+        self.rows = rows
+
+    def connect(self):
+        # Without a busy_timeout pragma, this is the busy timeout
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        for statement in self.statements:
+            connection.execute(statement)
+        return connection
+
+    def setup(self):
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        connection = self.connect()
+        connection.execute(
+            'CREATE TABLE mark (id INTEGER PRIMARY KEY, record INTEGER NOT NULL, student INTEGER NOT NULL, '
+            'status TEXT NOT NULL)'
+        )
+        connection.execute('CREATE INDEX mark_record ON mark (record)')
+        connection.close()
+
+    def write(self, number, latencies, errors):
+        connection = self.connect()
+        try:
+            for i in range(self.transactions):
+                record = number * self.transactions + i
+                started = time.perf_counter()
+                try:
+                    connection.execute(f'BEGIN {self.transaction_mode}')
+                    connection.execute('SELECT COUNT(*) FROM mark WHERE record = ?', [record]).fetchone()
+                    connection.executemany(
+                        'INSERT INTO mark (record, student, status) VALUES (?, ?, ?)',
+                        [(record, student, 'present') for student in range(self.rows)],
+                    )
+                    connection.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    # "database is locked": the submission is lost
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+                    errors.append(record)
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+
+    def read(self, stop, reads):
+        connection = self.connect()
+        try:
+            while not stop.is_set():
+                try:
+                    connection.execute('SELECT status, COUNT(*) FROM mark GROUP BY status').fetchall()
+                    reads.append(1)
+                except sqlite3.OperationalError:
+                    pass
+        finally:
+            connection.close()
+
+    def run(self):
+        self.setup()
+        latencies, errors, reads = [], [], []
+        stop = threading.Event()
+        readers = [threading.Thread(target=self.read, args=(stop, reads)) for i in range(self.readers)]
+        writers = [threading.Thread(target=self.write, args=(i, latencies, errors)) for i in range(self.writers)]
+        started = time.perf_counter()
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in readers:
+            thread.join()
+        return {
+            'committed': len(latencies),
+            'errors': len(errors),
+            'seconds': round(elapsed, 3),
+            'transactions_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+            'reads_per_second': round(len(reads) / elapsed, 1) if elapsed else None,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'max_ms': round(max(latencies), 2) if latencies else 0.0,
+            'mean_ms': round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        }
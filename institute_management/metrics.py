@@ -0,0 +1,346 @@
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+from django.utils.module_loading import import_string
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """
+    A labelled metric of the registry. Values are keyed by the tuple of label
+    values and only changed under the registry lock.
+    """
+    type = None
+
+    def __init__(self, registry, name, help, labels):
+        self.lock = registry.lock
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def merge(self, values, key, value):
+        """Add another process's ``value`` for ``key`` into ``values``."""
+        raise NotImplementedError
+
+    def samples(self, values):
+        raise NotImplementedError
+
+    def _labels(self, key, **extra):
+        pairs = [*zip(self.labels, key), *extra.items()]
+        if not pairs:
+            return ''
+        escaped = (
+            (name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+            for name, value in pairs
+        )
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def merge(self, values, key, value):
+        values[key] = values.get(key, 0) + value
+
+    def samples(self, values):
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{self._labels(key)} {value:g}'
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, registry, name, help, labels, buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value):
+        # Per-bucket (not cumulative) counts, then the sum and the count
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def merge(self, values, key, value):
+        state = values.get(key)
+        if state is None:
+            values[key] = list(value)
+        else:
+            values[key] = [a + b for a, b in zip(state, value)]
+
+    def samples(self, values):
+        for key, state in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), state):
+                cumulative += count
+                yield f'{self.name}_bucket{self._labels(key, le=f"{bound:g}" if bound != "+Inf" else bound)} {cumulative}'
+            yield f'{self.name}_sum{self._labels(key)} {state[-2]:g}'
+            yield f'{self.name}_count{self._labels(key)} {state[-1]}'
+
+
+class Registry:
+    """
+    Thread-safe in-process collection of metrics, rendered in the Prometheus
+    text format. With ``METRICS_DIR`` set, each process saves its values there
+    and the rendering merges every process's file.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.last_save = 0.0
+
+    def counter(self, name, help, labels=()):
+        return self.metrics.setdefault(name, Counter(self, name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(self, name, help, labels, buckets))
+
+    def snapshot(self):
+        """Return ``{metric name: [[labels, value], ...]}`` of this process."""
+        with self.lock:
+            return {
+                name: [[list(key), value if not isinstance(value, list) else list(value)]
+                       for key, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def _path(self, directory):
+        return os.path.join(directory, f'metrics-{os.getpid()}.json')
+
+    def save(self, directory, interval=0):
+        """Write this process's values to ``directory``, at most every ``interval`` seconds."""
+        now = time.monotonic()
+        if now - self.last_save < interval:
+            return
+        self.last_save = now
+        path = self._path(directory)
+        temporary = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary, path)
+
+    def collect(self, directory=None):
+        """Merge this process's values with the files of the other processes."""
+        snapshots = [self.snapshot()]
+        if directory:
+            own = self._path(directory)
+            for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+                if path == own:
+                    continue
+                try:
+                    with open(path) as file:
+                        snapshots.append(json.load(file))
+                except (OSError, ValueError):
+                    continue
+        merged = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, values in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in values:
+                    metric.merge(merged[name], tuple(key), value)
+        return merged
+
+    def render(self, directory=None):
+        lines = []
+        for name, values in self.collect(directory).items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            lines.extend(metric.samples(values))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'institute_http_requests_total', 'HTTP requests by URL name, method and status.', ('view', 'method', 'status'),
+)
+REQUEST_DURATION = registry.histogram(
+    'institute_http_request_duration_seconds', 'Time to produce a response, by URL name.', ('view',),
+)
+DB_QUERIES = registry.counter(
+    'institute_db_queries_total', 'Database queries run by requests, by URL name.', ('view',),
+)
+DB_DURATION = registry.histogram(
+    'institute_db_duration_seconds', 'Time a request spent in database queries, by URL name.', ('view',),
+)
+TEMPLATE_DURATION = registry.histogram(
+    'institute_template_render_duration_seconds', 'Time to render a template, by template name.', ('template',),
+)
+CACHE_REQUESTS = registry.counter(
+    'institute_cache_requests_total', 'Cache lookups by cache and result (hit or miss).', ('cache', 'result'),
+)
+
+
+class QueryTimer:
+    """Database execute wrapper counting a request's queries and their time."""
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """
+    Middleware recording the count, latency and database work of every
+    request, labelled by resolved URL name. Should come first so the latency
+    covers the other middleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.directory = getattr(settings, 'METRICS_DIR', None)
+        self.interval = getattr(settings, 'METRICS_SAVE_INTERVAL', 5)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.url_name else '<unresolved>'
+        REQUESTS.inc(view, request.method, str(response.status_code))
+        REQUEST_DURATION.observe(view, value=duration)
+        DB_QUERIES.inc(view, amount=timer.queries)
+        DB_DURATION.observe(view, value=timer.duration)
+        if self.directory:
+            registry.save(self.directory, self.interval)
+        return response
+
+
+class TimedTemplate:
+    """Template wrapper recording its render time."""
+    def __init__(self, template, name):
+        self.template = template
+        self.name = name
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            TEMPLATE_DURATION.observe(self.name, value=time.perf_counter() - started)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend recording how long each loaded template takes to render."""
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name), template_name)
+
+
+class InstrumentedCache:
+    """
+    Cache backend counting the hits and misses of the cache it wraps, named by
+    ``OPTIONS['BACKEND']``; the other settings are passed on to it.
+    ``OPTIONS['NAME']`` labels the cache in the metrics.
+    """
+    _missing = object()
+
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        backend = options.pop('BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+        self.metrics_name = options.pop('NAME', backend.rsplit('.', 1)[-1])
+        params['OPTIONS'] = options
+        self.cache = import_string(backend)(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def get(self, key, default=None, version=None):
+        value = self.cache.get(key, self._missing, version=version)
+        if value is self._missing:
+            CACHE_REQUESTS.inc(self.metrics_name, 'miss')
+            return default
+        CACHE_REQUESTS.inc(self.metrics_name, 'hit')
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self.cache.get_many(keys, version=version)
+        if len(values):
+            CACHE_REQUESTS.inc(self.metrics_name, 'hit', amount=len(values))
+        if len(keys) > len(values):
+            CACHE_REQUESTS.inc(self.metrics_name, 'miss', amount=len(keys) - len(values))
+        return values
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get(key, self._missing, version=version)
+        if value is self._missing:
+            value = default() if callable(default) else default
+            self.cache.add(key, value, timeout=timeout, version=version)
+            # Return the value the cache holds, as BaseCache does
+            return self.cache.get(key, value, version=version)
+        return value
+
+
+def metrics_view(request):
+    """
+    Serve the metrics in the Prometheus text format to clients with the
+    ``METRICS_TOKEN`` bearer token. Without a token configured they are only
+    served in DEBUG, to ``METRICS_ALLOWED_IPS``: behind a reverse proxy every
+    client has the proxy's address.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        allowed = hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+        )
+    else:
+        allowed = settings.DEBUG and (
+            request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+        )
+    if not allowed:
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(getattr(settings, 'METRICS_DIR', None)),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,372 @@
+import hashlib
+import json
+from collections.abc import Sequence
+from math import ceil
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.core.paginator import EmptyPage, InvalidPage, PageNotAnInteger
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+CURSOR_SALT = 'institute_management.pagination'
+
+
+class CursorSerializer:
+    """JSON serializer for cursors, whose key values may be dates or decimals."""
+    def dumps(self, obj):
+        return json.dumps(obj, cls=DjangoJSONEncoder, separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+def _is_column_path(model, path):
+    """Return whether ``path`` (e.g. ``user__first_name``) ends on a non-relational field."""
+    field = None
+    for name in path.split('__'):
+        if field is not None:
+            if not field.is_relation or field.many_to_many or field.one_to_many:
+                return False
+            model = field.related_model
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+    return field is not None and not field.is_relation
+
+def keyset_ordering(queryset):
+    """
+    Return the ``(path, descending)`` keys a queryset is ordered by, ending with
+    the primary key as a tiebreaker, or None when its ordering can't be seeked.
+    """
+    query = queryset.query
+    ordering = query.order_by or (query.default_ordering and queryset.model._meta.ordering) or ()
+    pk_name = queryset.model._meta.pk.name
+    keys = []
+    for field in ordering:
+        if not isinstance(field, str) or field == '?':
+            return None
+        descending = field.startswith('-')
+        path = field.lstrip('-')
+        if path in ('pk', pk_name):
+            keys.append(('pk', descending))
+            return keys
+        if not _is_column_path(queryset.model, path):
+            return None
+        keys.append((path, descending))
+    keys.append(('pk', keys[-1][1] if keys else False))
+    return keys
+
+def _seek_filter(keys, values):
+    """Build the condition selecting the rows that sort after ``values``."""
+    condition = Q()
+    equal = Q()
+    for (path, descending), value in zip(keys, values):
+        condition |= equal & Q(**{f'{path}__{"lt" if descending else "gt"}': value})
+        equal &= Q(**{path: value})
+    return condition
+
+
+class KeysetPage(Sequence):
+    """
+    A page of a KeysetPaginator, with the same interface as Django's Page plus
+    the cursors of the neighbouring pages.
+    """
+    # Numbered links shown on each side of the current page
+    on_each_side = 2
+
+    def __init__(self, object_list, number, paginator, has_next, has_previous,
+                 next_cursor='', previous_cursor=''):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_page_number(self):
+        if not self._has_next:
+            raise EmptyPage('That page contains no results')
+        return self.number + 1
+
+    def previous_page_number(self):
+        if not self._has_previous:
+            raise EmptyPage('That page number is less than 1')
+        return self.number - 1
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return self.paginator.per_page * (self.number - 1) + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+    @cached_property
+    def page_links(self):
+        """
+        ``(number, cursor)`` pairs of the pages within ``on_each_side`` of this
+        one. Their cursors seek from the edge of this page, so following any
+        of them costs the same on any page.
+        """
+        first = max(1, self.number - self.on_each_side)
+        last = self.number
+        if self._has_next:
+            last = max(last, min(self.number + self.on_each_side, self.paginator.num_pages))
+        seekable = bool(self.paginator.keys and self.object_list)
+        links = []
+        for number in range(first, last + 1):
+            cursor = ''
+            if seekable and number < self.number:
+                cursor = self.paginator._cursor('previous', number, self.object_list[0], self.number - number - 1)
+            elif seekable and number > self.number:
+                cursor = self.paginator._cursor('next', number, self.object_list[-1], number - self.number - 1)
+            links.append((number, cursor))
+        return links
+
+
+class KeysetPaginator:
+    """
+    Paginator that seeks past the edge of the current page instead of using
+    OFFSET, so following the next/previous and numbered links costs the same
+    on any page. The ``'last'`` page is read from the end in reverse order.
+    Other pages requested by number alone fall back to an OFFSET query.
+
+    ``count_strategy`` controls how the total shown by the page links is found:
+    ``'exact'`` counts on every request, ``'cached'`` caches the count for
+    ``count_cache_timeout`` seconds and ``'estimate'`` uses the database's
+    table statistics for unfiltered querysets, falling back to a cached count.
+    On SQLite those statistics are the ``sqlite_stat1`` table, which only
+    exists once ``ANALYZE`` (or ``PRAGMA optimize``) has run, and is as
+    current as its last run. A ``count`` known beforehand, such as a search
+    index's number of matches, is used as is.
+    """
+    def __init__(self, queryset, per_page, count_strategy='exact', count_cache_timeout=60, count=None):
+        self.keys = keyset_ordering(queryset)
+        if self.keys:
+            queryset = queryset.order_by(*[('-' if desc else '') + path for path, desc in self.keys])
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.count_strategy = count_strategy
+        self.count_cache_timeout = count_cache_timeout
+        if count is not None:
+            self.count = count
+
+    @cached_property
+    def count(self):
+        if self.count_strategy == 'estimate':
+            estimate = self._estimate_count()
+            if estimate is not None:
+                return estimate
+        if self.count_strategy in ('cached', 'estimate'):
+            try:
+                sql, params = self.queryset.query.sql_with_params()
+            except EmptyResultSet:
+                return 0
+            digest = hashlib.md5(f'{self.queryset.db}:{sql}:{params!r}'.encode(), usedforsecurity=False)
+            key = f'pagination:count:{digest.hexdigest()}'
+            count = cache.get(key)
+            if count is None:
+                count = self.queryset.count()
+                cache.set(key, count, self.count_cache_timeout)
+            return count
+        return self.queryset.count()
+
+    def _estimate_count(self):
+        """Return the database's row estimate for an unfiltered queryset, or None."""
+        connection = connections[self.queryset.db]
+        if self.queryset.query.where:
+            return None
+        table = self.queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+                return row[0] if row and row[0] > 0 else None
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+                if cursor.fetchone() is None:
+                    return None
+                # One row per index, whose stat starts with its number of rows
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+                counts = [int(stat.split()[0]) for stat, in cursor.fetchall() if stat]
+                return max(counts) if counts and max(counts) > 0 else None
+        return None
+
+    @cached_property
+    def num_pages(self):
+        return max(1, ceil(self.count / self.per_page))
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    def validate_number(self, number):
+        """Validate a requested page number; its upper bound is not checked."""
+        if number == 'last':
+            return self.num_pages
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number=1, cursor=None):
+        """Return the page a cursor points at, or the numbered page without one."""
+        if cursor and self.keys:
+            try:
+                direction, cursor_number, values, *skip = signing.loads(
+                    cursor, salt=CURSOR_SALT, serializer=CursorSerializer
+                )
+                skip = int(skip[0]) if skip else 0
+            except (signing.BadSignature, ValueError, TypeError):
+                pass
+            else:
+                page = self._seek_page(int(cursor_number), direction == 'next', values, skip)
+                if page is not None:
+                    return page
+        if number == 'last' and self.keys:
+            return self._last_page()
+        return self._offset_page(self.validate_number(number))
+
+    def _rows(self, queryset, offset, limit):
+        """Fetch up to ``limit`` objects along with their related key values."""
+        annotations = {
+            f'_keyset_{i}': F(path) for i, (path, desc) in enumerate(self.keys or ()) if '__' in path
+        }
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return list(queryset[offset:offset + limit])
+
+    def _key_values(self, obj):
+        values = []
+        for i, (path, desc) in enumerate(self.keys):
+            if path == 'pk':
+                values.append(obj.pk)
+            elif '__' in path:
+                values.append(getattr(obj, f'_keyset_{i}'))
+            else:
+                values.append(getattr(obj, path))
+        return values
+
+    def _cursor(self, direction, number, obj, skip=0):
+        """
+        Sign a cursor to page ``number``, found by seeking past ``obj`` in
+        ``direction`` and then skipping ``skip`` pages, a bounded OFFSET.
+        """
+        values = self._key_values(obj)
+        # NULLs don't compare, so such pages are reached by number instead
+        if any(value is None for value in values):
+            return ''
+        cursor = [direction, number, values] + ([skip] if skip else [])
+        return signing.dumps(cursor, salt=CURSOR_SALT, serializer=CursorSerializer)
+
+    def _seek_page(self, number, forward, values, skip=0):
+        keys = self.keys if forward else [(path, not desc) for path, desc in self.keys]
+        queryset = self.queryset.filter(_seek_filter(keys, values))
+        if not forward:
+            queryset = queryset.reverse()
+        rows = self._rows(queryset, max(skip, 0) * self.per_page, self.per_page + 1)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows:
+            return None
+        if forward:
+            has_next, has_previous = more, True
+        else:
+            rows.reverse()
+            has_next, has_previous = True, more
+            if not more:
+                number = 1
+        return self._make_page(rows, max(number, 1), has_next, has_previous)
+
+    def _last_page(self):
+        """Return the last page, read from the end of the reversed ordering."""
+        number = self.num_pages
+        size = self.count - (number - 1) * self.per_page
+        if not 0 < size <= self.per_page:
+            # An estimated count; the page is numbered from it all the same
+            size = self.per_page
+        rows = self._rows(self.queryset.reverse(), 0, size + 1)
+        has_previous = len(rows) > size
+        rows = rows[:size]
+        rows.reverse()
+        return self._make_page(rows, number if has_previous else 1, False, has_previous)
+
+    def _offset_page(self, number):
+        bottom = (number - 1) * self.per_page
+        rows = self._rows(self.queryset, bottom, self.per_page + 1)
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        has_next = len(rows) > self.per_page
+        return self._make_page(rows[:self.per_page], number, has_next, number > 1)
+
+    def _make_page(self, rows, number, has_next, has_previous):
+        next_cursor = previous_cursor = ''
+        if self.keys and rows:
+            if has_next:
+                next_cursor = self._cursor('next', number + 1, rows[-1])
+            if has_previous:
+                previous_cursor = self._cursor('previous', number - 1, rows[0])
+        return KeysetPage(rows, number, self, has_next, has_previous, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin paginating with KeysetPaginator. Templates keep using
+    ``page_obj`` and ``paginator``; next/previous links pass on
+    ``page_obj.next_cursor``/``page_obj.previous_cursor`` as ``cursor``,
+    numbered links loop over ``page_obj.page_links`` and the last page
+    link asks for ``page=last``.
+    """
+    cursor_kwarg = 'cursor'
+    count_strategy = None
+    count_cache_timeout = None
+
+    def get_count_strategy(self):
+        return self.count_strategy or getattr(settings, 'PAGINATION_COUNT_STRATEGY', 'exact')
+
+    def get_count(self, queryset):
+        """Return the number of objects if it is known without counting ``queryset``, or None."""
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            count_strategy=self.get_count_strategy(),
+            count_cache_timeout=self.count_cache_timeout or getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 60),
+            count=self.get_count(queryset),
+        )
+        number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        try:
+            page = paginator.page(number, self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404(f'Invalid page ({number}): {e}')
+        return paginator, page, page.object_list, page.has_other_pages()
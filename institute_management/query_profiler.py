@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Placeholder lists of IN clauses, which vary in length between executions
+IN_LIST = re.compile(r'\((?:%s, )*%s\)')
+# Quoted literals and numbers written into the SQL itself
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def normalize_sql(sql):
+    """Reduce a query to its shape, so executions with different arguments group together."""
+    return LITERALS.sub('?', IN_LIST.sub('(...)', sql))
+
+def _call_site():
+    """
+    Return where the running query was triggered: the innermost template node
+    being rendered, if any, and the innermost line of project code outside
+    this module and the middleware, which wrap every query.
+    """
+    template = code = None
+    frame = sys._getframe(2)
+    while frame is not None and not (template and code):
+        if template is None and frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin, token = getattr(node, 'origin', None), getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name}:{token.lineno}'
+        filename = frame.f_code.co_filename
+        if (
+            code is None
+            and filename.startswith(str(settings.BASE_DIR))
+            and filename != __file__
+            and os.path.basename(filename) != 'middleware.py'
+            and f'{os.sep}site-packages{os.sep}' not in filename
+        ):
+            code = f'{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return template, code
+
+
+class QueryRecorder:
+    """Database execute wrapper collecting the shape, duration and origin of each query."""
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            template, code = _call_site()
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'shape': normalize_sql(sql),
+                'duration_ms': duration,
+                'template': template,
+                'code': code,
+            })
+
+    def report(self, threshold):
+        """
+        Summarize the queries: totals plus the shapes run at least ``threshold``
+        times, which are N+1 suspects, with the places that triggered them.
+        """
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[(query['alias'], query['shape'])].append(query)
+        suspects = []
+        for (alias, shape), queries in groups.items():
+            if len(queries) < threshold:
+                continue
+            sources = sorted({
+                query['template'] or query['code'] or 'unknown' for query in queries
+            })
+            suspects.append({
+                'alias': alias,
+                'sql': shape,
+                'count': len(queries),
+                'duration_ms': round(sum(query['duration_ms'] for query in queries), 3),
+                'template': next((query['template'] for query in queries if query['template']), None),
+                'code': next((query['code'] for query in queries if query['code']), None),
+                'sources': sources,
+            })
+        suspects.sort(key=lambda suspect: suspect['count'], reverse=True)
+        return {
+            'queries': len(self.queries),
+            'duplicates': len(self.queries) - len(groups),
+            'duration_ms': round(sum(query['duration_ms'] for query in self.queries), 3),
+            'n_plus_one': suspects,
+        }
+
+
+class QueryProfilerMiddleware:
+    """
+    Middleware recording every SQL query of a request and flagging query shapes
+    repeated ``QUERY_PROFILER_THRESHOLD`` times or more as N+1 suspects.
+
+    Profiling is on for every request when ``QUERY_PROFILER_ENABLED`` is set,
+    and otherwise for admins sending the ``QUERY_PROFILER_HEADER`` header.
+    Profiled responses carry a ``Server-Timing`` header; the full report is
+    appended as a JSON line to ``QUERY_PROFILER_LOG_FILE`` when that is set,
+    rotating the file at ``QUERY_PROFILER_LOG_MAX_BYTES``. Must come after
+    AuthenticationMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'QUERY_PROFILER_ENABLED', False)
+        self.header = getattr(settings, 'QUERY_PROFILER_HEADER', 'X-Profile-Queries')
+        self.threshold = getattr(settings, 'QUERY_PROFILER_THRESHOLD', 3)
+        log_file = getattr(settings, 'QUERY_PROFILER_LOG_FILE', None)
+        if log_file and not logger.handlers:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            handler = RotatingFileHandler(
+                log_file,
+                maxBytes=getattr(settings, 'QUERY_PROFILER_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=getattr(settings, 'QUERY_PROFILER_LOG_BACKUP_COUNT', 5),
+                delay=True,
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    def should_profile(self, request):
+        if self.enabled:
+            return True
+        if not request.headers.get(self.header):
+            return False
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_authenticated and user.is_admin)
+
+    def describe_suspects(self, suspects):
+        if not suspects:
+            return '0 N+1 suspects'
+        worst = suspects[0]
+        source = (worst['template'] or worst['code'] or 'unknown').replace('"', "'")
+        return f'{len(suspects)} N+1 suspects, worst {worst["count"]}x at {source}'
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            # Template responses are rendered by now; streamed content isn't covered
+            response = self.get_response(request)
+        total = (time.perf_counter() - started) * 1000
+
+        report = recorder.report(self.threshold)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={report["duration_ms"]:.1f};desc="{report["queries"]} queries"',
+            f'n1;desc="{self.describe_suspects(report["n_plus_one"])}"',
+            f'total;dur={total:.1f}',
+        ])
+        if logger.handlers:
+            logger.info(json.dumps({
+                'time': time.time(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'duration_ms': round(total, 3),
+                **report,
+            }))
+        return response
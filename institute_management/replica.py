@@ -0,0 +1,129 @@
+import functools
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Set while a view declared as read-only analytics runs
+_replica_reads = ContextVar('replica_reads', default=False)
+# Set for requests of clients that wrote recently, which must see their writes
+_pinned = ContextVar('replica_pinned', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def replica_alias():
+    """Return the alias of the configured read replica, or None."""
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+def reading_from_replica():
+    """Return whether queries read now go to the replica."""
+    return bool(_replica_reads.get() and not _pinned.get() and replica_alias())
+
+@contextmanager
+def replica_reads():
+    """Send the reads of the block to the replica, unless the request is pinned to the primary."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+def reads_from_replica(view):
+    """
+    Decorator for read-only analytics views whose queries, including those of
+    the templates they render, may see data a sync interval old.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of ``reads_from_replica`` views to the
+    replica. Everything else, and every write, uses the default database.
+    """
+    def db_for_read(self, model, **hints):
+        if reading_from_replica():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Also for instances read from the replica
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the default database, schema included
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Middleware pinning a client's reads to the default database for
+    ``REPLICA_STICKY_SECONDS`` after it sends a POST (or any other unsafe
+    method), so it reads its own writes before the replica catches up. The pin
+    is kept in a cookie, and only on requests where the replica is configured.
+    """
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.cookie = getattr(settings, 'REPLICA_STICKY_COOKIE', 'pin_primary')
+        self.seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+    def __call__(self, request):
+        writing = request.method not in SAFE_METHODS
+        token = _pinned.set(writing or self.cookie in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+        if writing:
+            response.set_cookie(
+                self.cookie, '1', max_age=self.seconds, httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE, samesite='Lax',
+            )
+        return response
+
+
+def snapshot(source, target):
+    """
+    Copy the SQLite database ``source`` to ``target`` with SQLite's online
+    backup, which is consistent while the source is being written. The copy
+    is built next to the target and moved over it, so readers see either the
+    old or the new snapshot, and it uses a rollback journal so the file alone
+    is the whole database.
+    """
+    directory = os.path.dirname(os.path.abspath(target))
+    handle, temporary = tempfile.mkstemp(prefix='.replica-', suffix='.sqlite3', dir=directory)
+    os.close(handle)
+    try:
+        primary = sqlite3.connect(source)
+        copy = sqlite3.connect(temporary)
+        try:
+            primary.backup(copy)
+            copy.execute('PRAGMA journal_mode = delete')
+        finally:
+            copy.close()
+            primary.close()
+        os.replace(temporary, target)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
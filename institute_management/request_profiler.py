@@ -0,0 +1,219 @@
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.text import slugify
+
+# Names of stored profiles: <timestamp>-<path slug>-<id>
+PROFILE_NAME = re.compile(r'^\d{8}T\d{6}-[\w-]*-[0-9a-f]{8}$')
+# Deepest call stack written to the collapsed stacks file
+MAX_STACK_DEPTH = 256
+
+
+def profile_dir():
+    return getattr(settings, 'REQUEST_PROFILER_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        # Built-in functions, e.g. <built-in method builtins.len>
+        return name.strip('<>')
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f'{name} ({filename}:{line})'
+
+
+class StackSampler:
+    """
+    Thread sampling the call stack of another thread every ``interval``
+    seconds, for the collapsed stacks file. cProfile only records
+    caller-callee pairs, which can't be turned back into whole stacks.
+    """
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = defaultdict(int)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(_label((code.co_filename, frame.f_lineno, code.co_name)))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Return the samples in the collapsed stack format, one ``frame;frame count`` line per stack."""
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.samples.items()))
+
+
+def top_functions(stats, limit=15):
+    """Return the ``limit`` functions with the most cumulative time."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {'function': _label(func), 'calls': nc, 'own_ms': round(tt * 1000, 3), 'cumulative_ms': round(ct * 1000, 3)}
+        for func, (cc, nc, tt, ct, callers) in rows
+    ]
+
+def list_profiles():
+    """Return the metadata of the stored profiles, newest first."""
+    directory = profile_dir()
+    profiles = []
+    if not os.path.isdir(directory):
+        return profiles
+    for filename in sorted(os.listdir(directory), reverse=True):
+        name, extension = os.path.splitext(filename)
+        if extension != '.json' or not PROFILE_NAME.match(name):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as file:
+                profiles.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+def profile_path(name, extension):
+    """Return the path of a stored profile file, or None for an invalid name."""
+    if not PROFILE_NAME.match(name) or extension not in ('pstats', 'collapsed', 'json'):
+        return None
+    return os.path.join(profile_dir(), f'{name}.{extension}')
+
+
+class RateLimiter:
+    """Allow at most ``limit`` events per rolling minute, across threads."""
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.events = []
+
+    def allow(self):
+        now = time.monotonic()
+        with self.lock:
+            self.events = [event for event in self.events if now - event < 60]
+            if len(self.events) >= self.limit:
+                return False
+            self.events.append(now)
+            return True
+
+
+class RequestProfilerMiddleware:
+    """
+    Middleware running a request under cProfile when an admin asks for it
+    with the ``REQUEST_PROFILER_PARAM`` query parameter or the
+    ``REQUEST_PROFILER_HEADER`` header, or for a ``REQUEST_PROFILER_SAMPLE_RATE``
+    fraction of all requests. Captures are limited to
+    ``REQUEST_PROFILER_MAX_PER_MINUTE`` per process.
+
+    Each capture is stored in ``REQUEST_PROFILER_DIR`` as a ``.pstats`` file,
+    a ``.collapsed`` file of the stacks sampled every
+    ``REQUEST_PROFILER_SAMPLE_INTERVAL`` seconds for flame graph tools, and a
+    ``.json`` summary;
+    only the newest ``REQUEST_PROFILER_KEEP`` are kept. Must come after
+    AuthenticationMiddleware.
+    """
+    # cProfile can't run two profilers at once in one process
+    profiling = threading.Lock()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.param = getattr(settings, 'REQUEST_PROFILER_PARAM', '_profile')
+        self.header = getattr(settings, 'REQUEST_PROFILER_HEADER', 'X-Profile-Request')
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILER_SAMPLE_RATE', 0.0)
+        self.keep = getattr(settings, 'REQUEST_PROFILER_KEEP', 50)
+        self.sample_interval = getattr(settings, 'REQUEST_PROFILER_SAMPLE_INTERVAL', 0.001)
+        self.limiter = RateLimiter(getattr(settings, 'REQUEST_PROFILER_MAX_PER_MINUTE', 6))
+
+    def requested(self, request):
+        if request.GET.get(self.param) or request.headers.get(self.header):
+            user = getattr(request, 'user', None)
+            return bool(user and user.is_authenticated and user.is_admin)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.requested(request) or not self.limiter.allow():
+            return self.get_response(request)
+        if not self.profiling.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            profiler = cProfile.Profile()
+            sampler = StackSampler(threading.get_ident(), self.sample_interval)
+            started = time.perf_counter()
+            sampler.start()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+                sampler.stop()
+            duration = time.perf_counter() - started
+        finally:
+            self.profiling.release()
+
+        name = self.save(profiler, sampler, request, response, duration)
+        response['X-Profile-Id'] = name
+        return response
+
+    def save(self, profiler, sampler, request, response, duration):
+        """Store the captured profile and return its name."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        slug = slugify(request.path.replace('/', ' '))[:40]
+        name = f'{now:%Y%m%dT%H%M%S}-{slug}-{uuid.uuid4().hex[:8]}'
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        stats.dump_stats(os.path.join(directory, f'{name}.pstats'))
+        with open(os.path.join(directory, f'{name}.collapsed'), 'w') as file:
+            file.write(sampler.collapsed())
+        user = getattr(request, 'user', None)
+        with open(os.path.join(directory, f'{name}.json'), 'w') as file:
+            json.dump({
+                'name': name,
+                'created': now.isoformat(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'user': user.get_username() if user is not None and user.is_authenticated else None,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 3),
+                'top_functions': top_functions(stats),
+            }, file)
+        self.prune(directory)
+        return name
+
+    def prune(self, directory):
+        names = sorted({
+            os.path.splitext(filename)[0] for filename in os.listdir(directory)
+            if PROFILE_NAME.match(os.path.splitext(filename)[0])
+        })
+        for old in names[:-self.keep] if self.keep else ():
+            for extension in ('pstats', 'collapsed', 'json'):
+                try:
+                    os.remove(os.path.join(directory, f'{old}.{extension}'))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,15 @@
+from django.db.models import Q
+
+
+def prefix_q(field, prefix):
+    """
+    Match values of ``field`` that start with ``prefix``. The range bounds let
+    a plain B-tree index on the column serve the lookup on any backend, where a
+    bare LIKE 'prefix%' needs special operator classes or collations; the
+    ``startswith`` recheck keeps the match exact.
+    """
+    return Q(**{
+        f'{field}__gte': prefix,
+        f'{field}__lt': prefix + '\U0010ffff',
+        f'{field}__startswith': prefix,
+    })
@@ -0,0 +1,364 @@
+import datetime
+import random
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import models, transaction
+
+from accounts.models import User, people_imported
+from attendance.models import AttendanceRecord, AttendanceSummary, StudentAttendance, attendance_counts_changed
+from courses.models import Course, Enrollment, Schedule
+from fees.models import FeeCategory, FeeInvoice, FeeInvoiceItem, Payment, fee_totals_changed
+from students.models import Student
+from teachers.models import Teacher
+
+# Prefix of every generated username, id and number, so seeded rows are easy to spot
+PREFIX = 'seed'
+
+FIRST_NAMES = (
+    'Aarav', 'Aditi', 'Akash', 'Ananya', 'Arjun', 'Diya', 'Farhan', 'Fatima', 'Gaurav', 'Isha',
+    'Kabir', 'Kavya', 'Meera', 'Mohan', 'Neha', 'Nikhil', 'Pooja', 'Priya', 'Rahul', 'Riya',
+    'Rohan', 'Sanjay', 'Sara', 'Shreya', 'Tanvi', 'Varun', 'Vikram', 'Yash', 'Zara', 'Zoya',
+)
+LAST_NAMES = (
+    'Agarwal', 'Bhat', 'Chopra', 'Das', 'Desai', 'Gupta', 'Iyer', 'Jain', 'Joshi', 'Kapoor',
+    'Khan', 'Kulkarni', 'Kumar', 'Mehta', 'Menon', 'Nair', 'Patel', 'Pillai', 'Rao', 'Reddy',
+    'Saxena', 'Shah', 'Sharma', 'Singh', 'Sinha', 'Thomas', 'Varma', 'Verma', 'Wagh', 'Yadav',
+)
+SUBJECTS = (
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'History', 'Geography',
+    'Economics', 'Accountancy', 'Computer Science', 'Statistics', 'Psychology',
+)
+LEVELS = ('Foundation', 'Intermediate', 'Advanced')
+QUALIFICATIONS = ('BSc', 'MSc', 'MA', 'MCom', 'MTech', 'PhD')
+FEE_CATEGORIES = (
+    ('Tuition', Decimal('1200.00')),
+    ('Library', Decimal('50.00')),
+    ('Laboratory', Decimal('150.00')),
+)
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday')
+SLOTS = (datetime.time(9), datetime.time(11), datetime.time(14), datetime.time(16))
+PAYMENT_METHODS = ('cash', 'credit_card', 'bank_transfer', 'check')
+
+
+class InstituteSeeder:
+    """
+    Generate a deterministic synthetic institute: teachers, students, courses
+    with weekly schedules, enrollments, attendance for every scheduled session
+    of ``terms`` terms, and one invoice per student and term with partial
+    payments.
+
+    Rows are written with ``bulk_create`` in batches of ``chunk_size``. The
+    attendance and fee counters are computed while generating and written with
+    the rows, instead of being maintained per batch, so the result matches what
+    rebuild_attendance_counts and rebuild_attendance_summary would produce.
+    The same ``seed`` and dates always give the same data.
+    """
+    def __init__(self, students=1000, teachers=50, courses=40, terms=2, term_weeks=12,
+                 courses_per_student=4, start=datetime.date(2024, 1, 1), today=None,
+                 seed=42, password='password', chunk_size=5000, progress=None):
+        self.students = students
+        self.teachers = teachers
+        self.courses = courses
+        self.terms = terms
+        self.term_weeks = term_weeks
+        self.courses_per_student = min(courses_per_student, courses)
+        # Terms start on the Monday of the start date's week
+        self.start = start - datetime.timedelta(days=start.weekday())
+        self.today = today or datetime.date.today()
+        self.rng = random.Random(seed)
+        self.password = password
+        self._password_hash = None
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.counts = Counter()
+
+    def run(self):
+        """Generate everything in one transaction; returns the row counts by model."""
+        with transaction.atomic():
+            teacher_ids = self.create_teachers()
+            student_ids, reliability = self.create_students()
+            courses = self.create_courses(teacher_ids)
+            rosters = self.create_enrollments(student_ids, courses)
+            self.create_attendance(courses, rosters, reliability)
+            self.create_fees(student_ids)
+
+            people_imported.send(sender=Student, count=self.counts['Student'] + self.counts['Teacher'])
+            attendance_counts_changed.send(sender=StudentAttendance)
+            fee_totals_changed.send(sender=Payment)
+        return dict(self.counts)
+
+    def term_dates(self):
+        """Return the ``(label, first day, last day)`` of every term, two weeks apart."""
+        terms = []
+        per_year = Counter()
+        first = self.start
+        for term in range(self.terms):
+            last = first + datetime.timedelta(weeks=self.term_weeks, days=-1)
+            per_year[first.year] += 1
+            terms.append((f'{first.year}-T{per_year[first.year]}', first, last))
+            first = last + datetime.timedelta(weeks=2, days=1)
+        return terms
+
+    def _report(self, model, count):
+        self.counts[model.__name__] += count
+        if self.progress:
+            self.progress(model.__name__, self.counts[model.__name__])
+
+    def _bulk_create(self, model, objs, queryset=None):
+        """Insert ``objs`` in batches; ``queryset`` bypasses a manager's counter upkeep."""
+        if queryset is None:
+            queryset = model.objects
+        created = queryset.bulk_create(objs, batch_size=self.chunk_size)
+        self._report(model, len(created))
+        return created
+
+    def _backdate(self, model, field, pks_by_date):
+        """
+        Set a date field that bulk_create filled in with today, with one
+        UPDATE per date and batch of primary keys.
+        """
+        batch = 900
+        for value, pks in pks_by_date.items():
+            for i in range(0, len(pks), batch):
+                model._base_manager.filter(pk__in=pks[i:i + batch]).update(**{field: value})
+
+    def _users(self, role, count, offset=0):
+        # One hash shared by every user; hashing each password would dominate the run
+        if self._password_hash is None:
+            self._password_hash = make_password(self.password)
+        joined = datetime.datetime.combine(self.start, datetime.time(), tzinfo=datetime.timezone.utc)
+        users = []
+        for i in range(offset, offset + count):
+            first_name, last_name = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            username = f'{PREFIX}_{role}{i:06d}'
+            users.append(User(
+                username=username, first_name=first_name, last_name=last_name,
+                email=f'{username}@example.com', user_type=role, password=self._password_hash,
+                mobile=f'9{self.rng.randrange(10 ** 9):09d}', date_joined=joined,
+            ))
+        return users
+
+    def create_teachers(self):
+        users = self._bulk_create(User, self._users('teacher', self.teachers))
+        teachers = self._bulk_create(Teacher, [
+            Teacher(
+                user=user,
+                teacher_id=f'{PREFIX.upper()}-T{i:06d}',
+                gender=self.rng.choice(('male', 'female')),
+                qualification=self.rng.choice(QUALIFICATIONS),
+                experience=self.rng.randint(1, 30),
+                salary=Decimal(self.rng.randrange(30000, 120000, 500)),
+            )
+            for i, user in enumerate(users)
+        ])
+        pks = [teacher.pk for teacher in teachers]
+        self._backdate(Teacher, 'date_joined', {self.start: pks})
+        return pks
+
+    def create_students(self):
+        """Create the students; returns their ids and each one's chance of attending."""
+        student_ids = []
+        reliability = {}
+        for offset in range(0, self.students, self.chunk_size):
+            count = min(self.chunk_size, self.students - offset)
+            users = self._bulk_create(User, self._users('student', count, offset))
+            students = self._bulk_create(Student, [
+                Student(
+                    user=user,
+                    student_id=f'{PREFIX.upper()}-S{i:07d}',
+                    date_of_birth=self.start - datetime.timedelta(days=self.rng.randint(16 * 365, 24 * 365)),
+                    gender=self.rng.choice(('male', 'female', 'other')),
+                    parent_name=f'{self.rng.choice(FIRST_NAMES)} {user.last_name}',
+                    parent_mobile=f'8{self.rng.randrange(10 ** 9):09d}',
+                )
+                for i, user in enumerate(users, start=offset)
+            ])
+            for student in students:
+                student_ids.append(student.pk)
+                # Most students attend nearly always, a few often miss classes
+                reliability[student.pk] = min(0.99, self.rng.betavariate(8, 1.2))
+        self._backdate(Student, 'admission_date', {self.start: student_ids})
+        return student_ids, reliability
+
+    def create_courses(self, teacher_ids):
+        """Create the courses, their teachers and schedules; returns ``{course id: weekdays}``."""
+        courses = self._bulk_create(Course, [
+            Course(
+                name=f'{SUBJECTS[i % len(SUBJECTS)]} {LEVELS[i // len(SUBJECTS) % len(LEVELS)]}',
+                code=f'{PREFIX.upper()}{i:05d}',
+                description=f'{SUBJECTS[i % len(SUBJECTS)]} course {i + 1}.',
+                credits=self.rng.choice((2, 3, 4)),
+            )
+            for i in range(self.courses)
+        ])
+        links = []
+        schedules = []
+        weekdays = {}
+        for course in courses:
+            if teacher_ids:
+                for teacher_id in self.rng.sample(teacher_ids, min(len(teacher_ids), self.rng.choice((1, 1, 2)))):
+                    links.append(Course.teachers.through(course_id=course.pk, teacher_id=teacher_id))
+            days = sorted(self.rng.sample(range(len(WEEKDAYS)), self.rng.choice((2, 3))))
+            weekdays[course.pk] = days
+            for day in days:
+                start_time = self.rng.choice(SLOTS)
+                schedules.append(Schedule(
+                    course=course,
+                    day=WEEKDAYS[day],
+                    start_time=start_time,
+                    end_time=start_time.replace(hour=start_time.hour + 1, minute=30),
+                    room=f'Room {self.rng.randint(101, 420)}',
+                ))
+        self._bulk_create(Course.teachers.through, links)
+        self._bulk_create(Schedule, schedules)
+        return weekdays
+
+    def create_enrollments(self, student_ids, courses):
+        """Enroll every student in some courses; returns ``{course id: attending student ids}``."""
+        course_ids = list(courses)
+        rosters = defaultdict(list)
+        enrollments = []
+        for student_id in student_ids:
+            for course_id in self.rng.sample(course_ids, self.courses_per_student):
+                status = self.rng.choices(('active', 'completed', 'dropped'), weights=(90, 7, 3))[0]
+                enrollments.append(Enrollment(student_id=student_id, course_id=course_id, status=status))
+                if status != 'dropped':
+                    rosters[course_id].append(student_id)
+            if len(enrollments) >= self.chunk_size:
+                self._backdate(Enrollment, 'enrollment_date', {
+                    self.start: [enrollment.pk for enrollment in self._bulk_create(Enrollment, enrollments)]
+                })
+                enrollments = []
+        if enrollments:
+            self._backdate(Enrollment, 'enrollment_date', {
+                self.start: [enrollment.pk for enrollment in self._bulk_create(Enrollment, enrollments)]
+            })
+        return rosters
+
+    def create_attendance(self, courses, rosters, reliability):
+        """
+        Record attendance for every scheduled session of every term. Statuses
+        are drawn first so each record is inserted with its counters, and the
+        per-student summaries are written once at the end.
+        """
+        statuses = ('present', 'late', 'absent', 'excused')
+        summaries = defaultdict(Counter)
+        attendances = []
+        # Plain queryset: the counters are written with the rows instead
+        attendance_queryset = models.QuerySet(StudentAttendance)
+        for label, first, last in self.term_dates():
+            for course_id, days in courses.items():
+                roster = rosters.get(course_id, [])
+                sessions = [
+                    first + datetime.timedelta(weeks=week, days=day)
+                    for week in range(self.term_weeks) for day in days
+                ]
+                records = []
+                marks = []
+                for date in sessions:
+                    record_marks = []
+                    for student_id in roster:
+                        attend = reliability[student_id]
+                        roll = self.rng.random()
+                        if roll < attend:
+                            status = 'late' if self.rng.random() < 0.07 else 'present'
+                        else:
+                            status = 'excused' if self.rng.random() < 0.25 else 'absent'
+                        record_marks.append((student_id, status))
+                    counts = Counter(status for student_id, status in record_marks)
+                    records.append(AttendanceRecord(
+                        course_id=course_id, date=date,
+                        **{f'{status}_count': counts[status] for status in statuses},
+                    ))
+                    marks.append(record_marks)
+                records = self._bulk_create(AttendanceRecord, records)
+                for record, record_marks in zip(records, marks):
+                    for student_id, status in record_marks:
+                        attendances.append(StudentAttendance(
+                            attendance_record_id=record.pk, student_id=student_id, status=status
+                        ))
+                        summaries[(student_id, course_id)][status] += 1
+                if len(attendances) >= self.chunk_size:
+                    self._bulk_create(StudentAttendance, attendances, attendance_queryset)
+                    attendances = []
+        if attendances:
+            self._bulk_create(StudentAttendance, attendances, attendance_queryset)
+
+        self._bulk_create(AttendanceSummary, [
+            AttendanceSummary(student_id=student_id, course_id=course_id, **counts)
+            for (student_id, course_id), counts in summaries.items()
+        ])
+
+    def create_fees(self, student_ids):
+        """
+        Invoice every student once per term from the fee categories, with no,
+        partial or full payment. Paid amounts and statuses are computed here
+        rather than posted payment by payment.
+        """
+        categories = self._bulk_create(FeeCategory, [
+            FeeCategory(name=name, amount=amount, description=f'{name} fee per term.')
+            for name, amount in FEE_CATEGORIES
+        ])
+        total_amount = sum(category.amount for category in categories)
+        # Plain queryset: the paid amounts are written with the invoices instead
+        payment_queryset = models.QuerySet(Payment)
+        number = 0
+        receipt = 0
+        for label, first, last in self.term_dates():
+            issue_date = first
+            due_date = first + datetime.timedelta(days=30)
+            for offset in range(0, len(student_ids), self.chunk_size):
+                invoices = []
+                planned = []
+                for student_id in student_ids[offset:offset + self.chunk_size]:
+                    number += 1
+                    share = self.rng.choices((Decimal(0), Decimal('0.5'), Decimal(1)), weights=(15, 25, 60))[0]
+                    amounts = []
+                    if share == 1 and self.rng.random() < 0.3:
+                        # Paid in two instalments
+                        half = (total_amount / 2).quantize(Decimal('0.01'))
+                        amounts = [half, total_amount - half]
+                    elif share:
+                        amounts = [(total_amount * share).quantize(Decimal('0.01'))]
+                    paid_amount = sum(amounts, Decimal(0))
+                    if paid_amount >= total_amount:
+                        status = 'paid'
+                    else:
+                        status = 'overdue' if due_date < self.today else 'pending'
+                    invoices.append(FeeInvoice(
+                        invoice_number=f'{PREFIX.upper()}-{number:010d}',
+                        student_id=student_id,
+                        total_amount=total_amount,
+                        paid_amount=paid_amount,
+                        status=status,
+                        due_date=due_date,
+                        billing_period=label,
+                    ))
+                    planned.append(amounts)
+
+                invoices = self._bulk_create(FeeInvoice, invoices)
+                self._backdate(FeeInvoice, 'issue_date', {issue_date: [invoice.pk for invoice in invoices]})
+                self._bulk_create(FeeInvoiceItem, [
+                    FeeInvoiceItem(invoice=invoice, category=category, amount=category.amount, description=category.name)
+                    for invoice in invoices for category in categories
+                ])
+                payments = []
+                payment_dates = []
+                for invoice, amounts in zip(invoices, planned):
+                    for amount in amounts:
+                        receipt += 1
+                        payments.append(Payment(
+                            invoice=invoice,
+                            amount=amount,
+                            payment_method=self.rng.choice(PAYMENT_METHODS),
+                            transaction_id=f'TXN{receipt:012d}',
+                            receipt_number=f'{PREFIX.upper()}-R{receipt:09d}',
+                        ))
+                        payment_dates.append(issue_date + datetime.timedelta(days=self.rng.randint(0, 45)))
+                payments = self._bulk_create(Payment, payments, payment_queryset)
+                pks_by_date = defaultdict(list)
+                for payment, payment_date in zip(payments, payment_dates):
+                    pks_by_date[payment_date].append(payment.pk)
+                self._backdate(Payment, 'payment_date', pks_by_date)
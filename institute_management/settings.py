@@ -48,14 +48,21 @@ INSTALLED_APPS = [
     'fees',
     'dashboard',
     'reports',
+    # Project-wide signal receivers (see institute_management.apps)
+    'institute_management',
 ]
 
 MIDDLEWARE = [
+    'institute_management.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'institute_management.replica.ReplicaPinningMiddleware',
+    'accounts.middleware.ProfileMiddleware',
+    'institute_management.query_profiler.QueryProfilerMiddleware',
+    'institute_management.request_profiler.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,7 +71,8 @@ ROOT_URLCONF = 'institute_management.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates recording render times for the metrics
+        'BACKEND': 'institute_management.metrics.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -88,9 +96,89 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {},
     }
 }
 
+# SQLite tuning for concurrent writers, set with the SQLITE_* environment
+# variables; SQLITE_TUNING=0 leaves SQLite's defaults. The pragmas are applied
+# to every new connection (see institute_management.sqlite).
+#
+# Every atomic block of the default database begins IMMEDIATE, taking the
+# write lock up front, so writers queue on the busy timeout instead of failing
+# with "database is locked" when upgrading a read lock. The mode is per
+# connection, so this applies to read-only atomic blocks too: they would wait
+# for and block writers like a write. All the atomic blocks here write; keep
+# reads out of them (autocommit reads never take the write lock in WAL mode)
+# or set SQLITE_TRANSACTION_MODE=DEFERRED.
+SQLITE_PRAGMAS = {}
+if os.environ.get('SQLITE_TUNING', '1') != '0':
+    SQLITE_PRAGMAS = {
+        'busy_timeout': os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'),
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+        # Negative sizes are in KiB
+        'cache_size': os.environ.get('SQLITE_CACHE_SIZE', '-20000'),
+        'mmap_size': os.environ.get('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)),
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'memory'),
+    }
+    DATABASES['default']['OPTIONS']['transaction_mode'] = os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE').upper()
+
+# Read replica for the analytics views (reports and the admin dashboard),
+# enabled by DATABASE_REPLICA_PATH. Locally it is a read-only SQLite copy of
+# the default database refreshed by "manage.py sync_replica --interval N".
+# Clients that sent a POST read from the default database for
+# REPLICA_STICKY_SECONDS afterwards.
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_DATABASE_PATH = os.environ.get('DATABASE_REPLICA_PATH')
+REPLICA_SYNC_INTERVAL = int(os.environ.get('REPLICA_SYNC_INTERVAL', '30'))
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '15'))
+REPLICA_STICKY_COOKIE = 'pin_primary'
+if REPLICA_DATABASE_PATH:
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{REPLICA_DATABASE_PATH}?mode=ro',
+        # Journal and sync settings can't be changed on a read-only file
+        'SQLITE_PRAGMAS': {
+            name: value for name, value in SQLITE_PRAGMAS.items() if name not in ('journal_mode', 'synchronous')
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['institute_management.replica.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        # Counts hits and misses for the metrics of the cache named in OPTIONS
+        'BACKEND': 'institute_management.metrics.InstrumentedCache',
+        'OPTIONS': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'NAME': 'default',
+        },
+    }
+}
+
+# Cache alias used for the admin dashboard statistics
+DASHBOARD_CACHE_ALIAS = 'default'
+
+# Maximum staleness in seconds per dashboard stat family ('people', 'fees',
+# 'attendance'), and for the families not listed. Invalidations only reach the
+# processes sharing the cache, so with a per-process cache like the default
+# one, other workers serve stale stats until they expire. None keeps stats
+# until invalidated, for a cache shared by every worker (Redis, Memcached).
+DASHBOARD_STATS_MAX_AGE = {}
+DASHBOARD_STATS_DEFAULT_MAX_AGE = 60
+
+# Report pages render the latest snapshot built by "manage.py
+# build_report_snapshots" (run nightly) or their refresh button. Older
+# snapshots kept per report, and how long a refresh may run before another
+# can start
+REPORT_SNAPSHOTS_KEEP = 30
+REPORT_REFRESH_TIMEOUT = 600
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -136,6 +224,11 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# CSV files queued from the people import page until "manage.py import_people
+# --queued" runs them. They hold plaintext passwords, so they are kept out of
+# MEDIA_ROOT and deleted once imported.
+PEOPLE_IMPORT_DIR = os.environ.get('PEOPLE_IMPORT_DIR', os.path.join(BASE_DIR, 'imports'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -148,3 +241,48 @@ AUTH_USER_MODEL = 'accounts.User'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
+
+# List view pagination: 'exact', 'cached' or 'estimate' total counts. Estimates
+# read SQLite's sqlite_stat1, so they need a periodic ANALYZE (or PRAGMA
+# optimize); until then, and for filtered lists, counts are cached instead.
+PAGINATION_COUNT_STRATEGY = 'exact'
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+# Student directory searches matching up to this many students are ranked by
+# closeness of match; broader ones are listed in name order, which needs no
+# sort of every match. The index is kept by signals; "manage.py
+# rebuild_student_search" rebuilds it after changes made outside the ORM.
+STUDENT_SEARCH_RANK_LIMIT = 15000
+
+# SQL query profiling: on for every request when enabled, otherwise for admins
+# sending the header. Reports are appended to the log file as JSON lines when set.
+QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED') == '1'
+QUERY_PROFILER_HEADER = 'X-Profile-Queries'
+# Executions of one query shape in a request that make it an N+1 suspect
+QUERY_PROFILER_THRESHOLD = 3
+QUERY_PROFILER_LOG_FILE = os.environ.get('QUERY_PROFILER_LOG_FILE')
+QUERY_PROFILER_LOG_MAX_BYTES = 10 * 1024 * 1024
+QUERY_PROFILER_LOG_BACKUP_COUNT = 5
+
+# Prometheus metrics at /metrics, served to clients with the bearer token or,
+# without one, only in DEBUG and to the allowed addresses (behind a reverse
+# proxy every client has the proxy's address). With METRICS_DIR set, every
+# worker process saves its metrics there at most every METRICS_SAVE_INTERVAL
+# seconds and /metrics adds them all up.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_SAVE_INTERVAL = 5
+
+# cProfile captures of single requests, asked for by admins with the query
+# parameter or header, or taken for a sampled fraction of all requests, and
+# limited to a number per minute in each process
+REQUEST_PROFILER_DIR = os.environ.get('REQUEST_PROFILER_DIR', os.path.join(BASE_DIR, 'profiles'))
+REQUEST_PROFILER_PARAM = '_profile'
+REQUEST_PROFILER_HEADER = 'X-Profile-Request'
+REQUEST_PROFILER_SAMPLE_RATE = 0.0
+REQUEST_PROFILER_MAX_PER_MINUTE = 6
+# Seconds between the stack samples of the collapsed stacks file
+REQUEST_PROFILER_SAMPLE_INTERVAL = 0.001
+# Number of captures kept on disk
+REQUEST_PROFILER_KEEP = 50
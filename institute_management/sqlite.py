@@ -0,0 +1,48 @@
+import re
+
+from django.conf import settings
+
+# Pragmas applied to new connections, in this order: the busy timeout first so
+# switching the journal mode waits for other connections' locks
+PRAGMAS = ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store')
+# Accepted values of the pragmas taking a keyword; the others take integers
+KEYWORDS = {
+    'journal_mode': {'delete', 'truncate', 'persist', 'memory', 'wal', 'off'},
+    'synchronous': {'off', 'normal', 'full', 'extra'},
+    'temp_store': {'default', 'file', 'memory'},
+}
+TRANSACTION_MODES = {'DEFERRED', 'IMMEDIATE', 'EXCLUSIVE'}
+
+
+def pragma_statements(pragmas):
+    """Return the ``PRAGMA`` statements setting ``pragmas``, raising ValueError for invalid values."""
+    statements = []
+    for name in PRAGMAS:
+        value = pragmas.get(name)
+        if value is None or value == '':
+            continue
+        value = str(value).strip().lower()
+        if name in KEYWORDS:
+            if value not in KEYWORDS[name]:
+                raise ValueError(f'Invalid SQLite {name}: {value!r}')
+        elif not re.fullmatch(r'-?\d+', value):
+            raise ValueError(f'Invalid SQLite {name}: {value!r}')
+        statements.append(f'PRAGMA {name} = {value}')
+    unknown = set(pragmas) - set(PRAGMAS)
+    if unknown:
+        raise ValueError(f'Unsupported SQLite pragmas: {", ".join(sorted(unknown))}')
+    return statements
+
+def apply_pragmas(sender, connection, **kwargs):
+    """
+    ``connection_created`` receiver setting the ``SQLITE_PRAGMAS`` on every new
+    SQLite connection, or those of the database's own ``SQLITE_PRAGMAS`` entry.
+    Runs on the raw connection, so the statements don't count as queries of
+    the request that opened it.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('SQLITE_PRAGMAS', getattr(settings, 'SQLITE_PRAGMAS', {}))
+    for statement in pragma_statements(pragmas):
+        connection.connection.execute(statement)
+
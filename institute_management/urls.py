@@ -19,6 +19,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('dashboard.urls')),
@@ -29,6 +31,7 @@ urlpatterns = [
     path('attendance/', include('attendance.urls')),
     path('fees/', include('fees.urls')),
     path('reports/', include('reports.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve media files in development
@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import ReportSnapshot
 
-# Register your models here.
+@admin.register(ReportSnapshot)
+class ReportSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('report', 'built_at', 'build_duration_ms')
+    list_filter = ('report',)
+    readonly_fields = ('report', 'payload', 'built_at', 'build_duration_ms')
@@ -0,0 +1,53 @@
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def status_annotations(relation, choices, status_field='status'):
+    """
+    Build ``Count(filter=Q(...))`` annotations, one per status in ``choices``.
+    The annotations are named ``<status>_count`` to avoid clashing with model fields.
+    """
+    lookup = f'{relation}__{status_field}'
+    return {
+        f'{status}_count': Count(relation, filter=Q(**{lookup: status}))
+        for status, label in choices
+    }
+
+
+def annotate_status_counts(queryset, relation, choices, status_field='status'):
+    """
+    Annotate every object in ``queryset`` with per-status counts of ``relation``.
+    All counts are computed by a single grouped query.
+    """
+    return queryset.annotate(**status_annotations(relation, choices, status_field))
+
+
+def status_breakdown(queryset, relation, choices, status_field='status'):
+    """
+    Return a dict mapping each object in ``queryset`` to its per-status counts of
+    ``relation`` plus a ``total``, e.g. ``{course: {'active': 3, ..., 'total': 5}}``.
+    The whole breakdown costs one query regardless of the number of objects.
+    """
+    breakdown = {}
+    for obj in annotate_status_counts(queryset, relation, choices, status_field):
+        counts = {status: getattr(obj, f'{status}_count') for status, label in choices}
+        counts['total'] = sum(counts.values())
+        breakdown[obj] = counts
+    return breakdown
+
+
+def counter_breakdown(queryset, relation, fields):
+    """
+    Return a dict mapping each object in ``queryset`` to the sums of the stored
+    counter ``fields`` on ``relation`` plus a ``total``, using a single query.
+    """
+    annotations = {
+        f'{field}_sum': Coalesce(Sum(f'{relation}__{field}'), 0)
+        for field in fields
+    }
+    breakdown = {}
+    for obj in queryset.annotate(**annotations):
+        counts = {field: getattr(obj, f'{field}_sum') for field in fields}
+        counts['total'] = sum(counts.values())
+        breakdown[obj] = counts
+    return breakdown
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from reports.snapshots import REPORTS, build_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Precompute the reports shown under /reports/. Meant to run nightly, e.g. from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', action='append', choices=sorted(REPORTS), dest='reports',
+                            help='Only build this report; may be repeated. All reports by default.')
+
+    def handle(self, *args, **options):
+        for report in options['reports'] or REPORTS:
+            snapshot = build_snapshot(report)
+            self.stdout.write(f'Built the {report} report in {snapshot.build_duration_ms:.0f}ms.')
@@ -1,3 +1,42 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class ReportSnapshot(models.Model):
+    """
+    Model for storing a precomputed report: the JSON payload its page renders,
+    so viewing a report doesn't scan the underlying tables.
+    """
+    REPORT_CHOICES = (
+        ('students', 'Student Report'),
+        ('teachers', 'Teacher Report'),
+        ('courses', 'Course Report'),
+        ('attendance', 'Attendance Report'),
+        ('fees', 'Fee Report'),
+    )
+
+    report = models.CharField(max_length=20, choices=REPORT_CHOICES)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    built_at = models.DateTimeField(auto_now_add=True)
+    build_duration_ms = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.get_report_display()} as of {self.built_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        ordering = ['-built_at']
+        indexes = [
+            # Latest snapshot of a report
+            models.Index(fields=['report', '-built_at'], name='report_snapshot_latest_idx'),
+        ]
+
+class ReportRefresh(models.Model):
+    """
+    Model for a background rebuild of a report's snapshot in progress. The
+    unique row claims the report, so no two processes rebuild it at once.
+    """
+    report = models.CharField(max_length=20, choices=ReportSnapshot.REPORT_CHOICES, unique=True)
+    started_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Refresh of the {self.get_report_display()} since {self.started_at:%Y-%m-%d %H:%M}"
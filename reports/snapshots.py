@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models import Avg, Count, Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from students.models import Student
+from teachers.models import Teacher
+from courses.models import Course, Enrollment
+from attendance.models import AttendanceRecord, AttendanceSummary, StudentAttendance
+from fees.models import FeeInvoice, Payment
+from .aggregates import counter_breakdown, status_breakdown
+from .models import ReportRefresh, ReportSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _course(course):
+    return {'id': course.pk, 'name': course.name, 'code': course.code}
+
+def student_report():
+    """Student and enrollment counts."""
+    enrollments = Enrollment.objects.aggregate(
+        total=Count('pk'),
+        **{status: Count('pk', filter=Q(status=status)) for status in ('active', 'completed', 'dropped')},
+    )
+    return {
+        'total_students': Student.objects.count(),
+        'students_by_gender': list(Student.objects.values('gender').annotate(count=Count('gender')).order_by('gender')),
+        'total_enrollments': enrollments['total'],
+        'active_enrollments': enrollments['active'],
+        'completed_enrollments': enrollments['completed'],
+        'dropped_enrollments': enrollments['dropped'],
+    }
+
+def teacher_report():
+    """Teacher counts, experience and course loads."""
+    teachers = Teacher.objects.select_related('user').annotate(course_count=Count('courses'))
+    return {
+        'total_teachers': Teacher.objects.count(),
+        'teachers_by_gender': list(Teacher.objects.values('gender').annotate(count=Count('gender')).order_by('gender')),
+        'avg_experience': Teacher.objects.aggregate(avg_exp=Avg('experience'))['avg_exp'] or 0,
+        'teachers_with_courses': [
+            {
+                'id': teacher.pk,
+                'teacher_id': teacher.teacher_id,
+                'name': teacher.user.get_full_name(),
+                'course_count': teacher.course_count,
+            }
+            for teacher in teachers
+        ],
+    }
+
+def course_report():
+    """Per-course enrollment counts by status."""
+    course_enrollments = status_breakdown(Course.objects.all(), 'enrollments', Enrollment.STATUS_CHOICES)
+    return {
+        'total_courses': len(course_enrollments),
+        'courses_with_students': [
+            {**_course(course), 'student_count': counts['total']} for course, counts in course_enrollments.items()
+        ],
+        'course_enrollments': [
+            {'course': _course(course), **counts} for course, counts in course_enrollments.items()
+        ],
+    }
+
+def attendance_report():
+    """Attendance totals by status, overall and per course, from the summary table."""
+    statuses = [status for status, label in StudentAttendance.STATUS_CHOICES]
+    status_totals = AttendanceSummary.objects.totals()
+    # Limited to courses that have at least one attendance record
+    courses_with_records = Course.objects.filter(
+        Exists(AttendanceRecord.objects.filter(course=OuterRef('pk')))
+    )
+    course_attendance = []
+    for course, stats in counter_breakdown(courses_with_records, 'attendance_summaries', statuses).items():
+        total = stats['total']
+        stats['present_percentage'] = (stats['present'] / total * 100) if total > 0 else 0
+        course_attendance.append({'course': _course(course), **stats})
+    return {
+        'total_records': AttendanceRecord.objects.count(),
+        'attendance_by_status': [{'status': status, 'count': status_totals[status]} for status in statuses],
+        'course_attendance': course_attendance,
+    }
+
+def fee_report():
+    """Invoice and payment totals, by invoice status and payment method."""
+    invoices = FeeInvoice.objects.aggregate(count=Count('pk'), total=Sum('total_amount'))
+    total_amount = invoices['total'] or 0
+    total_paid = Payment.objects.aggregate(total=Sum('amount'))['total'] or 0
+    return {
+        'total_invoices': invoices['count'],
+        'total_amount': total_amount,
+        'total_paid': total_paid,
+        'total_pending': total_amount - total_paid,
+        'invoices_by_status': list(FeeInvoice.objects.values('status').annotate(count=Count('status')).order_by('status')),
+        'payments_by_method': list(Payment.objects.values('payment_method').annotate(
+            count=Count('payment_method'),
+            total=Sum('amount'),
+        ).order_by('payment_method')),
+    }
+
+# Payload builders by ReportSnapshot.report
+REPORTS = {
+    'students': student_report,
+    'teachers': teacher_report,
+    'courses': course_report,
+    'attendance': attendance_report,
+    'fees': fee_report,
+}
+
+
+def _json_values(value):
+    """
+    Return a payload with its Decimal sums as floats, so it holds the same
+    types when rendered right after a build as when read back from JSON.
+    """
+    if isinstance(value, dict):
+        return {key: _json_values(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_values(item) for item in value]
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def build_snapshot(report):
+    """Compute a report, store it as its latest snapshot and prune the oldest ones."""
+    started = time.perf_counter()
+    payload = _json_values(REPORTS[report]())
+    snapshot = ReportSnapshot.objects.create(
+        report=report,
+        payload=payload,
+        build_duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+    keep = getattr(settings, 'REPORT_SNAPSHOTS_KEEP', 30)
+    stale = ReportSnapshot.objects.filter(report=report).values_list('pk', flat=True)[keep:]
+    ReportSnapshot.objects.filter(pk__in=list(stale)).delete()
+    return snapshot
+
+def latest_snapshot(report):
+    # Read from the primary even in replica-reading views: a snapshot built
+    # there reaches the replica only at its next sync
+    return ReportSnapshot.objects.using(DEFAULT_DB_ALIAS).filter(report=report).first()
+
+def _flatten(row, prefix=''):
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}_'))
+        else:
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+def payload_rows(payload):
+    """
+    Yield a report payload as CSV rows: its figures as name/value pairs, then
+    each of its tables after a blank line, its name and its column names.
+    """
+    tables = {}
+    for name, value in payload.items():
+        if isinstance(value, list):
+            tables[name] = value
+        else:
+            yield [name, value]
+    for name, rows in tables.items():
+        rows = [_flatten(row) for row in rows]
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        yield []
+        yield [name]
+        yield columns
+        for row in rows:
+            yield [row.get(column, '') for column in columns]
+
+def _refresh_timeout():
+    return timedelta(seconds=getattr(settings, 'REPORT_REFRESH_TIMEOUT', 600))
+
+def is_refreshing(report):
+    return ReportRefresh.objects.using(DEFAULT_DB_ALIAS).filter(
+        report=report, started_at__gte=timezone.now() - _refresh_timeout(),
+    ).exists()
+
+def refresh_in_background(report):
+    """
+    Rebuild a report's snapshot in a background thread. Returns False when a
+    rebuild of it is already running, in this process or another one: each
+    rebuild claims the report's ReportRefresh row until it ends, or until
+    REPORT_REFRESH_TIMEOUT for one that died.
+    """
+    now = timezone.now()
+    ReportRefresh.objects.filter(report=report, started_at__lt=now - _refresh_timeout()).delete()
+    try:
+        with transaction.atomic():
+            claim = ReportRefresh.objects.create(report=report, started_at=now)
+    except IntegrityError:
+        return False
+
+    def run():
+        try:
+            build_snapshot(report)
+        except Exception:
+            logger.exception('Refreshing the %s report failed', report)
+        finally:
+            ReportRefresh.objects.filter(pk=claim.pk).delete()
+            # The thread's own connections
+            connections.close_all()
+
+    threading.Thread(target=run, name=f'report-refresh-{report}', daemon=True).start()
+    return True
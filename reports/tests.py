@@ -1,3 +1,193 @@
-from django.test import TestCase
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from attendance.models import AttendanceRecord, StudentAttendance
+from courses.models import Course, Enrollment
+from students.models import Student
+from .aggregates import status_breakdown
+from .models import ReportRefresh, ReportSnapshot
+from .snapshots import REPORTS, build_snapshot, refresh_in_background
+
+
+class StatusBreakdownTests(TestCase):
+    """Tests for the grouped per-status aggregation used by the reports."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = []
+        for i in range(3):
+            user = User.objects.create_user(username=f'student{i}', password='pass', user_type='student')
+            cls.students.append(Student.objects.create(user=user, student_id=f'S{i}', gender='male'))
+
+        cls.courses = [Course.objects.create(name=f'Course {i}', code=f'C{i}') for i in range(5)]
+        statuses = ['active', 'completed', 'dropped']
+        for i, course in enumerate(cls.courses):
+            for j, student in enumerate(cls.students[:i % 4]):
+                Enrollment.objects.create(student=student, course=course, status=statuses[j])
+
+        record = AttendanceRecord.objects.create(course=cls.courses[0], date=datetime.date(2025, 1, 6))
+        StudentAttendance.objects.create(attendance_record=record, student=cls.students[0], status='present')
+        StudentAttendance.objects.create(attendance_record=record, student=cls.students[1], status='late')
+        AttendanceRecord.objects.create(course=cls.courses[1], date=datetime.date(2025, 1, 6))
+
+    def test_enrollment_breakdown(self):
+        breakdown = status_breakdown(Course.objects.all(), 'enrollments', Enrollment.STATUS_CHOICES)
+        self.assertEqual(len(breakdown), 5)
+        self.assertEqual(breakdown[self.courses[0]], {'active': 0, 'completed': 0, 'dropped': 0, 'total': 0})
+        self.assertEqual(breakdown[self.courses[3]], {'active': 1, 'completed': 1, 'dropped': 1, 'total': 3})
+
+    def test_attendance_breakdown_only_courses_with_records(self):
+        courses = Course.objects.annotate(
+            record_count=Count('attendance_records', distinct=True)
+        ).filter(record_count__gt=0)
+        breakdown = status_breakdown(
+            courses, 'attendance_records__student_attendances', StudentAttendance.STATUS_CHOICES
+        )
+        self.assertEqual(set(breakdown), {self.courses[0], self.courses[1]})
+        self.assertEqual(breakdown[self.courses[0]]['present'], 1)
+        self.assertEqual(breakdown[self.courses[0]]['late'], 1)
+        self.assertEqual(breakdown[self.courses[0]]['total'], 2)
+        self.assertEqual(breakdown[self.courses[1]]['total'], 0)
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            status_breakdown(Course.objects.all(), 'enrollments', Enrollment.STATUS_CHOICES)
+
+        for i in range(5, 50):
+            Course.objects.create(name=f'Course {i}', code=f'C{i}')
+
+        with self.assertNumQueries(1):
+            breakdown = status_breakdown(Course.objects.all(), 'enrollments', Enrollment.STATUS_CHOICES)
+        self.assertEqual(len(breakdown), 50)
+
+
+# The report page templates, reduced to a figure and the snapshot status
+REPORT_TEMPLATES = {
+    'reports/student_report.html': 'Students: {{ total_students }}{% include "reports/_snapshot_status.html" %}',
+    'reports/access_denied.html': 'Access denied',
+}
+
+
+@override_settings(TEMPLATES=[{
+    **settings.TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **settings.TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.locmem.Loader', REPORT_TEMPLATES),
+            'django.template.loaders.filesystem.Loader',
+        ],
+    },
+}])
+class ReportSnapshotTests(TestCase):
+    """Tests for the precomputed report snapshots."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def add_students(self, count):
+        start = Student.objects.count()
+        users = User.objects.bulk_create([
+            User(username=f'student{i}', user_type='student') for i in range(start, start + count)
+        ])
+        Student.objects.bulk_create([Student(user=user, student_id=f'S{user.username}', gender='male') for user in users])
+
+    def test_pages_render_the_latest_snapshot_in_constant_queries(self):
+        self.add_students(2)
+        response = self.client.get(reverse('student_report'))
+        self.assertContains(response, 'Students: 2')
+        self.assertContains(response, 'As of ')
+        self.assertContains(response, reverse('refresh_report', args=['students']))
+        self.assertEqual(ReportSnapshot.objects.filter(report='students').count(), 1)
+
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse('student_report'))
+        self.add_students(50)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(reverse('student_report'))
+        self.assertEqual(len(before), len(after))
+        self.assertContains(response, 'Students: 2')
+
+        build_snapshot('students')
+        self.assertContains(self.client.get(reverse('student_report')), 'Students: 52')
+
+    def test_refresh_button_rebuilds_in_the_background(self):
+        url = reverse('refresh_report', args=['students'])
+        with mock.patch('reports.views.refresh_in_background', return_value=True) as refresh:
+            self.assertRedirects(self.client.post(url), reverse('student_report'), fetch_redirect_response=False)
+            refresh.assert_called_once_with('students')
+            self.assertEqual(self.client.get(url).status_code, 405)
+            self.assertEqual(self.client.post(reverse('refresh_report', args=['grades'])).status_code, 404)
+            student = User.objects.create_user(username='student', password='pass', user_type='student')
+            self.client.force_login(student)
+            self.assertRedirects(self.client.post(url), reverse('dashboard'), fetch_redirect_response=False)
+            refresh.assert_called_once()
+
+    def test_one_refresh_of_a_report_runs_at_a_time(self):
+        threads = []
+        with mock.patch('reports.snapshots.threading.Thread') as thread:
+            thread.side_effect = lambda target, **kwargs: threads.append(target) or mock.Mock()
+            self.assertTrue(refresh_in_background('fees'))
+            self.assertFalse(refresh_in_background('fees'))
+            self.assertTrue(refresh_in_background('courses'))
+            # Run the first refresh here; it closes its thread's connections
+            with mock.patch('reports.snapshots.connections'):
+                threads[0]()
+            self.assertTrue(refresh_in_background('fees'))
+        self.assertEqual(ReportSnapshot.objects.filter(report='fees').count(), 1)
+
+    def test_a_refresh_that_died_stops_blocking_after_the_timeout(self):
+        ReportRefresh.objects.create(report='fees', started_at=timezone.now() - datetime.timedelta(seconds=601))
+        with mock.patch('reports.snapshots.threading.Thread'):
+            self.assertTrue(refresh_in_background('fees'))
+            self.assertFalse(refresh_in_background('fees'))
+        self.assertEqual(ReportRefresh.objects.filter(report='fees').count(), 1)
+
+    def test_built_and_stored_payloads_hold_the_same_types(self):
+        payload = {'total_paid': Decimal('12.50'), 'payments_by_method': [{'method': 'cash', 'total': Decimal('2')}]}
+        with mock.patch.dict(REPORTS, {'fees': lambda: payload}):
+            built = build_snapshot('fees').payload
+        self.assertEqual(built, {'total_paid': 12.5, 'payments_by_method': [{'method': 'cash', 'total': 2.0}]})
+        self.assertEqual(ReportSnapshot.objects.get(report='fees').payload, built)
+        self.assertIsInstance(built['total_paid'], float)
+
+    def test_command_builds_every_report_and_prunes_old_snapshots(self):
+        out = io.StringIO()
+        with override_settings(REPORT_SNAPSHOTS_KEEP=2):
+            for i in range(3):
+                call_command('build_report_snapshots', stdout=out)
+        self.assertEqual(
+            dict(ReportSnapshot.objects.values_list('report').annotate(count=Count('pk'))),
+            {report: 2 for report in REPORTS},
+        )
+        call_command('build_report_snapshots', '--report', 'fees', stdout=out)
+        self.assertEqual(ReportSnapshot.objects.filter(report='fees').first().payload['total_invoices'], 0)
+
+    def test_report_export_flattens_the_snapshot(self):
+        self.add_students(2)
+        response = self.client.get(reverse('export_report', args=['courses']))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[:2], ['Figure,Value', 'total_courses,0'])
+        response = self.client.get(reverse('export_report', args=['students']))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertIn('total_students,2', lines)
+        self.assertEqual(lines[lines.index('students_by_gender') + 1:], ['gender,count', 'male,2'])
+        self.assertEqual(self.client.get(reverse('export_report', args=['grades'])).status_code, 404)
@@ -8,4 +8,6 @@ urlpatterns = [
     path('courses/', views.course_report, name='course_report'),
     path('attendance/', views.attendance_report, name='attendance_report'),
     path('fees/', views.fee_report, name='fee_report'),
+    path('<str:report>/refresh/', views.refresh_report, name='refresh_report'),
+    path('<str:report>/export/', views.export_report, name='export_report'),
 ]
@@ -1,167 +1,101 @@
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count, Sum, Avg
-from django.shortcuts import render
+from django.http import Http404
+from django.shortcuts import render, redirect
+from django.views.decorators.http import require_POST
 from django.views.generic import TemplateView
 
-from students.models import Student
-from teachers.models import Teacher
-from courses.models import Course, Enrollment
-from attendance.models import AttendanceRecord, StudentAttendance
-from fees.models import FeeInvoice, Payment
+from institute_management.exports import csv_response
+from institute_management.replica import reads_from_replica
 from students.views import AdminRequiredMixin
+from .models import ReportSnapshot
+from .snapshots import REPORTS, build_snapshot, is_refreshing, latest_snapshot, payload_rows, refresh_in_background
+
+# URL names of the report pages
+REPORT_URLS = {
+    'students': 'student_report',
+    'teachers': 'teacher_report',
+    'courses': 'course_report',
+    'attendance': 'attendance_report',
+    'fees': 'fee_report',
+}
 
 class ReportDashboardView(LoginRequiredMixin, AdminRequiredMixin, TemplateView):
     """Main reports dashboard view."""
     template_name = 'reports/dashboard.html'
 
-@login_required
-def student_report(request):
-    """View for generating student-related reports."""
+def render_report(request, report, template_name):
+    """
+    Render a report from its latest snapshot, so the page costs the same
+    whatever the size of the data. A report without one is built first.
+    """
     if not request.user.is_admin:
         return render(request, 'reports/access_denied.html')
 
-    # Get student statistics
-    total_students = Student.objects.count()
-    students_by_gender = Student.objects.values('gender').annotate(count=Count('gender'))
-
-    # Get enrollment statistics
-    total_enrollments = Enrollment.objects.count()
-    active_enrollments = Enrollment.objects.filter(status='active').count()
-    completed_enrollments = Enrollment.objects.filter(status='completed').count()
-    dropped_enrollments = Enrollment.objects.filter(status='dropped').count()
-
-    context = {
-        'total_students': total_students,
-        'students_by_gender': students_by_gender,
-        'total_enrollments': total_enrollments,
-        'active_enrollments': active_enrollments,
-        'completed_enrollments': completed_enrollments,
-        'dropped_enrollments': dropped_enrollments,
-    }
+    snapshot = latest_snapshot(report) or build_snapshot(report)
+    context = dict(snapshot.payload)
+    context.update({
+        'report': report,
+        'snapshot': snapshot,
+        'refreshing': is_refreshing(report),
+    })
+    return render(request, template_name, context)
 
-    return render(request, 'reports/student_report.html', context)
+@login_required
+@reads_from_replica
+def student_report(request):
+    """View for student-related reports."""
+    return render_report(request, 'students', 'reports/student_report.html')
 
 @login_required
+@reads_from_replica
 def teacher_report(request):
-    """View for generating teacher-related reports."""
-    if not request.user.is_admin:
-        return render(request, 'reports/access_denied.html')
-
-    # Get teacher statistics
-    total_teachers = Teacher.objects.count()
-    teachers_by_gender = Teacher.objects.values('gender').annotate(count=Count('gender'))
-    avg_experience = Teacher.objects.aggregate(avg_exp=Avg('experience'))['avg_exp'] or 0
-
-    # Get course statistics per teacher
-    teachers_with_courses = Teacher.objects.annotate(course_count=Count('courses'))
-
-    context = {
-        'total_teachers': total_teachers,
-        'teachers_by_gender': teachers_by_gender,
-        'avg_experience': avg_experience,
-        'teachers_with_courses': teachers_with_courses,
-    }
-
-    return render(request, 'reports/teacher_report.html', context)
+    """View for teacher-related reports."""
+    return render_report(request, 'teachers', 'reports/teacher_report.html')
 
 @login_required
+@reads_from_replica
 def course_report(request):
-    """View for generating course-related reports."""
-    if not request.user.is_admin:
-        return render(request, 'reports/access_denied.html')
-
-    # Get course statistics
-    total_courses = Course.objects.count()
-    courses_with_students = Course.objects.annotate(student_count=Count('enrollments'))
-
-    # Get enrollment statistics by course
-    course_enrollments = {}
-    for course in Course.objects.all():
-        active = Enrollment.objects.filter(course=course, status='active').count()
-        completed = Enrollment.objects.filter(course=course, status='completed').count()
-        dropped = Enrollment.objects.filter(course=course, status='dropped').count()
-        course_enrollments[course] = {
-            'active': active,
-            'completed': completed,
-            'dropped': dropped,
-            'total': active + completed + dropped
-        }
-
-    context = {
-        'total_courses': total_courses,
-        'courses_with_students': courses_with_students,
-        'course_enrollments': course_enrollments,
-    }
-
-    return render(request, 'reports/course_report.html', context)
+    """View for course-related reports."""
+    return render_report(request, 'courses', 'reports/course_report.html')
 
 @login_required
+@reads_from_replica
 def attendance_report(request):
-    """View for generating attendance-related reports."""
-    if not request.user.is_admin:
-        return render(request, 'reports/access_denied.html')
-
-    # Get attendance statistics
-    total_records = AttendanceRecord.objects.count()
-    attendance_by_status = StudentAttendance.objects.values('status').annotate(count=Count('status'))
-
-    # Get attendance statistics by course
-    course_attendance = {}
-    for course in Course.objects.all():
-        records = AttendanceRecord.objects.filter(course=course)
-        if records.exists():
-            present = StudentAttendance.objects.filter(attendance_record__course=course, status='present').count()
-            absent = StudentAttendance.objects.filter(attendance_record__course=course, status='absent').count()
-            late = StudentAttendance.objects.filter(attendance_record__course=course, status='late').count()
-            excused = StudentAttendance.objects.filter(attendance_record__course=course, status='excused').count()
-            total = present + absent + late + excused
-
-            course_attendance[course] = {
-                'present': present,
-                'absent': absent,
-                'late': late,
-                'excused': excused,
-                'total': total,
-                'present_percentage': (present / total * 100) if total > 0 else 0
-            }
-
-    context = {
-        'total_records': total_records,
-        'attendance_by_status': attendance_by_status,
-        'course_attendance': course_attendance,
-    }
-
-    return render(request, 'reports/attendance_report.html', context)
+    """View for attendance-related reports."""
+    return render_report(request, 'attendance', 'reports/attendance_report.html')
 
 @login_required
+@reads_from_replica
 def fee_report(request):
-    """View for generating fee-related reports."""
-    if not request.user.is_admin:
-        return render(request, 'reports/access_denied.html')
-
-    # Get fee statistics
-    total_invoices = FeeInvoice.objects.count()
-    total_amount = FeeInvoice.objects.aggregate(total=Sum('total_amount'))['total'] or 0
-    total_paid = Payment.objects.aggregate(total=Sum('amount'))['total'] or 0
-    total_pending = total_amount - total_paid
+    """View for fee-related reports."""
+    return render_report(request, 'fees', 'reports/fee_report.html')
 
-    # Get invoice statistics by status
-    invoices_by_status = FeeInvoice.objects.values('status').annotate(count=Count('status'))
+@login_required
+@require_POST
+def refresh_report(request, report):
+    """View to rebuild a report's snapshot in the background."""
+    if not request.user.is_admin:
+        return redirect('dashboard')
+    if report not in REPORTS:
+        raise Http404('Unknown report')
 
-    # Get payment statistics by method
-    payments_by_method = Payment.objects.values('payment_method').annotate(
-        count=Count('payment_method'),
-        total=Sum('amount')
-    )
+    label = dict(ReportSnapshot.REPORT_CHOICES)[report]
+    if refresh_in_background(report):
+        messages.success(request, f'Refreshing the {label.lower()}; reload the page in a moment.')
+    else:
+        messages.info(request, f'The {label.lower()} is already being refreshed.')
+    return redirect(REPORT_URLS[report])
 
-    context = {
-        'total_invoices': total_invoices,
-        'total_amount': total_amount,
-        'total_paid': total_paid,
-        'total_pending': total_pending,
-        'invoices_by_status': invoices_by_status,
-        'payments_by_method': payments_by_method,
-    }
+@login_required
+@reads_from_replica
+def export_report(request, report):
+    """View to download a report's latest snapshot as CSV."""
+    if not request.user.is_admin:
+        return redirect('dashboard')
+    if report not in REPORTS:
+        raise Http404('Unknown report')
 
-    return render(request, 'reports/fee_report.html', context)
\ No newline at end of file
+    snapshot = latest_snapshot(report) or build_snapshot(report)
+    return csv_response(f'{report}-report', ['Figure', 'Value'], payload_rows(snapshot.payload))
@@ -290,4 +290,56 @@ document.addEventListener('DOMContentLoaded', function() {
         const animationType = element.dataset.animation || 'fade-in';
         element.classList.add(animationType);
     });
+
+    // Autocomplete fields: look choices up as the user types and post the
+    // selected primary key through the paired hidden input
+    document.querySelectorAll('input[data-autocomplete-url]').forEach(search => {
+        const hidden = document.getElementById(search.dataset.autocompleteInput);
+        const results = document.createElement('ul');
+        results.className = 'autocomplete-results';
+        search.parentNode.classList.add('autocomplete');
+        search.after(results);
+        let timer = null;
+        let request = 0;
+
+        const close = () => { results.innerHTML = ''; };
+
+        search.addEventListener('input', function() {
+            // Typing invalidates the previous selection
+            hidden.value = '';
+            clearTimeout(timer);
+            const term = search.value.trim();
+            if (!term) {
+                close();
+                return;
+            }
+            timer = setTimeout(() => {
+                const current = ++request;
+                fetch(`${search.dataset.autocompleteUrl}?q=${encodeURIComponent(term)}`, {
+                    headers: { 'X-Requested-With': 'XMLHttpRequest' }
+                })
+                    .then(response => response.json())
+                    .then(data => {
+                        // Ignore answers to superseded lookups
+                        if (current !== request) {
+                            return;
+                        }
+                        close();
+                        data.results.forEach(result => {
+                            const item = document.createElement('li');
+                            item.textContent = result.text;
+                            item.addEventListener('mousedown', event => {
+                                event.preventDefault();
+                                hidden.value = result.id;
+                                search.value = result.text;
+                                close();
+                            });
+                            results.appendChild(item);
+                        });
+                    });
+            }, 200);
+        });
+
+        search.addEventListener('blur', close);
+    });
 });
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
+
+    def ready(self):
+        # Register the sort name and search index maintenance signal handlers
+        from . import signals  # noqa: F401
+        from .search import create_index_after_migrate
+        post_migrate.connect(create_index_after_migrate, sender=self)
@@ -33,4 +33,6 @@ class StudentUserForm(CustomUserCreationForm):
         super().__init__(*args, **kwargs)
         # Set user_type to student by default
         self.initial['user_type'] = 'student'
-        self.fields['user_type'].widget = forms.HiddenInput()
+        # The views set the role themselves; user_type isn't among the form's fields
+        if 'user_type' in self.fields:
+            self.fields['user_type'].widget = forms.HiddenInput()
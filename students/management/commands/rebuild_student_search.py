@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from students import search
+from students.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Backfill the stored sort names of students and rebuild the student search index.'
+
+    def handle(self, *args, **options):
+        count = Student.objects.rebuild_sort_names()
+        search.create_index()
+        with transaction.atomic():
+            search.index_students()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt sort names of {count} students and the search index of {Student.objects.count()}.'
+        ))
@@ -1,5 +1,122 @@
-from django.db import models
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.db.models import Case, ExpressionWrapper, F, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
 from accounts.models import User
+from . import search as search_index
+
+# Student columns copied into the search index
+SEARCHED_FIELDS = {'student_id', 'parent_mobile', 'user', 'user_id'}
+
+def sort_name(first_name, last_name):
+    """Return the directory sort key of a student's name: ``first last``, lowercased."""
+    return f'{first_name} {last_name}'.strip().lower()
+
+class StudentQuerySet(models.QuerySet):
+    """
+    QuerySet with the student directory search.
+    """
+    def search(self, term, ranked=True):
+        """
+        Filter to students matching every word of ``term`` by a case-insensitive
+        prefix of a word of their name, or of their email, student ID or parent
+        mobile, read from the students' full-text index. Unless ``ranked`` is
+        False, results are ranked by how closely they match: exact student ID,
+        then student ID prefix, then full name prefix. Terms matching more than
+        STUDENT_SEARCH_RANK_LIMIT students keep the directory order instead,
+        where ranking them all would cost more than the search.
+        """
+        query = search_index.match_query(term)
+        if not query:
+            return self
+        matches = RawSQL(search_index.matches_sql(), [query])
+        if not ranked:
+            return self.filter(pk__in=matches)
+        rank_limit = getattr(settings, 'STUDENT_SEARCH_RANK_LIMIT', 15000)
+        if search_index.count_matches(query, limit=rank_limit + 1, using=self.db) > rank_limit:
+            # Hide the primary key from SQLite's planner, so it walks the sort
+            # name index checking each student against the matches and stops at
+            # the end of the page, instead of sorting every match
+            return self.alias(
+                unindexed_pk=ExpressionWrapper(F('pk') + 0, output_field=models.BigIntegerField()),
+            ).filter(unindexed_pk__in=matches)
+        term = ' '.join(term.lower().split())
+        return self.filter(pk__in=matches).alias(student_id_lower=Lower('student_id')).annotate(
+            search_rank=Case(
+                When(student_id_lower=term, then=Value(0)),
+                When(student_id_lower__startswith=term, then=Value(1)),
+                When(sort_name__startswith=term, then=Value(2)),
+                default=Value(3),
+            ),
+        ).order_by('search_rank', 'sort_name', 'pk')
+
+    def count_matches(self, term):
+        """
+        Return the number of students search(term) finds, counted in the search
+        index alone; filters of this queryset are not applied.
+        """
+        query = search_index.match_query(term)
+        if not query:
+            return self.count()
+        return search_index.count_matches(query, using=self.db)
+
+    def update(self, **kwargs):
+        # Reindex the updated students when a searched column changes
+        if not SEARCHED_FIELDS & kwargs.keys():
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            search_index.index_students(pks, using=self.db)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # Fill in the sort names, with one query for the users that aren't loaded
+        objs = list(objs)
+        missing = [obj for obj in objs if not obj.sort_name]
+        unloaded = {obj.user_id for obj in missing if not Student.user.is_cached(obj)}
+        names = {}
+        if unloaded:
+            names = {
+                pk: (first_name, last_name)
+                for pk, first_name, last_name in User.objects.filter(pk__in=unloaded).values_list(
+                    'pk', 'first_name', 'last_name'
+                )
+            }
+        for obj in missing:
+            if Student.user.is_cached(obj):
+                obj.sort_name = sort_name(obj.user.first_name, obj.user.last_name)
+            elif obj.user_id in names:
+                obj.sort_name = sort_name(*names[obj.user_id])
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            search_index.index_students([obj.pk for obj in created if obj.pk is not None], using=self.db)
+        return created
+
+    def rebuild_sort_names(self, batch_size=2000):
+        """
+        Recompute the stored sort names of the matching students that are out
+        of date. Returns the number of students updated.
+        """
+        rows = self.order_by('pk').values_list('pk', 'sort_name', 'user__first_name', 'user__last_name')
+        stale = (
+            (name, pk) for pk, stored, first_name, last_name in rows.iterator(chunk_size=batch_size)
+            if stored != (name := sort_name(first_name, last_name))
+        )
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        # One prepared UPDATE run per row; bulk_update()'s CASE expressions cost
+        # more to build than the updates themselves
+        sql = f'UPDATE {quote(Student._meta.db_table)} SET {quote("sort_name")} = %s WHERE {quote("id")} = %s'
+        updated = 0
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            while batch := list(islice(stale, batch_size)):
+                cursor.executemany(sql, batch)
+                updated += len(batch)
+        return updated
 
 class Student(models.Model):
     """
@@ -12,9 +129,28 @@ class Student(models.Model):
     parent_name = models.CharField(max_length=100, null=True, blank=True)
     parent_mobile = models.CharField(max_length=15, null=True, blank=True)
     admission_date = models.DateField(auto_now_add=True)
+    # The user's name, denormalized so listing and ranking students need no join;
+    # kept in step by save() and the user post_save signal
+    sort_name = models.CharField(max_length=301, blank=True, default='', editable=False)
+
+    objects = StudentQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} ({self.student_id})"
 
+    def save(self, *args, **kwargs):
+        self.sort_name = sort_name(self.user.first_name, self.user.last_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'sort_name' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'sort_name']
+        super().save(*args, **kwargs)
+
     class Meta:
-        ordering = ['user__first_name', 'user__last_name']
\ No newline at end of file
+        ordering = ['sort_name']
+        indexes = [
+            # Ordering of the directory, and its first name prefix lookups
+            models.Index(fields=['sort_name'], name='student_sort_name_idx'),
+            # Prefix lookups of the directory search
+            models.Index(Lower('student_id'), name='student_id_lower_idx'),
+            models.Index(fields=['parent_mobile'], name='student_parent_mobile_idx'),
+        ]
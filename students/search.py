@@ -0,0 +1,90 @@
+from django.db import connections
+
+# SQLite FTS5 table indexing each student (by rowid = student id) under the
+# searchable columns. Hyphens, underscores, dots and @ are kept inside tokens,
+# so IDs, mobiles and emails match as whole values; names are split into words.
+TABLE = 'students_student_search'
+COLUMNS = ('student_id', 'first_name', 'last_name', 'email', 'parent_mobile')
+# Student ids per statement when indexing a given set of students
+BATCH_SIZE = 500
+
+
+def match_query(term):
+    """
+    Return the FTS5 query matching students with a word starting with every
+    word of ``term``, or '' for a blank term. Each word is quoted, so it is
+    never read as query syntax.
+    """
+    words = term.lower().split()
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+def create_index(using='default'):
+    """Create the search index table if it is missing; returns whether it was created."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [TABLE])
+        if cursor.fetchone() is not None:
+            return False
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE} USING fts5({', '.join(COLUMNS)}, "
+            f"tokenize = \"unicode61 tokenchars '-_.@'\", prefix = '1 2 3')"
+        )
+    return True
+
+def _select_rows(where=''):
+    return (
+        f'SELECT s.id, s.student_id, u.first_name, u.last_name, u.email, s.parent_mobile '
+        f'FROM students_student s INNER JOIN accounts_user u ON u.id = s.user_id {where}'
+    )
+
+def index_students(pks=None, using='default'):
+    """
+    (Re)index the students with the given ids, or every student, from the
+    current rows. Students that no longer exist are dropped from the index.
+    """
+    columns = ', '.join(COLUMNS)
+    with connections[using].cursor() as cursor:
+        if pks is None:
+            cursor.execute(f'DELETE FROM {TABLE}')
+            cursor.execute(f'INSERT INTO {TABLE} (rowid, {columns}) {_select_rows()}')
+            return
+        pks = list(pks)
+        for start in range(0, len(pks), BATCH_SIZE):
+            batch = pks[start:start + BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', batch)
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, {columns}) {_select_rows(f"WHERE s.id IN ({placeholders})")}',
+                batch,
+            )
+
+def remove_students(pks, using='default'):
+    """Drop the students with the given ids from the index."""
+    pks = list(pks)
+    with connections[using].cursor() as cursor:
+        for start in range(0, len(pks), BATCH_SIZE):
+            batch = pks[start:start + BATCH_SIZE]
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({", ".join(["%s"] * len(batch))})', batch)
+
+def count_matches(query, limit=None, using='default'):
+    """
+    Return the number of indexed students matching an FTS5 ``query``, counting
+    no further than ``limit`` when one is given.
+    """
+    sql = f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [query]
+    if limit is not None:
+        sql += ' LIMIT %s'
+        params.append(limit)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM ({sql})', params)
+        return cursor.fetchone()[0]
+
+def matches_sql():
+    """Return the SQL selecting the ids of the students matching a query parameter."""
+    return f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+
+def create_index_after_migrate(sender, using='default', **kwargs):
+    """``post_migrate`` receiver creating and filling the index of a new SQLite database."""
+    if connections[using].vendor == 'sqlite' and create_index(using):
+        index_students(using=using)
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from . import search
+from .models import Student, sort_name
+
+
+@receiver(post_save, sender=Student)
+def index_student(sender, instance, raw=False, using='default', **kwargs):
+    """Refresh a saved student's entry in the search index."""
+    if not raw:
+        search.index_students([instance.pk], using=using)
+
+@receiver(post_delete, sender=Student)
+def unindex_student(sender, instance, using='default', **kwargs):
+    """Drop a deleted student from the search index."""
+    search.remove_students([instance.pk], using=using)
+
+@receiver(post_save, sender=User)
+def update_student_profile(sender, instance, raw=False, update_fields=None, using='default', **kwargs):
+    """Carry a user's new name or email over to the sort name and search index of their student profile."""
+    if raw or (update_fields is not None and not {'first_name', 'last_name', 'email'} & set(update_fields)):
+        return
+    students = Student.objects.using(using).filter(user=instance)
+    pks = list(students.values_list('pk', flat=True))
+    if not pks:
+        return
+    name = sort_name(instance.first_name, instance.last_name)
+    students.exclude(sort_name=name).update(sort_name=name)
+    search.index_students(pks, using=using)
@@ -1,3 +1,81 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from accounts.models import User
+from .models import Student
+from .views import StudentListView
+
+
+class StudentDirectorySearchTests(TestCase):
+    """Tests for the student directory search."""
+
+    @classmethod
+    def setUpTestData(cls):
+        people = (
+            ('Alice', 'Moss', 'alice@example.com', 'STU-100', '5550001'),
+            ('Alan', 'Stone', 'astone@example.com', 'STU-200', '5550002'),
+            ('Bob', 'Alder', 'bob@example.com', 'AL-300', '7770003'),
+        )
+        cls.students = {}
+        for first, last, email, student_id, mobile in people:
+            user = User.objects.create_user(
+                username=first.lower(), first_name=first, last_name=last, email=email, user_type='student'
+            )
+            cls.students[first] = Student.objects.create(
+                user=user, student_id=student_id, parent_mobile=mobile, gender='other'
+            )
+        cls.admin = User.objects.create_user(username='admin', password='pass', user_type='admin')
+
+    def search(self, term):
+        return [student.user.first_name for student in Student.objects.search(term)]
+
+    def test_matches_name_id_mobile_and_email_prefixes(self):
+        self.assertEqual(self.search('stu-1'), ['Alice'])
+        self.assertEqual(self.search('777'), ['Bob'])
+        self.assertEqual(self.search('ASTONE@'), ['Alan'])
+        self.assertEqual(self.search('alice mo'), ['Alice'])
+        self.assertEqual(self.search('lice'), [])
+
+    def test_results_are_ranked(self):
+        # The student ID match comes first, then the full name match, then the rest
+        self.assertEqual(self.search('al'), ['Bob', 'Alan', 'Alice'])
+        self.assertEqual(self.search('alan st'), ['Alan'])
+
+    def test_list_view_searches_without_per_row_queries(self):
+        request = RequestFactory().get('/students/', {'search': 'al'})
+        request.user = self.admin
+        view = StudentListView()
+        view.setup(request)
+        with CaptureQueriesContext(connection) as queries:
+            names = [student.user.get_full_name() for student in view.get_queryset()]
+        self.assertEqual(names, ['Bob Alder', 'Alan Stone', 'Alice Moss'])
+        # The number of matches, then the page
+        self.assertEqual(len(queries), 2)
+
+    def test_large_result_sets_keep_directory_order(self):
+        with self.settings(STUDENT_SEARCH_RANK_LIMIT=2):
+            self.assertEqual(self.search('al'), ['Alan', 'Alice', 'Bob'])
+
+    def test_search_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('al OR'), [])
+        self.assertEqual(self.search('"*'), [])
+
+    def test_index_follows_changes(self):
+        alice = self.students['Alice']
+        alice.user.last_name = 'Zeller'
+        alice.user.email = 'az@example.com'
+        alice.user.save()
+        self.assertEqual(self.search('zell'), ['Alice'])
+        self.assertEqual(self.search('az@'), ['Alice'])
+        self.assertEqual(self.search('moss'), [])
+
+        Student.objects.filter(pk=alice.pk).update(student_id='NEW-1')
+        self.assertEqual(self.search('new-'), ['Alice'])
+
+        user = User.objects.create_user(username='carol', first_name='Carol', last_name='Zed', user_type='student')
+        Student.objects.bulk_create([Student(user=user, student_id='STU-400', gender='other')])
+        self.assertEqual(self.search('z'), ['Alice', 'Carol'])
+
+        alice.delete()
+        self.assertEqual(self.search('z'), ['Carol'])
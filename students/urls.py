@@ -5,6 +5,7 @@ urlpatterns = [
     path('', views.StudentListView.as_view(), name='student_list'),
     path('<int:pk>/', views.StudentDetailView.as_view(), name='student_detail'),
     path('create/', views.StudentCreateView.as_view(), name='student_create'),
+    path('autocomplete/', views.StudentAutocompleteView.as_view(), name='student_autocomplete'),
     path('<int:pk>/update/', views.StudentUpdateView.as_view(), name='student_update'),
     path('<int:pk>/delete/', views.StudentDeleteView.as_view(), name='student_delete'),
 ]
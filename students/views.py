@@ -8,18 +8,56 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView, D
 from .forms import StudentForm, StudentUserForm
 from .models import Student
 from accounts.models import User
+from institute_management.autocomplete import AutocompleteView
+from institute_management.exports import CsvExportMixin
+from institute_management.pagination import KeysetPaginationMixin
 
 class AdminRequiredMixin(UserPassesTestMixin):
     """Mixin to ensure only admin users can access the view."""
     def test_func(self):
         return self.request.user.is_authenticated and self.request.user.is_admin
 
-class StudentListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class StudentListView(LoginRequiredMixin, AdminRequiredMixin, CsvExportMixin, KeysetPaginationMixin, ListView):
     """View to list all students."""
     model = Student
     template_name = 'students/student_list.html'
     context_object_name = 'students'
     paginate_by = 10
+    export_filename = 'students'
+    export_fields = (
+        ('Student ID', 'student_id'),
+        ('First name', 'user__first_name'),
+        ('Last name', 'user__last_name'),
+        ('Email', 'user__email'),
+        ('Mobile', 'user__mobile'),
+        ('Gender', 'gender'),
+        ('Date of birth', 'date_of_birth'),
+        ('Parent name', 'parent_name'),
+        ('Parent mobile', 'parent_mobile'),
+        ('Admission date', 'admission_date'),
+    )
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('user')
+
+        # Apply the directory search if provided
+        search = self.request.GET.get('search', '').strip()
+        if search:
+            queryset = queryset.search(search)
+
+        return queryset
+
+    def get_count(self, queryset):
+        # The search index counts a search's matches without reading the students
+        search = self.request.GET.get('search', '').strip()
+        if search:
+            return Student.objects.using(queryset.db).count_matches(search)
+        return None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search'] = self.request.GET.get('search', '')
+        return context
 
 class StudentDetailView(LoginRequiredMixin, AdminRequiredMixin, DetailView):
     """View to display student details."""
@@ -109,4 +147,9 @@ class StudentDeleteView(LoginRequiredMixin, AdminRequiredMixin, DeleteView):
         user = student.user
         response = super().delete(request, *args, **kwargs)
         user.delete()
-        return response
\ No newline at end of file
+        return response
+
+class StudentAutocompleteView(LoginRequiredMixin, AdminRequiredMixin, AutocompleteView):
+    """JSON lookup of students for autocomplete fields."""
+    def search(self, term):
+        return Student.objects.search(term).select_related('user')
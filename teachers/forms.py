@@ -33,4 +33,6 @@ class TeacherUserForm(CustomUserCreationForm):
         super().__init__(*args, **kwargs)
         # Set user_type to teacher by default
         self.initial['user_type'] = 'teacher'
-        self.fields['user_type'].widget = forms.HiddenInput()
+        # The views set the role themselves; user_type isn't among the form's fields
+        if 'user_type' in self.fields:
+            self.fields['user_type'].widget = forms.HiddenInput()
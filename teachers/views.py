@@ -7,8 +7,9 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView, D
 from .forms import TeacherForm, TeacherUserForm
 from .models import Teacher
 from students.views import AdminRequiredMixin
+from institute_management.pagination import KeysetPaginationMixin
 
-class TeacherListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class TeacherListView(LoginRequiredMixin, AdminRequiredMixin, KeysetPaginationMixin, ListView):
     """View to list all teachers."""
     model = Teacher
     template_name = 'teachers/teacher_list.html'